@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from app.cli import main
+
+
+raise SystemExit(main())
@@ -0,0 +1,158 @@
+"""Headless batch mode: ``python -m app <paths...>``."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, TextIO
+
+from app.config import settings
+from app.records import ItemRecord
+from app.schemas import CommitRenameItemResult, RenamePlanItem
+from app.services.importer import collect_invoice_files
+from app.services.naming import apply_name_preview, build_rename_plan
+from app.services.ocr.render_pool import shutdown_render_pool
+from app.services.ocr.structured import is_structured
+from app.services.rename import execute_rename_plan
+from app.services.settings_store import load_runtime_settings
+from app.services.workflow import new_items, new_pipeline, open_duplicate_index, run_recognition
+
+
+EXIT_OK = 0
+EXIT_ITEM_FAILURES = 1
+EXIT_NO_FILES = 2
+EXIT_NOT_CONFIGURED = 3
+
+REPORT_FIELDS = [
+    "source_path",
+    "page",
+    "status",
+    "failure_reason",
+    "invoice_date",
+    "item_name",
+    "amount",
+    "category",
+    "duplicate_of",
+    "target_path",
+    "action",
+    "reason",
+    "result",
+    "message",
+]
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app", description="批量识别并重命名发票（无界面模式）")
+    parser.add_argument("paths", nargs="+", help="发票文件或目录")
+    parser.add_argument("--workers", type=int, default=4, help="并发识别数（默认 4）")
+    parser.add_argument("--deadline", type=float, help="整批识别的时间上限（秒），超时未完成的标记为 interrupted")
+    parser.add_argument("--item-timeout", type=float, help="单张发票识别超时（秒）")
+    parser.add_argument(
+        "--split-pdf",
+        choices=["off", "auto", "pages"],
+        help="合并 PDF 拆分方式，默认使用 PDF_SPLIT_MODE",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="只识别和生成改名计划，不改动文件")
+    parser.add_argument("--template", help="文件名模板，默认使用设置中的模板；可含目录，如 {yyyy}/{mm}/{category}/{date}-{amount}")
+    parser.add_argument("--output-dir", help="整理模式的目标根目录，默认各文件所在目录")
+    parser.add_argument("--model", help="覆盖设置中的模型")
+    parser.add_argument("--api-key", help="覆盖设置中的 API Key")
+    parser.add_argument("--report", choices=["ndjson", "csv"], default="ndjson", help="报告格式")
+    parser.add_argument("--report-file", help="报告输出路径，默认输出到标准输出")
+    return parser
+
+
+def _report_row(
+    item: ItemRecord,
+    plan_item: RenamePlanItem | None,
+    result: CommitRenameItemResult | None,
+) -> dict[str, Any]:
+    return {
+        "source_path": item.source_path,
+        "page": item.page,
+        "status": item.status,
+        "failure_reason": item.failure_reason,
+        "invoice_date": item.invoice_date,
+        "item_name": item.item_name,
+        "amount": item.amount,
+        "category": item.category,
+        "duplicate_of": item.duplicate_of,
+        "target_path": plan_item.target_path if plan_item else None,
+        "action": plan_item.action if plan_item else None,
+        "reason": plan_item.reason if plan_item else None,
+        "result": result.result if result else None,
+        "message": result.message if result else None,
+    }
+
+
+def _write_report(rows: list[dict[str, Any]], fmt: str, stream: TextIO) -> None:
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+        return
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False))
+        stream.write("\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+
+    files = collect_invoice_files(args.paths)
+    if not files:
+        print("No supported invoice files found", file=sys.stderr)
+        return EXIT_NO_FILES
+
+    settings_data = load_runtime_settings()
+    if args.model:
+        settings_data["siliconflow_model"] = args.model
+    pipeline = new_pipeline(settings_data, api_key_override=args.api_key)
+    if not pipeline.cloud_client.is_configured and not all(is_structured(path) for path in files):
+        print("SILICONFLOW_API_KEY is not configured", file=sys.stderr)
+        return EXIT_NOT_CONFIGURED
+
+    index = open_duplicate_index()
+    items = new_items(files, index, prewarm=False, split_mode=args.split_pdf)
+    try:
+        asyncio.run(
+            run_recognition(
+                items,
+                pipeline,
+                dict(settings_data["category_mapping"]),
+                index,
+                concurrency=max(args.workers, 1),
+                deadline_seconds=args.deadline,
+                item_timeout_seconds=args.item_timeout,
+            )
+        )
+    finally:
+        shutdown_render_pool()
+    apply_name_preview(items, template=args.template or str(settings_data["filename_template"]))
+    plan = build_rename_plan(
+        items,
+        page_output=settings.pdf_split_output,
+        target_root=Path(args.output_dir).resolve() if args.output_dir else None,
+    )
+    results = [] if args.dry_run else execute_rename_plan(plan)
+
+    plan_by_id = {plan_item.item_id: plan_item for plan_item in plan}
+    result_by_id = {result.item_id: result for result in results}
+    rows = [_report_row(item, plan_by_id.get(item.id), result_by_id.get(item.id)) for item in items]
+    if args.report_file:
+        with open(args.report_file, "w", encoding="utf-8", newline="") as stream:
+            _write_report(rows, args.report, stream)
+    else:
+        _write_report(rows, args.report, sys.stdout)
+
+    failed = sum(1 for item in items if item.status in {"failed", "interrupted"})
+    failed += sum(1 for result in results if result.result == "failed")
+    print(
+        f"total={len(items)} recognized={sum(1 for item in items if item.status == 'ok')} "
+        f"renamed={sum(1 for result in results if result.result == 'renamed')} failed={failed}",
+        file=sys.stderr,
+    )
+    return EXIT_ITEM_FAILURES if failed else EXIT_OK
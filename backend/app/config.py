@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 from pydantic import Field
@@ -7,6 +8,8 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
+# 默认留一个核给 API 和事件循环，最多 4 个渲染进程
+DEFAULT_RENDER_WORKERS = min(4, max((os.cpu_count() or 1) - 1, 0))
 
 
 class Settings(BaseSettings):
@@ -24,6 +27,36 @@ class Settings(BaseSettings):
 
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
 
+    app_data_dir: Path = Field(default=ROOT_DIR / ".appdata", alias="APP_DATA_DIR")
+    recognize_concurrency: int = Field(default=8, alias="RECOGNIZE_CONCURRENCY")
+    http_max_connections: int = Field(default=64, alias="HTTP_MAX_CONNECTIONS")
+    recognize_item_timeout: float = Field(default=45.0, alias="RECOGNIZE_ITEM_TIMEOUT")
+    ocr_roi_crop: bool = Field(default=False, alias="OCR_ROI_CROP")
+    ocr_streaming: bool = Field(default=False, alias="OCR_STREAMING")
+    ocr_qr_decode: bool = Field(default=True, alias="OCR_QR_DECODE")
+    ocr_cassette_dir: Path | None = Field(default=None, alias="OCR_CASSETTE_DIR")
+    image_max_edge: int = Field(default=2048, alias="IMAGE_MAX_EDGE")
+    image_max_bytes: int = Field(default=1_500_000, alias="IMAGE_MAX_BYTES")
+    image_enhance: bool = Field(default=False, alias="IMAGE_ENHANCE")
+    pdf_split_mode: str = Field(default="off", alias="PDF_SPLIT_MODE")
+    pdf_split_output: str = Field(default="extract", alias="PDF_SPLIT_OUTPUT")
+    render_workers: int = Field(default=DEFAULT_RENDER_WORKERS, alias="RENDER_WORKERS")
+    payload_cache_bytes: int = Field(default=256 * 1024 * 1024, alias="PAYLOAD_CACHE_BYTES")
+    preview_cache_bytes: int = Field(default=512 * 1024 * 1024, alias="PREVIEW_CACHE_BYTES")
+    render_cache_bytes: int = Field(default=1024 * 1024 * 1024, alias="RENDER_CACHE_BYTES")
+    duplicate_index_enabled: bool = Field(default=True, alias="DUPLICATE_INDEX_ENABLED")
+    watch_settle_seconds: float = Field(default=2.0, alias="WATCH_SETTLE_SECONDS")
+    watch_poll_interval: float = Field(default=2.0, alias="WATCH_POLL_INTERVAL")
+    compress_min_bytes: int = Field(default=16 * 1024, alias="COMPRESS_MIN_BYTES")
+    profiling_enabled: bool = Field(default=False, alias="PROFILING_ENABLED")
+    task_ttl_seconds: int = Field(default=7 * 24 * 3600, alias="TASK_TTL_SECONDS")
+    task_max_items: int = Field(default=1_000_000, alias="TASK_MAX_ITEMS")
+    task_max_bytes: int = Field(default=512 * 1024 * 1024, alias="TASK_MAX_BYTES")
+    job_queue_enabled: bool = Field(default=False, alias="JOB_QUEUE_ENABLED")
+    job_visibility_timeout: float = Field(default=300.0, alias="JOB_VISIBILITY_TIMEOUT")
+    job_max_attempts: int = Field(default=3, alias="JOB_MAX_ATTEMPTS")
+    job_result_poll_interval: float = Field(default=1.0, alias="JOB_RESULT_POLL_INTERVAL")
+
     model_config = SettingsConfigDict(
         env_file=str(ROOT_DIR / ".env"),
         env_file_encoding="utf-8",
@@ -1,11 +1,27 @@
 from __future__ import annotations
 
+from app import startup
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import replace
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import TypeAdapter, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
 
 from app.schemas import (
     ClearItemsRequest,
@@ -15,27 +31,87 @@ from app.schemas import (
     CommitRenameRequest,
     CommitRenameResponse,
     ImportRequest,
-    InvoiceItem,
     InvoicePatchRequest,
+    InvoiceSyncPatch,
+    LiveOp,
+    LivePatchOp,
+    LiveSyncOp,
     PreviewRequest,
+    ReadinessState,
     RecognizeRequest,
     RemoveItemsRequest,
     SettingsResponse,
     SettingsUpdateRequest,
     SyncItemsRequest,
     TaskState,
+    TaskStoreStats,
     TaskSummary,
+    WatchRequest,
+    WatchState,
 )
+from app.records import ItemRecord, TaskRecord
+from app.serialization import model_response
 from app.services.importer import collect_invoice_files
+from app.services.jobs import RESULT_FIELDS
+from app.services.live import LiveSyncHub
 from app.services.naming import apply_name_preview, build_rename_plan
-from app.services.ocr.pipeline import OcrPipeline
+from app.services.ocr.render_pool import shutdown_render_pool
+from app.services.preview import get_preview, normalize_preview_size, preview_key, schedule_preview_prefetch
 from app.services.rename import execute_rename_plan
 from app.services.settings_store import load_runtime_settings, save_runtime_settings
+from app.services.workflow import new_items, new_pipeline, open_duplicate_index, open_job_queue, run_recognition
 from app.storage import InMemoryTaskStore
 
+if TYPE_CHECKING:
+    import httpx
+
+    from app.services.watcher import FolderWatcher
+
+
+logger = logging.getLogger(__name__)
+
+http_client: httpx.AsyncClient | None = None
+
 
-app = FastAPI(title="Invoice Smart Rename API", version="0.1.0")
-store = InMemoryTaskStore()
+def _http_client() -> httpx.AsyncClient:
+    # 首次识别时才导入 httpx 并建立共享连接池，不拖慢启动
+    global http_client
+    if http_client is None:
+        import httpx
+
+        # 每个识别请求各有 RECOGNIZE_CONCURRENCY 的并发上限，连接池按进程总量单独设置，
+        # 否则多个请求同时识别时会在取连接处排队直至 PoolTimeout
+        limits = httpx.Limits(
+            max_connections=max(settings.http_max_connections, settings.recognize_concurrency),
+            max_keepalive_connections=settings.recognize_concurrency,
+        )
+        http_client = httpx.AsyncClient(limits=limits)
+    return http_client
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    global http_client
+    startup.mark_ready()
+    result_loop = asyncio.create_task(_publish_job_results()) if job_queue is not None else None
+    try:
+        yield
+    finally:
+        if result_loop is not None:
+            result_loop.cancel()
+        if http_client is not None:
+            await http_client.aclose()
+            http_client = None
+        shutdown_render_pool()
+
+
+app = FastAPI(title="Invoice Smart Rename API", version="0.1.0", lifespan=lifespan)
+store = InMemoryTaskStore(
+    settings.app_data_dir / "tasks",
+    ttl_seconds=settings.task_ttl_seconds,
+    max_items=settings.task_max_items,
+    max_bytes=settings.task_max_bytes,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -43,8 +119,26 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id", "ETag"],
 )
 
+duplicate_index = open_duplicate_index()
+job_queue = open_job_queue() if settings.job_queue_enabled else None
+
+live_hub = LiveSyncHub()
+live_op_adapter: TypeAdapter[LiveOp] = TypeAdapter(LiveOp)
+
+watches: dict[str, tuple[WatchState, FolderWatcher]] = {}
+watches_lock = threading.Lock()
+
+app.add_middleware(GZipMiddleware, minimum_size=settings.compress_min_bytes)
+
+PROFILE_DIR = settings.app_data_dir / "profiles"
+if settings.profiling_enabled:
+    from app.services.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware, output_dir=PROFILE_DIR)
+
 
 def _utcnow() -> datetime:
     return datetime.utcnow()
@@ -65,54 +159,183 @@ def _to_settings_response(data: dict) -> SettingsResponse:
     )
 
 
-def _new_pipeline(settings_data: dict, *, api_key_override: str | None = None) -> OcrPipeline:
-    api_key = (api_key_override or "").strip() or str(settings_data["siliconflow_api_key"])
-    return OcrPipeline(
-        base_url=str(settings_data["siliconflow_base_url"]),
-        api_key=api_key,
-        model=str(settings_data["siliconflow_model"]),
-    )
-
-
-def _save_task(task: TaskState) -> TaskState:
-    task.updated_at = _utcnow()
-    task.summary = _build_summary(task.items)
-    store.save_task(task)
+def _save_task(task: TaskRecord) -> TaskRecord:
+    since, base_version = task.updated_at, task.version
+    task.updated_at = time.time()
+    task.version += 1
+    task.summary = _build_summary(task.items, queued=job_queue.active_count(task.id) if job_queue else 0)
+    if not store.save_task(task):
+        # 处理期间任务已被删除
+        raise HTTPException(status_code=404, detail=f"Task not found: {task.id}")
+    live_hub.publish(task, since=since, base_version=base_version)
     return task
 
 
-def _build_summary(items: list[InvoiceItem]) -> TaskSummary:
-    summary = TaskSummary(total=len(items))
+def _build_summary(items: list[ItemRecord], queued: int = 0) -> TaskSummary:
+    # 局部计数后一次性构造，避免逐条走 pydantic 的属性赋值
+    pending = ok = failed = interrupted = conflict = rename_ready = renamed = skipped = duplicate = 0
     for item in items:
-        if item.status == "pending":
-            summary.pending += 1
-        elif item.status == "ok":
-            summary.ok += 1
-        elif item.status == "failed":
-            summary.failed += 1
+        status = item.status
+        if status == "pending":
+            pending += 1
+        elif status == "ok":
+            ok += 1
+        elif status == "failed":
+            failed += 1
+        elif status == "interrupted":
+            interrupted += 1
 
         if item.conflict_type != "none":
-            summary.conflict += 1
+            conflict += 1
         if item.action == "rename":
-            summary.rename_ready += 1
-        if item.result == "renamed":
-            summary.renamed += 1
-        if item.result == "skipped":
-            summary.skipped += 1
-    return summary
+            rename_ready += 1
+        result = item.result
+        if result == "renamed":
+            renamed += 1
+        elif result == "skipped":
+            skipped += 1
+        if item.duplicate_kind != "none":
+            duplicate += 1
+    return TaskSummary(
+        total=len(items),
+        pending=pending,
+        ok=ok,
+        failed=failed,
+        conflict=conflict,
+        rename_ready=rename_ready,
+        renamed=renamed,
+        skipped=skipped,
+        duplicate=duplicate,
+        queued=queued,
+        interrupted=interrupted,
+    )
 
 
-def _must_task(task_id: str) -> TaskState:
-    task = store.get_task(task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
-    return task
+def _must_task(task_id: str) -> TaskRecord:
+    with store.locked(task_id):
+        task = store.get_task(task_id)
+        if not task:
+            raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
+        if _apply_job_results(task):
+            # 回写结果立即发布，调用方随后校验失败也不会留下未保存的改动
+            _save_task(task)
+        return task
 
 
-def _item_index(task: TaskState) -> dict[str, InvoiceItem]:
+@contextmanager
+def _editing(task_id: str) -> Iterator[TaskRecord]:
+    """Hold the task lock across a handler's read-modify-save.
+
+    Handlers validate their input before mutating, so an HTTP error leaves
+    the record as it was.
+    """
+    with store.locked(task_id):
+        yield _must_task(task_id)
+
+
+def _apply_job_results(task: TaskRecord) -> bool:
+    if job_queue is None:
+        return False
+    results = job_queue.take_results(task.id)
+    if not results:
+        return False
+    index = _item_index(task)
+    for result in results:
+        item = index.get(result.item_id)
+        if item is None:
+            continue
+        if result.dead:
+            item.update({"status": "failed", "failure_reason": "worker_failed"})
+        else:
+            item.update(result.values)
+        item.touch()
+    apply_name_preview(task.items, template=task.template)
+    return True
+
+
+def _collect_job_results() -> None:
+    if job_queue is None:
+        return
+    for task_id in job_queue.finished_tasks():
+        with store.locked(task_id):
+            task = store.get_task(task_id)
+            if task is None:
+                # 任务已删除或过期，结果无人认领
+                job_queue.drop_task(task_id)
+                continue
+            if _apply_job_results(task):
+                try:
+                    _save_task(task)
+                except HTTPException:
+                    # 合并期间任务被删除
+                    continue
+
+
+async def _publish_job_results() -> None:
+    # worker 进程只写队列：定期合并结果并经 _save_task 推送，实时通道和轮询界面不必等到有人读取任务
+    while True:
+        await asyncio.sleep(settings.job_result_poll_interval)
+        try:
+            await run_in_threadpool(_collect_job_results)
+        except Exception:
+            logger.exception("Failed to merge worker results")
+
+
+def _merge_recognized(task: TaskRecord, recognized: list[ItemRecord]) -> None:
+    # 识别在条目副本上进行，完成后只回写识别产生的字段，期间界面的其他改动得以保留
+    index = _item_index(task)
+    for copy in recognized:
+        item = index.get(copy.id)
+        if item is None:
+            continue
+        item.update({name: getattr(copy, name) for name in RESULT_FIELDS})
+        item.updated_at = copy.updated_at
+    apply_name_preview(task.items, template=task.template)
+
+
+def _item_index(task: TaskRecord) -> dict[str, ItemRecord]:
     return {item.id: item for item in task.items}
 
 
+def _ingest_watched_files(watch_id: str, files: list[Path]) -> list[Path]:
+    """Add ``files`` to the watch's task; returns the files that were not taken and should be retried."""
+    with watches_lock:
+        entry = watches.get(watch_id)
+    if entry is None:
+        return files
+    state, _ = entry
+    with store.locked(state.task_id):
+        task = store.get_task(state.task_id)
+        if task is None:
+            return files
+        known_paths = {item.source_path for item in task.items}
+    added = new_items([path.resolve() for path in files if str(path.resolve()) not in known_paths], duplicate_index)
+    if not added:
+        return []
+    if state.auto_recognize and job_queue is None:
+        settings_data = _load_settings()
+        # 监控线程内没有事件循环，单独起一个循环跑本批识别
+        asyncio.run(
+            run_recognition(
+                added,
+                new_pipeline(settings_data),
+                dict(settings_data["category_mapping"]),
+                duplicate_index,
+            )
+        )
+
+    # 识别期间界面可能已改动任务，合并时以最新状态为准
+    with _editing(state.task_id) as task:
+        known_paths = {item.source_path for item in task.items}
+        task.items.extend(item for item in added if item.source_path not in known_paths)
+        apply_name_preview(task.items, template=task.template)
+        if state.auto_recognize and job_queue is not None:
+            job_queue.enqueue(task.id, added)
+        _save_task(task)
+    state.ingested += len(added)
+    return []
+
+
 @app.get("/api/health")
 def health() -> dict:
     settings_data = _load_settings()
@@ -125,174 +348,444 @@ def health() -> dict:
     }
 
 
+@app.get("/api/ready", response_model=ReadinessState)
+def ready() -> ReadinessState:
+    return startup.readiness()
+
+
+@app.get("/api/profiles")
+def get_profiles() -> list[dict]:
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    from app.services.profiling import list_profiles
+
+    return list_profiles(PROFILE_DIR)
+
+
+@app.get("/api/profiles/{profile_id}")
+def download_profile(profile_id: str, output_format: str = Query("pstats", alias="format")):
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    from app.services.profiling import profile_path, render_profile_text
+
+    path = profile_path(PROFILE_DIR, profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"Profile not found: {profile_id}")
+    if output_format == "text":
+        return PlainTextResponse(render_profile_text(path))
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
 @app.post("/api/import", response_model=TaskState)
-def import_invoices(request: ImportRequest) -> TaskState:
+def import_invoices(request: ImportRequest, http_request: Request) -> Response:
     files = collect_invoice_files(request.paths)
     if not files:
         raise HTTPException(status_code=400, detail="No supported invoice files found")
 
     settings_data = _load_settings()
-    task = TaskState(id=str(uuid4()), template=str(settings_data["filename_template"]))
-    task.items = [
-        InvoiceItem(
-            source_path=str(file_path),
-            old_name=file_path.name,
-            file_ext=file_path.suffix.lower(),
-        )
-        for file_path in files
-    ]
-    return _save_task(task)
+    task = TaskRecord(id=str(uuid4()), template=str(settings_data["filename_template"]))
+    task.items = new_items(files, duplicate_index, split_mode=request.split_pdf)
+    return model_response(http_request, _save_task(task).to_model())
+
+
+@app.get("/api/tasks", response_model=TaskStoreStats)
+def list_tasks() -> TaskStoreStats:
+    return store.stats()
 
 
 @app.get("/api/tasks/{task_id}", response_model=TaskState)
-def get_task(task_id: str) -> TaskState:
-    task = _must_task(task_id)
-    return _save_task(task)
+def get_task(task_id: str, http_request: Request) -> Response:
+    # 只读：不保存、不递增版本；合入的队列结果已在 _must_task 中保存并推送
+    with _editing(task_id) as task:
+        return model_response(http_request, task.to_model())
+
+
+@app.delete("/api/tasks/{task_id}", status_code=204)
+def delete_task(task_id: str) -> Response:
+    with watches_lock:
+        attached = [watch_id for watch_id, (state, _) in watches.items() if state.task_id == task_id]
+        stopped = [watches.pop(watch_id)[1] for watch_id in attached]
+    for watcher in stopped:
+        watcher.stop()
+    if not store.delete_task(task_id):
+        raise HTTPException(status_code=404, detail=f"Task not found: {task_id}")
+    live_hub.close_task(task_id)
+    if job_queue is not None:
+        job_queue.drop_task(task_id)
+    return Response(status_code=204)
+
+
+@app.get("/api/tasks/{task_id}/items/{item_id}/preview")
+def get_item_preview(
+    task_id: str,
+    item_id: str,
+    request: Request,
+    size: int = 1024,
+    page: int | None = None,
+    prefetch: int = 0,
+) -> Response:
+    with _editing(task_id) as task:
+        position = next((index for index, item in enumerate(task.items) if item.id == item_id), None)
+        if position is None:
+            raise HTTPException(status_code=404, detail=f"Item not found: {item_id}")
+        item = task.items[position]
+        upcoming = [(Path(other.source_path), other.page or 1) for other in task.items[position + 1 : position + 1 + prefetch]]
+
+    size = normalize_preview_size(size)
+    page = max(page or item.page or 1, 1)
+    if upcoming:
+        schedule_preview_prefetch(upcoming, size=size)
+
+    file_path = Path(item.source_path)
+    try:
+        etag = f'"{preview_key(file_path, page=page, size=size)}"'
+    except OSError:
+        raise HTTPException(status_code=404, detail="source_not_found")
+    cache_headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cache_headers)
+
+    data = get_preview(file_path, page=page, size=size)
+    if data is None:
+        raise HTTPException(status_code=415, detail="unsupported_preview_format")
+    return Response(content=data, media_type="image/jpeg", headers=cache_headers)
+
+
+def _enqueue_recognition(request: RecognizeRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        target_ids = set(request.item_ids or [item.id for item in task.items])
+        targets = [item for item in task.items if item.id in target_ids]
+        for item in targets:
+            item.update({"status": "pending", "failure_reason": None})
+            item.touch()
+        job_queue.enqueue(task.id, targets)
+        apply_name_preview(task.items, template=task.template)
+        return model_response(http_request, _save_task(task).to_model())
 
 
-@app.post("/api/recognize", response_model=TaskState)
-def recognize_items(request: RecognizeRequest) -> TaskState:
-    task = _must_task(request.task_id)
-    target_ids = set(request.item_ids or [item.id for item in task.items])
-    settings_data = _load_settings()
-    mapping = dict(settings_data["category_mapping"])
-    pipeline = _new_pipeline(settings_data, api_key_override=request.session_api_key)
+def _recognition_copies(request: RecognizeRequest) -> list[ItemRecord]:
+    with _editing(request.task_id) as task:
+        target_ids = set(request.item_ids or [item.id for item in task.items])
+        return [replace(item) for item in task.items if item.id in target_ids]
 
-    for item in task.items:
-        if item.id not in target_ids:
-            continue
-        updated = pipeline.recognize_item(item=item, category_mapping=mapping)
-        updated.updated_at = _utcnow()
 
-    apply_name_preview(task.items, template=task.template)
-    return _save_task(task)
+def _finish_recognition(request: RecognizeRequest, recognized: list[ItemRecord], http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        _merge_recognized(task, recognized)
+        return model_response(http_request, _save_task(task).to_model())
+
+
+@app.post("/api/recognize", response_model=TaskState)
+async def recognize_items(request: RecognizeRequest, http_request: Request) -> Response:
+    # 队列 worker 拿不到会话级 Key，带临时 Key 的请求仍在本进程内识别
+    if job_queue is not None and not request.session_api_key:
+        return await run_in_threadpool(_enqueue_recognition, request, http_request)
+
+    recognized = await run_in_threadpool(_recognition_copies, request)
+    settings_data = await run_in_threadpool(_load_settings)
+    mapping = dict(settings_data["category_mapping"])
+    pipeline = new_pipeline(settings_data, api_key_override=request.session_api_key, http_client=_http_client())
+
+    with store.pinned(request.task_id):
+        await run_recognition(
+            recognized,
+            pipeline,
+            mapping,
+            duplicate_index,
+            deadline_seconds=request.deadline_seconds,
+            item_timeout_seconds=request.item_timeout_seconds,
+        )
+    return await run_in_threadpool(_finish_recognition, request, recognized, http_request)
 
 
 @app.post("/api/preview-names", response_model=TaskState)
-def preview_names(request: PreviewRequest) -> TaskState:
-    task = _must_task(request.task_id)
-    template = request.template or task.template
-    task.template = template
+def preview_names(request: PreviewRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        template = request.template or task.template
+        task.template = template
 
-    target_ids = set(request.item_ids or [item.id for item in task.items])
-    target_items = [item for item in task.items if item.id in target_ids]
-    apply_name_preview(target_items, template=template)
-    for item in target_items:
-        item.updated_at = _utcnow()
-    return _save_task(task)
+        target_ids = set(request.item_ids or [item.id for item in task.items])
+        target_items = [item for item in task.items if item.id in target_ids]
+        apply_name_preview(target_items, template=template)
+        for item in target_items:
+            item.touch()
+        return model_response(http_request, _save_task(task).to_model())
 
 
 @app.post("/api/commit-plan", response_model=CommitPlanResponse)
-def commit_plan(request: CommitPlanRequest) -> CommitPlanResponse:
-    task = _must_task(request.task_id)
-    plan = build_rename_plan(task.items, set(request.item_ids) if request.item_ids else None)
+def commit_plan(request: CommitPlanRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        plan = build_rename_plan(
+            task.items,
+            set(request.item_ids) if request.item_ids else None,
+            page_output=settings.pdf_split_output,
+        )
 
-    index = _item_index(task)
-    for plan_item in plan:
-        item = index[plan_item.item_id]
-        item.action = plan_item.action
-        item.conflict_type = plan_item.conflict_type
-        item.updated_at = _utcnow()
+        index = _item_index(task)
+        for plan_item in plan:
+            item = index[plan_item.item_id]
+            item.action = plan_item.action
+            item.conflict_type = plan_item.conflict_type
+            item.touch()
 
-    _save_task(task)
-    return CommitPlanResponse(task_id=task.id, dry_run=request.dry_run, plan=plan)
+        _save_task(task)
+        return model_response(http_request, CommitPlanResponse(task_id=task.id, dry_run=request.dry_run, plan=plan))
 
 
 @app.post("/api/commit-rename", response_model=CommitRenameResponse)
-def commit_rename(request: CommitRenameRequest) -> CommitRenameResponse:
-    task = _must_task(request.task_id)
-    plan = build_rename_plan(task.items, set(request.item_ids) if request.item_ids else None)
-    results = execute_rename_plan(plan)
-
-    index = _item_index(task)
-    for result in results:
-        item = index[result.item_id]
-        item.result = result.result
-        item.result_message = result.message
-        if result.result == "renamed":
-            item.source_path = result.target_path
-            item.old_name = Path(result.target_path).name
-        item.updated_at = _utcnow()
-
-    _save_task(task)
-    return CommitRenameResponse(task_id=task.id, results=results)
+def commit_rename(request: CommitRenameRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        plan = build_rename_plan(
+            task.items,
+            set(request.item_ids) if request.item_ids else None,
+            page_output=settings.pdf_split_output,
+        )
+        results = execute_rename_plan(plan)
+
+        index = _item_index(task)
+        for result in results:
+            item = index[result.item_id]
+            item.result = result.result
+            item.result_message = result.message
+            if result.result == "renamed":
+                item.source_path = result.target_path
+                item.old_name = Path(result.target_path).name
+                item.page = None
+                item.page_count = 1
+                if duplicate_index and item.content_hash and item.duplicate_kind == "none":
+                    duplicate_index.update_path(item.content_hash, item.source_path)
+            item.touch()
+
+        _save_task(task)
+        return model_response(http_request, CommitRenameResponse(task_id=task.id, results=results))
 
 
 @app.post("/api/commit-results", response_model=CommitRenameResponse)
-def commit_results(request: CommitResultsSyncRequest) -> CommitRenameResponse:
-    task = _must_task(request.task_id)
-    index = _item_index(task)
-    for result in request.results:
-        if result.item_id not in index:
-            continue
-        item = index[result.item_id]
-        item.result = result.result
-        item.result_message = result.message
-        if result.result == "renamed":
-            item.source_path = result.target_path
-            item.old_name = Path(result.target_path).name
-        item.updated_at = _utcnow()
-
-    _save_task(task)
-    return CommitRenameResponse(task_id=task.id, results=request.results)
+def commit_results(request: CommitResultsSyncRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        index = _item_index(task)
+        for result in request.results:
+            if result.item_id not in index:
+                continue
+            item = index[result.item_id]
+            item.result = result.result
+            item.result_message = result.message
+            if result.result == "renamed":
+                item.source_path = result.target_path
+                item.old_name = Path(result.target_path).name
+                item.page = None
+                item.page_count = 1
+                if duplicate_index and item.content_hash and item.duplicate_kind == "none":
+                    duplicate_index.update_path(item.content_hash, item.source_path)
+            item.touch()
+
+        _save_task(task)
+        return model_response(http_request, CommitRenameResponse(task_id=task.id, results=request.results))
 
 
 @app.post("/api/sync-items", response_model=TaskState)
-def sync_items(request: SyncItemsRequest) -> TaskState:
-    task = _must_task(request.task_id)
-    if not request.items:
-        return _save_task(task)
+def sync_items(request: SyncItemsRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        if request.items:
+            _sync_items(task, request.items)
+        return model_response(http_request, _save_task(task).to_model())
+
 
+def _sync_items(task: TaskRecord, patches: list[InvoiceSyncPatch]) -> None:
     index = _item_index(task)
-    for patch in request.items:
+    for patch in patches:
         item = index.get(patch.item_id)
         if not item:
             continue
-        item.invoice_date = patch.invoice_date
-        item.amount = patch.amount
-        item.category = patch.category
-        item.updated_at = _utcnow()
-
+        item.update({"invoice_date": patch.invoice_date, "amount": patch.amount, "category": patch.category})
+        item.touch()
     apply_name_preview(task.items, template=task.template)
-    return _save_task(task)
 
 
 @app.patch("/api/items/{task_id}/{item_id}", response_model=TaskState)
-def patch_item(task_id: str, item_id: str, request: InvoicePatchRequest) -> TaskState:
-    task = _must_task(task_id)
+def patch_item(task_id: str, item_id: str, request: InvoicePatchRequest, http_request: Request) -> Response:
+    with _editing(task_id) as task:
+        _patch_item(task, item_id, request)
+        return model_response(http_request, _save_task(task).to_model())
+
+
+def _patch_item(task: TaskRecord, item_id: str, request: InvoicePatchRequest) -> None:
     index = _item_index(task)
     if item_id not in index:
         raise HTTPException(status_code=404, detail=f"Item not found: {item_id}")
     item = index[item_id]
     patch = request.model_dump(exclude_unset=True)
-    for key, value in patch.items():
-        setattr(item, key, value)
-    item.updated_at = _utcnow()
-    preview_related_fields = {"invoice_date", "category", "amount", "manual_name", "item_name", "status"}
+    item.update(patch)
+    item.touch()
+    if patch.get("duplicate_kind") == "none":
+        item.duplicate_of = None
+    preview_related_fields = {
+        "invoice_date",
+        "category",
+        "amount",
+        "manual_name",
+        "item_name",
+        "status",
+        "duplicate_kind",
+    }
     if any(field in patch for field in preview_related_fields):
         apply_name_preview(task.items, template=task.template)
-    return _save_task(task)
+
+
+def _apply_live_op(task_id: str, op: LivePatchOp | LiveSyncOp) -> int:
+    with _editing(task_id) as task:
+        if isinstance(op, LivePatchOp):
+            _patch_item(task, op.item_id, op.fields)
+        else:
+            _sync_items(task, op.items)
+        return _save_task(task).version
+
+
+def _task_json(task_id: str) -> str:
+    with _editing(task_id) as task:
+        return task.to_model().model_dump_json()
+
+
+def _raw_op_id(raw: str) -> str | None:
+    try:
+        op_id = json.loads(raw).get("op_id")
+    except (ValueError, AttributeError):
+        return None
+    return op_id if isinstance(op_id, str) else None
+
+
+@app.websocket("/api/tasks/{task_id}/live")
+async def task_live(websocket: WebSocket, task_id: str) -> None:
+    """Live-sync channel: accepts edit ops and pushes a diff after every task save.
+
+    The first message is a full snapshot. Each op is answered with an ``ack``
+    carrying the resulting version (or an ``error``); the diff it caused is
+    broadcast to every subscriber, the sender included.
+    """
+    await websocket.accept()
+    task = await run_in_threadpool(store.get_task, task_id)
+    if task is None:
+        await websocket.close(code=4404, reason="task_not_found")
+        return
+
+    subscription = live_hub.subscribe(task, asyncio.get_running_loop())
+
+    def send(message: dict) -> None:
+        # 所有下行消息经同一队列按序发出，ack 一定排在它引起的 diff 之后
+        subscription.queue.put_nowait(json.dumps(message, ensure_ascii=False))
+
+    async def send_snapshot(op_id: str | None = None) -> None:
+        # 直接拼接已序列化的任务，避免对整份任务做二次 JSON 编码
+        body = await run_in_threadpool(_task_json, task_id)
+        subscription.queue.put_nowait(f'{{"type":"snapshot","op_id":{json.dumps(op_id)},"task":{body}}}')
+
+    async def forward() -> None:
+        while True:
+            message = await subscription.queue.get()
+            await websocket.send_text(message)
+            if message.startswith('{"type":"deleted"'):
+                await websocket.close(code=4404, reason="task_deleted")
+                return
+
+    forwarder = asyncio.create_task(forward())
+    try:
+        await send_snapshot()
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                op = live_op_adapter.validate_json(raw)
+            except ValidationError as exc:
+                # 带回 op_id，客户端据此结束等待中的请求（如拒绝显式 null 的修改）
+                detail = exc.errors(include_url=False, include_context=False)
+                send({"type": "error", "op_id": _raw_op_id(raw), "detail": detail})
+                continue
+            if op.op == "snapshot":
+                await send_snapshot(op.op_id)
+                continue
+            try:
+                version = await run_in_threadpool(_apply_live_op, task_id, op)
+            except HTTPException as exc:
+                send({"type": "error", "op_id": op.op_id, "detail": exc.detail})
+                continue
+            send({"type": "ack", "op_id": op.op_id, "version": version})
+    except (WebSocketDisconnect, HTTPException):
+        pass
+    finally:
+        live_hub.unsubscribe(subscription)
+        forwarder.cancel()
 
 
 @app.post("/api/remove-items", response_model=TaskState)
-def remove_items(request: RemoveItemsRequest) -> TaskState:
-    task = _must_task(request.task_id)
-    if not request.item_ids:
-        return _save_task(task)
+def remove_items(request: RemoveItemsRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        if not request.item_ids:
+            return model_response(http_request, _save_task(task).to_model())
 
-    target_ids = set(request.item_ids)
-    task.items = [item for item in task.items if item.id not in target_ids]
-    apply_name_preview(task.items, template=task.template)
-    for item in task.items:
-        item.updated_at = _utcnow()
-    return _save_task(task)
+        target_ids = set(request.item_ids)
+        task.items = [item for item in task.items if item.id not in target_ids]
+        apply_name_preview(task.items, template=task.template)
+        return model_response(http_request, _save_task(task).to_model())
 
 
 @app.post("/api/clear-items", response_model=TaskState)
-def clear_items(request: ClearItemsRequest) -> TaskState:
-    task = _must_task(request.task_id)
-    task.items = []
-    return _save_task(task)
+def clear_items(request: ClearItemsRequest, http_request: Request) -> Response:
+    with _editing(request.task_id) as task:
+        task.items = []
+        return model_response(http_request, _save_task(task).to_model())
+
+
+@app.post("/api/watches", response_model=WatchState)
+def start_watch(request: WatchRequest) -> WatchState:
+    root = Path(request.path).expanduser()
+    if not root.is_dir():
+        raise HTTPException(status_code=400, detail=f"Not a directory: {request.path}")
+
+    if request.task_id:
+        task = _must_task(request.task_id)
+    else:
+        task = _save_task(TaskRecord(id=str(uuid4()), template=str(_load_settings()["filename_template"])))
+
+    from app.services.watcher import FolderWatcher
+
+    watch_id = str(uuid4())
+    watcher = FolderWatcher(
+        root.resolve(),
+        lambda files: _ingest_watched_files(watch_id, files),
+        settle_seconds=settings.watch_settle_seconds,
+        poll_interval=settings.watch_poll_interval,
+        include_existing=request.include_existing,
+    )
+    state = WatchState(
+        id=watch_id,
+        path=str(root.resolve()),
+        task_id=task.id,
+        auto_recognize=request.auto_recognize,
+        backend="pending",
+    )
+    with watches_lock:
+        watches[watch_id] = (state, watcher)
+    store.pin(task.id)
+    watcher.start()
+    state.backend = watcher.backend
+    return state
+
+
+@app.get("/api/watches", response_model=list[WatchState])
+def list_watches() -> list[WatchState]:
+    with watches_lock:
+        return [state for state, _ in watches.values()]
+
+
+@app.delete("/api/watches/{watch_id}", response_model=WatchState)
+def stop_watch(watch_id: str) -> WatchState:
+    with watches_lock:
+        entry = watches.pop(watch_id, None)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Watch not found: {watch_id}")
+    state, watcher = entry
+    watcher.stop()
+    store.unpin(state.task_id)
+    return state
 
 
 @app.get("/api/settings", response_model=SettingsResponse)
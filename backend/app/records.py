@@ -0,0 +1,155 @@
+"""Compact in-memory task and item records.
+
+Handlers, the recognition workflow and the CLI mutate these slotted records in
+place; pydantic models are only built when a task crosses the API boundary.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+from uuid import uuid4
+
+from app.schemas import InvoiceItem, TaskState, TaskSummary
+
+
+# 取值有限的字段统一驻留，十万级条目共享同一批字符串对象
+INTERNED_FIELDS = frozenset(
+    {"file_ext", "category", "status", "failure_reason", "action", "conflict_type", "result", "duplicate_kind"}
+)
+
+
+# 各条目独有（未驻留）的字符串字段，用于估算内存占用
+OWNED_STRING_FIELDS = (
+    "id",
+    "source_path",
+    "old_name",
+    "content_hash",
+    "invoice_date",
+    "item_name",
+    "amount",
+    "vendor_name",
+    "extracted_text",
+    "suggested_name",
+    "manual_name",
+    "result_message",
+    "duplicate_of",
+)
+
+
+def _intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def to_timestamp(value: datetime) -> float:
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+@dataclass(slots=True, eq=False)
+class ItemRecord:
+    source_path: str
+    old_name: str
+    file_ext: str
+    id: str = field(default_factory=lambda: str(uuid4()))
+    page: int | None = None
+    page_count: int = 1
+    content_hash: str | None = None
+
+    invoice_date: str | None = None
+    item_name: str | None = None
+    amount: str | None = None
+    category: str | None = None
+    vendor_name: str | None = None
+
+    extracted_text: str | None = None
+
+    status: str = "pending"
+    failure_reason: str | None = None
+
+    suggested_name: str | None = None
+    manual_name: str | None = None
+
+    selected: bool = True
+    action: str | None = None
+    conflict_type: str = "none"
+
+    result: str = "pending"
+    result_message: str | None = None
+
+    duplicate_kind: str = "none"
+    duplicate_of: str | None = None
+
+    # UTC epoch seconds; a float is a third of the size of a datetime
+    updated_at: float = field(default_factory=time.time)
+
+    def __post_init__(self) -> None:
+        self.file_ext = sys.intern(self.file_ext)
+
+    def touch(self) -> None:
+        self.updated_at = time.time()
+
+    def update(self, values: dict[str, Any]) -> None:
+        for key, value in values.items():
+            setattr(self, key, _intern(value) if key in INTERNED_FIELDS else value)
+
+    def estimate_bytes(self) -> int:
+        size = sys.getsizeof(self)
+        for name in OWNED_STRING_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                size += sys.getsizeof(value)
+        return size
+
+    def to_model(self) -> InvoiceItem:
+        data = {name: getattr(self, name) for name in InvoiceItem.model_fields}
+        data["updated_at"] = to_datetime(self.updated_at)
+        # 记录本身已保证字段合法，跳过校验
+        return InvoiceItem.model_construct(**data)
+
+    @classmethod
+    def from_model(cls, item: InvoiceItem) -> ItemRecord:
+        data = item.model_dump()
+        data["updated_at"] = to_timestamp(item.updated_at)
+        record = cls(source_path=data.pop("source_path"), old_name=data.pop("old_name"), file_ext=data.pop("file_ext"))
+        record.update(data)
+        return record
+
+
+@dataclass(slots=True, eq=False)
+class TaskRecord:
+    id: str
+    version: int = 0
+    template: str = "{date}-{category}-{amount}"
+    items: list[ItemRecord] = field(default_factory=list)
+    summary: TaskSummary = field(default_factory=TaskSummary)
+    created_at: float = field(default_factory=time.time)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_model(self) -> TaskState:
+        return TaskState.model_construct(
+            id=self.id,
+            version=self.version,
+            created_at=to_datetime(self.created_at),
+            updated_at=to_datetime(self.updated_at),
+            template=self.template,
+            summary=self.summary,
+            items=[item.to_model() for item in self.items],
+        )
+
+    @classmethod
+    def from_model(cls, task: TaskState) -> TaskRecord:
+        return cls(
+            id=task.id,
+            version=task.version,
+            template=task.template,
+            items=[ItemRecord.from_model(item) for item in task.items],
+            summary=task.summary,
+            created_at=to_timestamp(task.created_at),
+            updated_at=to_timestamp(task.updated_at),
+        )
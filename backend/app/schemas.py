@@ -1,16 +1,18 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Literal
+from typing import Annotated, Any, Literal, Union
 from uuid import uuid4
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
-InvoiceStatus = Literal["pending", "ok", "failed"]
+InvoiceStatus = Literal["pending", "ok", "failed", "interrupted"]
 RenameAction = Literal["rename", "skip", "manual_edit_required"]
-ConflictType = Literal["none", "same_name", "exists_other"]
+ConflictType = Literal["none", "same_name", "exists_other", "duplicate"]
+DuplicateKind = Literal["none", "content", "fields"]
 CommitResultStatus = Literal["pending", "renamed", "skipped", "failed"]
+PdfSplitMode = Literal["off", "auto", "pages"]
 
 
 def now_utc() -> datetime:
@@ -26,6 +28,9 @@ class TaskSummary(BaseModel):
     rename_ready: int = 0
     renamed: int = 0
     skipped: int = 0
+    duplicate: int = 0
+    queued: int = 0
+    interrupted: int = 0
 
 
 class InvoiceItem(BaseModel):
@@ -33,6 +38,10 @@ class InvoiceItem(BaseModel):
     source_path: str
     old_name: str
     file_ext: str
+    # 合并 PDF 拆分出的条目：起始页（从 1 开始）和页数；None 表示整个文件
+    page: int | None = None
+    page_count: int = 1
+    content_hash: str | None = None
 
     invoice_date: str | None = None
     item_name: str | None = None
@@ -55,11 +64,15 @@ class InvoiceItem(BaseModel):
     result: CommitResultStatus = "pending"
     result_message: str | None = None
 
+    duplicate_kind: DuplicateKind = "none"
+    duplicate_of: str | None = None
+
     updated_at: datetime = Field(default_factory=now_utc)
 
 
 class TaskState(BaseModel):
     id: str
+    version: int = 0
     created_at: datetime = Field(default_factory=now_utc)
     updated_at: datetime = Field(default_factory=now_utc)
     template: str = "{date}-{category}-{amount}"
@@ -67,14 +80,66 @@ class TaskState(BaseModel):
     items: list[InvoiceItem] = Field(default_factory=list)
 
 
+class TaskInfo(BaseModel):
+    id: str
+    template: str
+    created_at: datetime
+    updated_at: datetime
+    last_access_at: datetime
+    items: int
+    estimated_bytes: int
+    resident: bool
+    pinned: bool
+    summary: TaskSummary
+
+
+class TaskStoreStats(BaseModel):
+    resident_tasks: int
+    spilled_tasks: int
+    resident_items: int
+    resident_bytes: int
+    max_items: int
+    max_bytes: int
+    ttl_seconds: int
+    tasks: list[TaskInfo]
+
+
+class ReadinessState(BaseModel):
+    ready: bool
+    warm: bool
+    startup_ms: float | None = None
+    warmup_ms: float | None = None
+    warmup_modules: dict[str, float] = Field(default_factory=dict)
+
+
 class ImportRequest(BaseModel):
     paths: list[str]
+    split_pdf: PdfSplitMode | None = None
+
+
+class WatchRequest(BaseModel):
+    path: str
+    task_id: str | None = None
+    auto_recognize: bool = False
+    include_existing: bool = False
+
+
+class WatchState(BaseModel):
+    id: str
+    path: str
+    task_id: str
+    auto_recognize: bool
+    backend: str
+    ingested: int = 0
+    started_at: datetime = Field(default_factory=now_utc)
 
 
 class RecognizeRequest(BaseModel):
     task_id: str
     item_ids: list[str] | None = None
     session_api_key: str | None = None
+    deadline_seconds: float | None = Field(default=None, gt=0)
+    item_timeout_seconds: float | None = Field(default=None, gt=0)
 
 
 class PreviewRequest(BaseModel):
@@ -107,6 +172,8 @@ class RenamePlanItem(BaseModel):
     action: RenameAction
     conflict_type: ConflictType = "none"
     reason: str | None = None
+    page: int | None = None
+    page_count: int = 1
 
 
 class CommitPlanResponse(BaseModel):
@@ -158,6 +225,49 @@ class InvoicePatchRequest(BaseModel):
     vendor_name: str | None = None
     manual_name: str | None = None
     selected: bool | None = None
+    duplicate_kind: DuplicateKind | None = None
+
+    @field_validator("selected", "duplicate_kind")
+    @classmethod
+    def _reject_null(cls, value: Any) -> Any:
+        # 省略表示不修改；这两个字段在条目上不可为空，显式 null 直接拒绝
+        if value is None:
+            raise ValueError("must not be null")
+        return value
+
+
+class LivePatchOp(BaseModel):
+    op: Literal["patch"]
+    op_id: str | None = None
+    item_id: str
+    fields: InvoicePatchRequest
+
+
+class LiveSyncOp(BaseModel):
+    op: Literal["sync"]
+    op_id: str | None = None
+    items: list[InvoiceSyncPatch]
+
+
+class LiveSnapshotOp(BaseModel):
+    op: Literal["snapshot"]
+    op_id: str | None = None
+
+
+LiveOp = Annotated[Union[LivePatchOp, LiveSyncOp, LiveSnapshotOp], Field(discriminator="op")]
+
+
+class TaskDiff(BaseModel):
+    """Changes of one task save, broadcast to live-sync subscribers."""
+
+    type: Literal["diff"] = "diff"
+    task_id: str
+    version: int
+    base_version: int
+    template: str
+    summary: TaskSummary
+    items: list[InvoiceItem] = Field(default_factory=list)
+    removed: list[str] = Field(default_factory=list)
 
 
 class SettingsResponse(BaseModel):
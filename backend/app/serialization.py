@@ -0,0 +1,45 @@
+"""Response encoding negotiated from the Accept and Accept-Encoding headers."""
+from __future__ import annotations
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.config import settings
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+BROTLI_QUALITY = 4
+
+
+def model_response(request: Request, model: BaseModel) -> Response:
+    """Serialize a model we just built without re-validating it.
+
+    JSON goes straight through pydantic-core's serializer. MessagePack is
+    used when the client asks for it and ``msgpack`` is installed. Large
+    bodies are brotli-compressed here when accepted; gzip is left to
+    GZipMiddleware.
+    """
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        body = msgpack.packb(model.model_dump(mode="json"), use_bin_type=True)
+        media_type = "application/msgpack"
+    else:
+        body = model.model_dump_json().encode("utf-8")
+        media_type = "application/json"
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    accept_encoding = request.headers.get("accept-encoding", "")
+    if brotli is not None and len(body) >= settings.compress_min_bytes and "br" in accept_encoding:
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+        headers["Content-Encoding"] = "br"
+    return Response(content=body, media_type=media_type, headers=headers)
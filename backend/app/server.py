@@ -0,0 +1,43 @@
+"""Production entry point for the desktop sidecar: ``python -m app.server``.
+
+Unlike ``run_dev.py`` it runs without the reloader and its file watcher,
+and imports the app in-process so startup timing starts at interpreter boot.
+"""
+from __future__ import annotations
+
+from app import startup  # noqa: F401  记录启动起点，须先于其他模块导入
+
+import argparse
+import logging
+
+import uvicorn
+
+from app.config import settings
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.server", description="发票智能改名 API（生产模式）")
+    parser.add_argument("--host", default=settings.app_host, help="监听地址")
+    parser.add_argument("--port", type=int, default=settings.app_port, help="监听端口")
+    parser.add_argument("--access-log", action="store_true", help="输出访问日志（默认关闭）")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    logging.basicConfig(level=settings.log_level)
+
+    from app.main import app
+
+    uvicorn.run(
+        app,
+        host=args.host,
+        port=args.port,
+        log_level=settings.log_level.lower(),
+        access_log=args.access_log,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,35 @@
+"""Low-priority background work shared by prewarm and prefetch stages."""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+BACKGROUND_NICENESS = 10
+
+
+def _lower_thread_priority() -> None:
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), BACKGROUND_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+def _low_priority_executor(name: str) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix=name, initializer=_lower_thread_priority)
+
+
+# 预热和预取各用一个线程：大批量导入的预热可能排队很久，不能挡住用户马上要看的预览页
+_executor = _low_priority_executor("background")
+_prefetch_executor = _low_priority_executor("prefetch")
+
+
+def submit_background(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future[Any]:
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def submit_prefetch(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future[Any]:
+    """Like ``submit_background`` but on its own thread, ahead of queued prewarm work."""
+    return _prefetch_executor.submit(fn, *args, **kwargs)
@@ -0,0 +1,112 @@
+"""Byte-bounded on-disk LRU cache."""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from uuid import uuid4
+
+
+CACHE_KEY_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+RESCAN_SECONDS = 60.0
+
+
+class DiskLRUCache:
+    """Files under ``root`` keyed by a filesystem-safe name.
+
+    The recency index lives in memory and is rebuilt from file mtimes on
+    start-up; hits bump the mtime so the order survives restarts. Several
+    processes may share ``root``: a key missing from the index is still read
+    from disk, and writers rescan the directory every ``RESCAN_SECONDS`` so
+    files other processes added count towards ``max_bytes``.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: OrderedDict[str, int] | None = None
+        self._bytes = 0
+        self._scanned_at = 0.0
+
+    def _scan(self) -> tuple[OrderedDict[str, int], int]:
+        self.root.mkdir(parents=True, exist_ok=True)
+        entries: list[tuple[float, str, int]] = []
+        for entry in os.scandir(self.root):
+            try:
+                if not entry.is_file() or entry.name.endswith(".tmp"):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                # 其他进程刚好淘汰了这个文件
+                continue
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+        entries.sort()
+        return OrderedDict((name, size) for _, name, size in entries), sum(size for _, _, size in entries)
+
+    def _ensure_index(self, *, rescan: bool = False) -> OrderedDict[str, int]:
+        """Call with ``self._lock`` held."""
+        stale = rescan and time.monotonic() - self._scanned_at >= RESCAN_SECONDS
+        if self._index is None or stale:
+            self._index, self._bytes = self._scan()
+            self._scanned_at = time.monotonic()
+        return self._index
+
+    def get(self, key: str) -> bytes | None:
+        if not CACHE_KEY_PATTERN.match(key):
+            return None
+        with self._lock:
+            index = self._ensure_index()
+            if key in index:
+                index.move_to_end(key)
+        # 索引未命中也读一次磁盘：其他进程（如识别 worker）写入的渲染结果不在本进程索引里
+        path = self.root / key
+        try:
+            data = path.read_bytes()
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            with self._lock:
+                size = self._ensure_index().pop(key, 0)
+                self._bytes -= size
+            return None
+        with self._lock:
+            index = self._ensure_index()
+            previous = index.pop(key, 0)
+            index[key] = len(data)
+            self._bytes += len(data) - previous
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not CACHE_KEY_PATTERN.match(key) or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._ensure_index(rescan=True)
+        tmp_path = self.root / f"{key}.{uuid4().hex}.tmp"
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, self.root / key)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        evicted: list[str] = []
+        with self._lock:
+            index = self._ensure_index()
+            previous = index.pop(key, 0)
+            index[key] = len(data)
+            self._bytes += len(data) - previous
+            while self._bytes > self.max_bytes and len(index) > 1:
+                name, size = index.popitem(last=False)
+                self._bytes -= size
+                evicted.append(name)
+        for name in evicted:
+            (self.root / name).unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            index = self._ensure_index()
+            return {"entries": len(index), "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,247 @@
+"""Persistent index of seen invoices for cross-task duplicate detection."""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from app.records import ItemRecord
+from app.schemas import DuplicateKind
+from app.services.settings_store import infer_category
+from app.utils.files import file_digest
+from app.utils.text import normalize_spaces
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    content_hash TEXT PRIMARY KEY,
+    source_path TEXT NOT NULL,
+    invoice_date TEXT,
+    item_name TEXT,
+    amount TEXT,
+    fields_key TEXT,
+    recorded_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_invoices_fields_key ON invoices(fields_key);
+"""
+
+
+@dataclass(slots=True)
+class IndexedInvoice:
+    content_hash: str
+    source_path: str
+    invoice_date: str | None
+    item_name: str | None
+    amount: str | None
+
+    @property
+    def has_fields(self) -> bool:
+        return bool(self.invoice_date and self.item_name and self.amount)
+
+
+def fields_key(invoice_date: str | None, amount: str | None, item_name: str | None) -> str | None:
+    if not (invoice_date and amount and item_name):
+        return None
+    normalized = "|".join([invoice_date, amount, normalize_spaces(item_name).lower()])
+    # 定长摘要作索引键，百万级记录下索引体积可控
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class DuplicateIndex:
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def find_by_hash(self, content_hash: str) -> IndexedInvoice | None:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT content_hash, source_path, invoice_date, item_name, amount FROM invoices WHERE content_hash = ?",
+                (content_hash,),
+            ).fetchone()
+        return IndexedInvoice(*row) if row else None
+
+    def find_by_fields(
+        self,
+        invoice_date: str | None,
+        amount: str | None,
+        item_name: str | None,
+        *,
+        exclude_hash: str | None = None,
+    ) -> IndexedInvoice | None:
+        key = fields_key(invoice_date, amount, item_name)
+        if key is None:
+            return None
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT content_hash, source_path, invoice_date, item_name, amount FROM invoices "
+                "WHERE fields_key = ? AND content_hash != ? LIMIT 1",
+                (key, exclude_hash or ""),
+            ).fetchone()
+        return IndexedInvoice(*row) if row else None
+
+    def record(
+        self,
+        content_hash: str,
+        source_path: str,
+        invoice_date: str | None,
+        item_name: str | None,
+        amount: str | None,
+    ) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT INTO invoices (content_hash, source_path, invoice_date, item_name, amount, fields_key, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(content_hash) DO UPDATE SET source_path = excluded.source_path, "
+                "invoice_date = excluded.invoice_date, item_name = excluded.item_name, "
+                "amount = excluded.amount, fields_key = excluded.fields_key",
+                (
+                    content_hash,
+                    source_path,
+                    invoice_date,
+                    item_name,
+                    amount,
+                    fields_key(invoice_date, amount, item_name),
+                    datetime.utcnow().isoformat(),
+                ),
+            )
+            conn.commit()
+
+    def update_path(self, content_hash: str, source_path: str) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE invoices SET source_path = ? WHERE content_hash = ?", (source_path, content_hash))
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _mark_duplicate(item: ItemRecord, kind: DuplicateKind, original_path: str | None) -> None:
+    item.duplicate_kind = kind
+    item.duplicate_of = original_path
+
+
+def _is_other_copy(known: IndexedInvoice, item: ItemRecord) -> bool:
+    """True when ``known`` is a different file that still exists."""
+    return known.source_path != item.source_path and Path(known.source_path).exists()
+
+
+def _was_moved(known: IndexedInvoice, item: ItemRecord) -> bool:
+    # 原文件已被移走或改名，视为同一张发票换了位置
+    return known.source_path != item.source_path and not Path(known.source_path).exists()
+
+
+def flag_import_duplicates(items: list[ItemRecord], index: DuplicateIndex | None) -> None:
+    """Hash each imported file and flag copies within the batch or already indexed.
+
+    This reads every file in full during the import request (about one disk
+    read of the batch); the digests are memoized, so prewarm and recognition
+    do not hash again.
+
+    Pages of a split PDF are keyed by file hash plus page number, not by page
+    content: they only match the same page of a byte-identical file.
+    """
+    seen: dict[str, str] = {}
+    for item in items:
+        try:
+            item.content_hash = file_digest(Path(item.source_path))
+        except OSError:
+            continue
+        if item.page is not None:
+            # 合并 PDF 的各页共用文件哈希，加页码作键；不是页面内容哈希，
+            # 同一张发票另存成单页 PDF 后不会按内容命中，由识别后的字段查重兜底
+            item.content_hash = f"{item.content_hash}:p{item.page}"
+        first_path = seen.setdefault(item.content_hash, item.source_path)
+        if first_path != item.source_path:
+            _mark_duplicate(item, "content", first_path)
+            continue
+        if index is None:
+            continue
+        known = index.find_by_hash(item.content_hash)
+        if known is None:
+            continue
+        if _is_other_copy(known, item):
+            _mark_duplicate(item, "content", known.source_path)
+        elif _was_moved(known, item):
+            index.update_path(known.content_hash, item.source_path)
+
+
+def reuse_indexed_fields(
+    item: ItemRecord,
+    index: DuplicateIndex | None,
+    category_mapping: dict[str, list[str]],
+) -> bool:
+    """Fill fields from an already recognized copy of the same file, skipping the cloud call."""
+    if index is None or not item.content_hash:
+        return False
+    known = index.find_by_hash(item.content_hash)
+    if not known or not known.has_fields:
+        return False
+    if not _is_other_copy(known, item):
+        if _was_moved(known, item):
+            index.update_path(known.content_hash, item.source_path)
+        return False
+
+    _mark_duplicate(item, "content", known.source_path)
+    item.invoice_date = known.invoice_date
+    item.item_name = known.item_name
+    item.amount = known.amount
+    item.category = infer_category(item.item_name, item.old_name, category_mapping)
+    item.status = "ok"
+    item.failure_reason = None
+    return True
+
+
+def reuse_batch_fields(
+    item: ItemRecord,
+    original: ItemRecord,
+    category_mapping: dict[str, list[str]],
+) -> bool:
+    """Copy the fields recognized for an identical file of the same batch."""
+    if original.status != "ok":
+        return False
+    item.invoice_date = original.invoice_date
+    item.item_name = original.item_name
+    item.amount = original.amount
+    item.vendor_name = original.vendor_name
+    item.extracted_text = original.extracted_text
+    item.category = infer_category(item.item_name, item.old_name, category_mapping)
+    item.status = "ok"
+    item.failure_reason = None
+    return True
+
+
+def record_recognized(item: ItemRecord, index: DuplicateIndex | None) -> None:
+    if index is None or not item.content_hash or item.status != "ok":
+        return
+    if item.duplicate_kind == "fields":
+        _mark_duplicate(item, "none", None)
+    if item.duplicate_kind == "none":
+        same_fields = index.find_by_fields(
+            item.invoice_date,
+            item.amount,
+            item.item_name,
+            exclude_hash=item.content_hash,
+        )
+        if same_fields and _is_other_copy(same_fields, item):
+            _mark_duplicate(item, "fields", same_fields.source_path)
+    if item.duplicate_kind == "none":
+        index.record(item.content_hash, item.source_path, item.invoice_date, item.item_name, item.amount)
@@ -1,9 +1,50 @@
 from __future__ import annotations
 
+import re
 from pathlib import Path
 
 
-SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
+# .ofd / .xml 为全电发票的结构化格式，由 ocr.structured 本地解析；
+# 扩展名只在这里定义，ocr.structured 从本模块导入，监控和导入不必加载解析器
+STRUCTURED_EXTENSIONS = {".ofd", ".xml"}
+SUPPORTED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", *STRUCTURED_EXTENSIONS}
+
+XML_SNIFF_BYTES = 4096
+# 跳过 XML 声明、注释和 DOCTYPE，取第一个元素名（可带命名空间前缀）
+XML_ROOT_PATTERN = re.compile(rb"<(?:[A-Za-z_][\w.-]*:)?([A-Za-z_][\w.-]*)")
+# 数电票根元素为 EInvoice，OFD 自定义标签为 fp:FaPiao，旧版税控导出多为 Invoice / FPXX 一类
+INVOICE_XML_MARKERS = ("invoice", "fapiao", "fpxx")
+
+
+def is_invoice_candidate(path: Path) -> bool:
+    """Cheap name-based check; ``.xml`` files still need ``is_invoice_file``."""
+    # 跳过隐藏文件和 Office/WPS 的 ~$ 锁文件
+    if path.name.startswith((".", "~$")):
+        return False
+    return path.suffix.lower() in SUPPORTED_EXTENSIONS
+
+
+def _is_invoice_xml(path: Path) -> bool:
+    # 只按根元素名判断，读文件开头几 KB，不做完整解析
+    try:
+        with path.open("rb") as handle:
+            head = handle.read(XML_SNIFF_BYTES)
+    except OSError:
+        return False
+    match = XML_ROOT_PATTERN.search(head)
+    if match is None:
+        return False
+    root = match.group(1).decode("ascii", "ignore").lower()
+    return any(marker in root for marker in INVOICE_XML_MARKERS)
+
+
+def _accepts_content(path: Path) -> bool:
+    return path.suffix.lower() != ".xml" or _is_invoice_xml(path)
+
+
+def is_invoice_file(path: Path) -> bool:
+    """Like ``is_invoice_candidate`` but skips XML files that are not e-invoices."""
+    return is_invoice_candidate(path) and _accepts_content(path)
 
 
 def collect_invoice_files(paths: list[str]) -> list[Path]:
@@ -15,12 +56,12 @@ def collect_invoice_files(paths: list[str]) -> list[Path]:
             continue
 
         if candidate.is_file():
-            if candidate.suffix.lower() in SUPPORTED_EXTENSIONS:
+            if candidate.suffix.lower() in SUPPORTED_EXTENSIONS and _accepts_content(candidate):
                 files[str(candidate.resolve())] = candidate.resolve()
             continue
 
         for child in candidate.rglob("*"):
-            if child.is_file() and child.suffix.lower() in SUPPORTED_EXTENSIONS:
+            if child.is_file() and child.suffix.lower() in SUPPORTED_EXTENSIONS and _accepts_content(child):
                 files[str(child.resolve())] = child.resolve()
 
     return sorted(files.values(), key=lambda p: p.name.lower())
@@ -0,0 +1,260 @@
+"""Durable SQLite job queue feeding recognition worker processes."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from app.records import ItemRecord
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    task_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (task_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_jobs_task ON jobs(task_id, status);
+"""
+
+# 入队时带上识别所需的条目字段，完成时回写识别会改动的字段
+JOB_FIELDS = (
+    "source_path",
+    "old_name",
+    "file_ext",
+    "page",
+    "page_count",
+    "content_hash",
+    "duplicate_kind",
+    "duplicate_of",
+)
+RESULT_FIELDS = (
+    "content_hash",
+    "invoice_date",
+    "item_name",
+    "amount",
+    "category",
+    "vendor_name",
+    "extracted_text",
+    "status",
+    "failure_reason",
+    "duplicate_kind",
+    "duplicate_of",
+)
+
+
+@dataclass(slots=True)
+class Job:
+    id: int
+    task_id: str
+    attempts: int
+    item: ItemRecord
+
+
+@dataclass(slots=True)
+class JobResult:
+    item_id: str
+    values: dict[str, Any] | None
+
+    @property
+    def dead(self) -> bool:
+        return self.values is None
+
+
+class JobQueue:
+    """Queue rows move ``queued -> leased -> done``.
+
+    A lease expires after the visibility timeout unless the worker renews
+    it, and the job becomes available again for another worker. Jobs whose
+    lease expired ``max_attempts`` times are marked ``dead`` instead of
+    retried forever.
+    """
+
+    def __init__(self, db_path: Path, *, max_attempts: int = 3) -> None:
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # 可能还有未完成任务的 task_id；任务保存时据此跳过绝大多数计数查询
+        self._active_tasks: set[str] | None = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            # 事务由下方显式控制；多进程争用写锁时最多等待 30 秒
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _transaction(self, statements: Any) -> Any:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(conn)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return result
+
+    def enqueue(self, task_id: str, items: list[ItemRecord]) -> int:
+        now = time.time()
+        rows = [
+            (task_id, item.id, json.dumps({name: getattr(item, name) for name in JOB_FIELDS}), now)
+            for item in items
+        ]
+        # 同一条目重复入队时重置为待处理；旧租约的完成回写会因 lease_owner 不匹配被丢弃
+        self._transaction(
+            lambda conn: conn.executemany(
+                "INSERT INTO jobs (task_id, item_id, payload, status, updated_at) VALUES (?, ?, ?, 'queued', ?) "
+                "ON CONFLICT(task_id, item_id) DO UPDATE SET payload = excluded.payload, status = 'queued', "
+                "attempts = 0, lease_owner = NULL, lease_expires = NULL, result = NULL, updated_at = excluded.updated_at",
+                rows,
+            )
+        )
+        with self._lock:
+            if self._active_tasks is not None:
+                self._active_tasks.add(task_id)
+        return len(rows)
+
+    def lease(self, owner: str, limit: int, visibility_timeout: float) -> list[Job]:
+        now = time.time()
+
+        def statements(conn: sqlite3.Connection) -> list[tuple]:
+            conn.execute(
+                "UPDATE jobs SET status = 'dead', lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            rows = conn.execute(
+                "SELECT id, task_id, item_id, attempts, payload FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(owner, now + visibility_timeout, now, row[0]) for row in rows],
+            )
+            return rows
+
+        return [
+            Job(id=job_id, task_id=task_id, attempts=attempts + 1, item=ItemRecord(id=item_id, **json.loads(payload)))
+            for job_id, task_id, item_id, attempts, payload in self._transaction(statements)
+        ]
+
+    def renew(self, jobs: list[Job], owner: str, visibility_timeout: float) -> int:
+        """Extend the leases ``owner`` still holds; returns how many were renewed."""
+        if not jobs:
+            return 0
+        now = time.time()
+        cursor = self._transaction(
+            lambda conn: conn.executemany(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                [(now + visibility_timeout, now, job.id, owner) for job in jobs],
+            )
+        )
+        return cursor.rowcount
+
+    def complete(self, job: Job, owner: str) -> bool:
+        """Store the recognized fields; returns False when the lease was lost."""
+        result = json.dumps({name: getattr(job.item, name) for name in RESULT_FIELDS})
+        cursor = self._transaction(
+            lambda conn: conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (result, time.time(), job.id, owner),
+            )
+        )
+        return cursor.rowcount == 1
+
+    def take_results(self, task_id: str) -> list[JobResult]:
+        # 先做只读检查：WAL 模式下读不占写锁，没有结果时不必开启写事务
+        with self._lock:
+            finished = self._connection().execute(
+                "SELECT 1 FROM jobs WHERE task_id = ? AND status IN ('done', 'dead') LIMIT 1",
+                (task_id,),
+            ).fetchone()
+        if finished is None:
+            return []
+
+        def statements(conn: sqlite3.Connection) -> list[tuple]:
+            rows = conn.execute(
+                "SELECT item_id, result FROM jobs WHERE task_id = ? AND status IN ('done', 'dead') ORDER BY id",
+                (task_id,),
+            ).fetchall()
+            if rows:
+                conn.execute("DELETE FROM jobs WHERE task_id = ? AND status IN ('done', 'dead')", (task_id,))
+            return rows
+
+        return [
+            JobResult(item_id=item_id, values=json.loads(result) if result else None)
+            for item_id, result in self._transaction(statements)
+        ]
+
+    def finished_tasks(self) -> list[str]:
+        """Tasks with results waiting for ``take_results``; a read-only query."""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT DISTINCT task_id FROM jobs WHERE status IN ('done', 'dead')"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def active_count(self, task_id: str) -> int:
+        with self._lock:
+            conn = self._connection()
+            if self._active_tasks is None:
+                self._active_tasks = {
+                    row[0]
+                    for row in conn.execute("SELECT DISTINCT task_id FROM jobs WHERE status IN ('queued', 'leased')")
+                }
+            if task_id not in self._active_tasks:
+                return 0
+            count = int(
+                conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE task_id = ? AND status IN ('queued', 'leased')",
+                    (task_id,),
+                ).fetchone()[0]
+            )
+            if not count:
+                self._active_tasks.discard(task_id)
+        return count
+
+    def drop_task(self, task_id: str) -> None:
+        self._transaction(lambda conn: conn.execute("DELETE FROM jobs WHERE task_id = ?", (task_id,)))
+        with self._lock:
+            if self._active_tasks is not None:
+                self._active_tasks.discard(task_id)
+
+    def purge_finished(self, older_than_seconds: float) -> None:
+        """Remove results nobody collected, e.g. for tasks that expired meanwhile."""
+        cutoff = time.time() - older_than_seconds
+        self._transaction(
+            lambda conn: conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'dead') AND updated_at < ?",
+                (cutoff,),
+            )
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,99 @@
+"""Per-task live-sync channels that broadcast item-level diffs over WebSocket."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+from app.records import TaskRecord
+from app.schemas import TaskDiff
+
+
+@dataclass(slots=True, eq=False)
+class Subscription:
+    task_id: str
+    loop: asyncio.AbstractEventLoop
+    queue: asyncio.Queue[str] = field(default_factory=asyncio.Queue)
+
+    def deliver(self, message: str) -> None:
+        # 发布方可能在线程池或监控线程中，经由订阅者所在的事件循环投递
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except RuntimeError:
+            pass
+
+
+@dataclass(slots=True)
+class _Channel:
+    subscribers: set[Subscription] = field(default_factory=set)
+    item_ids: set[str] = field(default_factory=set)
+
+
+class LiveSyncHub:
+    """Fan-out of task saves to the WebSocket subscribers of that task.
+
+    A diff holds the items touched since the previous save, the ids removed
+    since the previous broadcast and the new summary, tagged with the task
+    version before and after the save. A client whose version does not match
+    ``base_version`` has missed a diff and should ask for a snapshot.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._channels: dict[str, _Channel] = {}
+
+    def subscribe(self, task: TaskRecord, loop: asyncio.AbstractEventLoop) -> Subscription:
+        subscription = Subscription(task_id=task.id, loop=loop)
+        with self._lock:
+            channel = self._channels.setdefault(task.id, _Channel())
+            if not channel.subscribers:
+                channel.item_ids = {item.id for item in task.items}
+            channel.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            channel = self._channels.get(subscription.task_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscription)
+            if not channel.subscribers:
+                del self._channels[subscription.task_id]
+
+    def has_subscribers(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._channels
+
+    def publish(self, task: TaskRecord, *, since: float, base_version: int) -> None:
+        """Broadcast the changes of a save; ``since`` is the previous save time."""
+        if not self.has_subscribers(task.id):
+            return
+        changed = [item for item in task.items if item.updated_at >= since]
+        current_ids = {item.id for item in task.items}
+        with self._lock:
+            channel = self._channels.get(task.id)
+            if channel is None:
+                return
+            removed = channel.item_ids - current_ids
+            channel.item_ids = current_ids
+            subscribers = list(channel.subscribers)
+        diff = TaskDiff.model_construct(
+            type="diff",
+            task_id=task.id,
+            version=task.version,
+            base_version=base_version,
+            template=task.template,
+            summary=task.summary,
+            items=[item.to_model() for item in changed],
+            removed=sorted(removed),
+        )
+        message = diff.model_dump_json()
+        for subscription in subscribers:
+            subscription.deliver(message)
+
+    def close_task(self, task_id: str) -> None:
+        """Tell subscribers the task is gone; their sockets close on receipt."""
+        with self._lock:
+            channel = self._channels.pop(task_id, None)
+        for subscription in channel.subscribers if channel else ():
+            subscription.deliver('{"type":"deleted","task_id":"%s"}' % task_id)
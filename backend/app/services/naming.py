@@ -6,7 +6,8 @@ from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from pathlib import Path
 import re
 
-from app.schemas import InvoiceItem, RenamePlanItem
+from app.records import ItemRecord
+from app.schemas import RenamePlanItem
 from app.utils.text import sanitize_component
 
 
@@ -20,6 +21,18 @@ class NamingTokens:
     amount: str
     ext: str
 
+    @property
+    def yyyy(self) -> str:
+        return self.date[:4]
+
+    @property
+    def mm(self) -> str:
+        return self.date[4:6]
+
+    @property
+    def dd(self) -> str:
+        return self.date[6:8]
+
 
 def _format_date(date_value: str | None) -> str:
     if not date_value:
@@ -48,10 +61,14 @@ def _render_template(template: str, tokens: NamingTokens) -> str:
     result = result.replace("{category}", tokens.category)
     result = result.replace("{amount}", tokens.amount)
     result = result.replace("{ext}", tokens.ext)
+    result = result.replace("{yyyy}", tokens.yyyy)
+    result = result.replace("{mm}", tokens.mm)
+    result = result.replace("{dd}", tokens.dd)
     return result
 
 
 EXT_SUFFIX_PATTERN = re.compile(r"\.[A-Za-z0-9]{1,12}$")
+PATH_SEPARATOR_PATTERN = re.compile(r"[\\/]+")
 
 
 def _normalize_base_name(value: str, ext: str) -> str:
@@ -68,57 +85,98 @@ def _build_final_name(base_name: str, ext: str) -> str:
     return f"{base_name}.{ext.lower()}"
 
 
-def apply_name_preview(items: list[InvoiceItem], template: str | None = None) -> list[InvoiceItem]:
+def _normalize_relative_name(value: str, ext: str) -> str:
+    """Sanitize a name whose template may contain directories, e.g. ``{yyyy}/{mm}/{date}``."""
+    *directories, name = PATH_SEPARATOR_PATTERN.split(value.strip())
+    # 逐级清理目录名；空目录、“.” 和 “..” 清理后为空，直接丢弃，避免移出整理根目录
+    parts = [part for part in (sanitize_component(directory, fallback="") for directory in directories) if part]
+    parts.append(_build_final_name(_normalize_base_name(name, ext=ext), ext=ext))
+    return "/".join(parts)
+
+
+def _directory_blocked(directory: Path, cache: dict[Path, bool]) -> bool:
+    """True when ``directory`` or one of its ancestors exists as a regular file."""
+    blocked = cache.get(directory)
+    if blocked is None:
+        if directory.is_dir():
+            blocked = False
+        elif directory.exists():
+            blocked = True
+        else:
+            blocked = directory.parent != directory and _directory_blocked(directory.parent, cache)
+        cache[directory] = blocked
+    return blocked
+
+
+def apply_name_preview(items: list[ItemRecord], template: str | None = None) -> list[ItemRecord]:
     template = template or DEFAULT_TEMPLATE
     counters: dict[tuple[str, str, str], int] = defaultdict(int)
 
     ordered_items = sorted(items, key=lambda item: (item.invoice_date or "", item.old_name.lower()))
     for item in ordered_items:
-        item.action = "skip"
-        item.conflict_type = "none"
-        if item.status in {"pending", "failed"}:
-            item.suggested_name = None
-            item.action = "manual_edit_required"
-            continue
-
-        group_key = (item.invoice_date or "", item.category or "其他", item.amount or "0.00")
-        counters[group_key] += 1
-        index = counters[group_key]
-
-        category = item.category or "其他"
-        if index > 1:
-            category = f"{category}{index}"
-
-        ext = item.file_ext.lstrip(".").lower()
-        tokens = NamingTokens(
-            date=_format_date(item.invoice_date),
-            category=sanitize_component(category, fallback="其他"),
-            amount=sanitize_component(_format_amount(item.amount), fallback="0元"),
-            ext=ext,
-        )
-        rendered = _render_template(template, tokens)
-        base_name = _normalize_base_name(rendered, ext=ext)
-        item.suggested_name = _build_final_name(base_name, ext=ext)
-        item.action = "rename"
+        before = (item.suggested_name, item.action, item.conflict_type)
+        _preview_one(item, template, counters)
+        # 只有预览结果变化的条目才刷新时间戳，实时同步据此只推送变化的条目
+        if (item.suggested_name, item.action, item.conflict_type) != before:
+            item.touch()
 
     return items
 
 
-def build_rename_plan(items: list[InvoiceItem], selected_ids: set[str] | None = None) -> list[RenamePlanItem]:
+def _preview_one(item: ItemRecord, template: str, counters: dict[tuple[str, str, str], int]) -> None:
+    item.action = "skip"
+    item.conflict_type = "none"
+    if item.status in {"pending", "failed", "interrupted"}:
+        item.suggested_name = None
+        item.action = "manual_edit_required"
+        return
+
+    group_key = (item.invoice_date or "", item.category or "其他", item.amount or "0.00")
+    # 重复发票不占用序号，避免原件之外再生成“餐饮2”
+    if item.duplicate_kind == "none":
+        counters[group_key] += 1
+    index = max(counters[group_key], 1)
+
+    category = item.category or "其他"
+    if index > 1:
+        category = f"{category}{index}"
+
+    ext = item.file_ext.lstrip(".").lower()
+    tokens = NamingTokens(
+        date=_format_date(item.invoice_date),
+        category=sanitize_component(category, fallback="其他"),
+        amount=sanitize_component(_format_amount(item.amount), fallback="0元"),
+        ext=ext,
+    )
+    rendered = _render_template(template, tokens)
+    item.suggested_name = _normalize_relative_name(rendered, ext=ext)
+    item.action = "rename" if item.duplicate_kind == "none" else "skip"
+
+
+def build_rename_plan(
+    items: list[ItemRecord],
+    selected_ids: set[str] | None = None,
+    *,
+    page_output: str = "extract",
+    target_root: Path | None = None,
+) -> list[RenamePlanItem]:
+    """Plan every move in one pass, checking conflicts before anything is touched.
+
+    Suggested names may contain directories (organize mode); they are placed
+    under ``target_root``, or next to the source file when it is not given.
+    """
     selected_ids = selected_ids or {item.id for item in items if item.selected}
     used_targets: set[str] = set()
+    blocked_directories: dict[Path, bool] = {}
     plan: list[RenamePlanItem] = []
 
     for item in items:
         ext = item.file_ext.lstrip(".").lower()
         chosen_name_raw = item.manual_name or item.suggested_name
-        chosen_name = None
-        if chosen_name_raw:
-            base_name = _normalize_base_name(chosen_name_raw, ext=ext)
-            chosen_name = _build_final_name(base_name, ext=ext)
+        chosen_name = _normalize_relative_name(chosen_name_raw, ext=ext) if chosen_name_raw else None
         source = Path(item.source_path)
         target_name = chosen_name or item.old_name
-        target_path = source.with_name(target_name)
+        target_path = (target_root or source.parent).joinpath(*target_name.split("/"))
 
         action = "rename"
         reason = None
@@ -131,11 +189,19 @@ def build_rename_plan(items: list[InvoiceItem], selected_ids: set[str] | None =
             action = "skip"
             reason = "recognition_failed"
             conflict_type = "none"
+        elif item.duplicate_kind != "none":
+            action = "skip"
+            reason = "duplicate_invoice"
+            conflict_type = "duplicate"
         elif not chosen_name:
             action = "skip"
             reason = "missing_suggested_name"
             conflict_type = "none"
-        elif target_name == item.old_name:
+        elif item.page is not None and page_output == "reference":
+            # 只记录页码与建议文件名，合并 PDF 保持不动
+            action = "skip"
+            reason = "page_reference"
+        elif target_path == source:
             action = "skip"
             reason = "same_name"
             conflict_type = "same_name"
@@ -143,6 +209,10 @@ def build_rename_plan(items: list[InvoiceItem], selected_ids: set[str] | None =
             action = "skip"
             reason = "duplicate_in_batch"
             conflict_type = "exists_other"
+        elif _directory_blocked(target_path.parent, blocked_directories):
+            action = "skip"
+            reason = "target_dir_blocked"
+            conflict_type = "exists_other"
         elif target_path.exists() and target_path.resolve() != source.resolve():
             action = "skip"
             reason = "target_exists"
@@ -161,6 +231,8 @@ def build_rename_plan(items: list[InvoiceItem], selected_ids: set[str] | None =
                 action=action,
                 conflict_type=conflict_type,
                 reason=reason,
+                page=item.page,
+                page_count=item.page_count,
             )
         )
 
@@ -0,0 +1,100 @@
+"""Cassettes of recorded chat-completion calls, keyed by request fingerprint.
+
+In record mode :class:`SiliconFlowClient` stores the answer of every model
+call under a fingerprint of its request, one JSON file per call. The stub
+server in :mod:`app.tools.vlm_stub` replays them so throughput and accuracy
+experiments run offline and without spending API credits.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+
+# 只有这些请求字段影响模型输出；stream 只改变传输方式，不参与指纹
+FINGERPRINT_KEYS = ("model", "temperature", "max_tokens", "response_format")
+
+
+def request_fingerprint(payload: dict[str, Any], *, image_digest: str | None = None) -> str:
+    """Stable hash of a chat-completion request, with images reduced to their digests.
+
+    ``image_digest`` stands in for the data URL of a streamed body, which is
+    never built as one string on the client side.
+    """
+    messages = []
+    for message in payload.get("messages") or []:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content}]
+        digested = []
+        for part in parts:
+            if part.get("type") == "image_url":
+                url = str((part.get("image_url") or {}).get("url", ""))
+                digested.append({"image": image_digest or hashlib.sha256(url.encode("utf-8")).hexdigest()})
+            else:
+                digested.append({"text": part.get("text")})
+        messages.append({"role": message.get("role"), "content": digested})
+    canonical = {key: payload.get(key) for key in FINGERPRINT_KEYS}
+    canonical["messages"] = messages
+    encoded = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(slots=True)
+class CassetteEntry:
+    fingerprint: str
+    model: str
+    prompt: str
+    source: str
+    request_bytes: int
+    content: str
+    latency_ms: float
+
+
+class Cassette:
+    """Directory of ``<fingerprint>.json`` entries; later recordings overwrite earlier ones."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._entries: dict[str, CassetteEntry] | None = None
+
+    def _load(self) -> dict[str, CassetteEntry]:
+        if self._entries is not None:
+            return self._entries
+        entries: dict[str, CassetteEntry] = {}
+        for path in sorted(self.root.glob("*.json")) if self.root.is_dir() else ():
+            try:
+                entry = CassetteEntry(**json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, TypeError, ValueError):
+                continue
+            entries[entry.fingerprint] = entry
+        self._entries = entries
+        return entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+    def get(self, fingerprint: str) -> CassetteEntry | None:
+        with self._lock:
+            return self._load().get(fingerprint)
+
+    def put(self, entry: CassetteEntry) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(asdict(entry), ensure_ascii=False, indent=2).encode("utf-8")
+        tmp_path = self.root / f"{entry.fingerprint}.{uuid4().hex}.tmp"
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, self.root / f"{entry.fingerprint}.json")
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            if self._entries is not None:
+                self._entries[entry.fingerprint] = entry
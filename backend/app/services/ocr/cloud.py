@@ -1,145 +1,44 @@
 from __future__ import annotations
 
-import base64
-import mimetypes
-import re
-from datetime import datetime
-import io
-from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import asyncio
+import json
+import logging
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
 import httpx
 
-from app.utils.text import parse_json_object
-
-
-STRUCTURED_PROMPT = (
-    "请从发票中提取以下字段，并且只输出一个JSON对象，不要输出任何其他文字或markdown。"
-    "字段和定位要求："
-    "invoice_date(开票日期，发票右上角，格式YYYY-MM-DD或null), "
-    "item_name(项目名称，中间表格“项目名称”列，若有多行取第一条有效项目名，字符串或null), "
-    "amount(价税合计小写金额，即“(小写)”右侧金额，纯数字字符串如26.80或null)。"
-)
-
-DATE_PATTERN = re.compile(r"(20\d{2})[^\d]?(\d{1,2})[^\d]?(\d{1,2})")
-AMOUNT_PATTERN = re.compile(r"^\d+(?:\.\d{1,2})?$")
-
-
-def _normalize_date(raw: Any) -> str | None:
-    if raw is None:
-        return None
-    text = str(raw).strip()
-    if not text:
-        return None
-    matched = DATE_PATTERN.search(text)
-    if not matched:
-        return None
-    year, month, day = matched.group(1), matched.group(2), matched.group(3)
-    try:
-        dt = datetime(int(year), int(month), int(day))
-    except ValueError:
-        return None
-    return dt.strftime("%Y%m%d")
-
-
-def _normalize_amount(raw: Any) -> str | None:
-    if raw is None:
-        return None
-    text = str(raw).strip().replace("￥", "").replace("¥", "").replace(",", "")
-    if not text:
-        return None
-    if not AMOUNT_PATTERN.match(text):
-        return None
-    try:
-        value = Decimal(text)
-    except (InvalidOperation, ValueError):
-        return None
-
-    quantized = value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    if quantized == quantized.to_integral_value():
-        return str(int(quantized))
-
-    normalized = format(quantized, "f").rstrip("0").rstrip(".")
-    return normalized
-
-
-def _normalize_item_name(raw: Any) -> str | None:
-    if raw is None:
-        return None
-    text = str(raw).strip()
-    if not text:
-        return None
-    return text.splitlines()[0].strip() or None
-
-
-def _pdf_page_to_png_data_url(file_path: Path, page: int = 1, dpi: int = 220) -> str | None:
-    try:
-        import pypdfium2 as pdfium  # type: ignore
-    except Exception:
-        return None
-
-    if page < 1:
-        page = 1
-    if dpi < 72:
-        dpi = 72
-
-    pdf = None
-    page_obj = None
-    bitmap = None
-    image = None
-    buffer = None
-    try:
-        pdf = pdfium.PdfDocument(str(file_path))
-        if len(pdf) < page:
-            return None
-        page_obj = pdf[page - 1]
-        bitmap = page_obj.render(scale=dpi / 72.0)
-        image = bitmap.to_pil()
-        buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
-        content = base64.b64encode(buffer.getvalue()).decode("ascii")
-        return f"data:image/png;base64,{content}"
-    except Exception:
-        return None
-    finally:
-        try:
-            if hasattr(image, "close"):
-                image.close()
-        except Exception:
-            pass
-        try:
-            if hasattr(bitmap, "close"):
-                bitmap.close()
-        except Exception:
-            pass
-        try:
-            if hasattr(page_obj, "close"):
-                page_obj.close()
-        except Exception:
-            pass
-        try:
-            if hasattr(pdf, "close"):
-                pdf.close()
-        except Exception:
-            pass
-        try:
-            if buffer is not None:
-                buffer.close()
-        except Exception:
-            pass
-
-
-def _to_data_url(file_path: Path) -> str | None:
-    suffix = file_path.suffix.lower()
-    if suffix == ".pdf":
-        return _pdf_page_to_png_data_url(file_path)
-
-    mime, _ = mimetypes.guess_type(str(file_path))
-    if not mime:
-        return None
-    data = base64.b64encode(file_path.read_bytes()).decode("ascii")
-    return f"data:{mime};base64,{data}"
+from app.services.ocr.cassette import Cassette, CassetteEntry, request_fingerprint
+from app.services.ocr.fields import normalize_amount, normalize_date, normalize_item_name
+from app.services.ocr.payload import EncodedImage, prepare_image
+from app.services.ocr.upload import IMAGE_URL_PLACEHOLDER, ImageRequestBody
+from app.utils.text import JsonObjectScanner, parse_json_object
+
+
+logger = logging.getLogger(__name__)
+
+
+FIELD_PROMPTS = {
+    "invoice_date": "invoice_date(开票日期，发票右上角，格式YYYY-MM-DD或null)",
+    "item_name": "item_name(项目名称，中间表格“项目名称”列，若有多行取第一条有效项目名，字符串或null)",
+    "amount": "amount(价税合计小写金额，即“(小写)”右侧金额，纯数字字符串如26.80或null)",
+}
+REQUIRED_FIELDS = ("invoice_date", "item_name", "amount")
+
+
+def build_prompt(fields: tuple[str, ...] = REQUIRED_FIELDS) -> str:
+    return (
+        "请从发票中提取以下字段，并且只输出一个JSON对象，不要输出任何其他文字或markdown。"
+        "字段和定位要求："
+        + ", ".join(FIELD_PROMPTS[name] for name in fields)
+        + "。"
+    )
+
+
+ROI_PROMPT_HINT = "图片由发票的开票日期、项目名称、价税合计三个区域自上而下拼接而成。"
 
 
 def _extract_message_text(content: Any) -> str:
@@ -156,63 +55,213 @@ def _extract_message_text(content: Any) -> str:
     return str(content or "")
 
 
+@dataclass(slots=True)
+class StreamStats:
+    """Running totals of streamed completions: time to the first token and to the closed JSON object."""
+
+    requests: int = 0
+    first_tokens: int = 0
+    first_token_ms: float = 0.0
+    objects: int = 0
+    object_ms: float = 0.0
+
+    def record(self, first_token_ms: float | None, object_ms: float | None) -> None:
+        self.requests += 1
+        if first_token_ms is not None:
+            self.first_tokens += 1
+            self.first_token_ms += first_token_ms
+        if object_ms is not None:
+            self.objects += 1
+            self.object_ms += object_ms
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "requests": self.requests,
+            "objects": self.objects,
+            "first_token_ms": round(self.first_token_ms / self.first_tokens, 1) if self.first_tokens else 0.0,
+            "object_ms": round(self.object_ms / self.objects, 1) if self.objects else 0.0,
+        }
+
+
 class SiliconFlowClient:
-    def __init__(self, base_url: str, api_key: str, model: str) -> None:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        *,
+        roi_crop: bool = False,
+        stream: bool = False,
+        http_client: httpx.AsyncClient | None = None,
+        cassette: Cassette | None = None,
+    ) -> None:
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.model = model
+        self.roi_crop = roi_crop
+        self.stream = stream
+        # 共享连接池由调用方管理生命周期；未提供时每次请求临时创建
+        self.http_client = http_client
+        # 录制模式：每次模型调用的回答按请求指纹写入磁带，供离线回放
+        self.cassette = cassette
+        self.stream_stats = StreamStats()
 
     @property
     def is_configured(self) -> bool:
         return bool(self.api_key.strip())
 
-    def extract_fields(
+    async def extract_fields(
         self,
         file_path: Path,
-        timeout_seconds: int = 45,
+        timeout_seconds: float = 45,
+        page: int = 1,
+        fields: tuple[str, ...] = REQUIRED_FIELDS,
     ) -> dict[str, Any]:
+        """Ask the model for ``fields`` only; a shorter prompt also shortens the answer."""
         if not self.is_configured:
             return {}
+        prompt = build_prompt(fields)
+        source = f"{file_path.name}#{page}"
+
+        if self.roi_crop:
+            # 渲染、编码是 CPU 密集步骤，放到线程中执行，避免阻塞事件循环
+            roi_image = await asyncio.to_thread(prepare_image, file_path, roi_crop=True, page=page)
+            if roi_image is not None:
+                try:
+                    extracted = await self._request_fields(
+                        roi_image, f"{ROI_PROMPT_HINT}{prompt}", timeout_seconds, source=source
+                    )
+                except httpx.HTTPError as exc:
+                    # 裁剪图请求失败（如模型拒收拼接图）时仍用整页再试一次
+                    logger.warning("ROI request failed for %s, retrying with the full page: %s", source, exc)
+                    extracted = {}
+                if all(extracted.get(key) for key in fields):
+                    return extracted
+
+        image = await asyncio.to_thread(prepare_image, file_path, page=page)
+        if image is None:
+            return {}
+        return await self._request_fields(image, prompt, timeout_seconds, source=source)
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def _client(self, timeout_seconds: float) -> Any:
+        if self.http_client is not None:
+            return nullcontext(self.http_client)
+        return httpx.AsyncClient(timeout=timeout_seconds)
 
-        data_url = _to_data_url(file_path)
-        if not data_url:
-            return {}
+    async def _post(self, url: str, *, headers: dict[str, str], body: ImageRequestBody, timeout_seconds: float) -> str:
+        async with self._client(timeout_seconds) as client:
+            response = await client.post(url, headers=headers, content=body, timeout=timeout_seconds)
+            response.raise_for_status()
+            data = response.json()
+        content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
+        return _extract_message_text(content)
 
+    async def _post_stream(
+        self,
+        url: str,
+        *,
+        headers: dict[str, str],
+        body: ImageRequestBody,
+        timeout_seconds: float,
+    ) -> str:
+        scanner = JsonObjectScanner()
+        parts: list[str] = []
+        started = time.perf_counter()
+        first_token_at: float | None = None
+        async with self._client(timeout_seconds) as client:
+            async with client.stream(
+                "POST",
+                url,
+                headers=headers,
+                content=body,
+                timeout=timeout_seconds,
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        continue
+                    delta = (chunk.get("choices") or [{}])[0].get("delta") or {}
+                    text = _extract_message_text(delta.get("content"))
+                    if not text:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(text)
+                    # 对象闭合即停止读取，离开上下文时关闭连接，丢弃模型多余的输出
+                    if scanner.feed(text) is not None:
+                        break
+        finished = time.perf_counter()
+        first_token_ms = (first_token_at - started) * 1000 if first_token_at is not None else None
+        # 只有扫描器确实读到闭合的 JSON 对象时才计入对象耗时
+        object_ms = (finished - started) * 1000 if scanner.result is not None else None
+        self.stream_stats.record(first_token_ms, object_ms)
+        logger.info(
+            "Streamed completion: first_token=%s object=%s",
+            f"{first_token_ms:.0f}ms" if first_token_ms is not None else "-",
+            f"{object_ms:.0f}ms" if object_ms is not None else "incomplete",
+        )
+        return "".join(parts)
+
+    async def _request_fields(
+        self,
+        image: EncodedImage,
+        prompt: str,
+        timeout_seconds: float,
+        *,
+        source: str = "",
+    ) -> dict[str, Any]:
         content_parts: list[dict[str, Any]] = [
-            {"type": "image_url", "image_url": {"url": data_url, "detail": "high"}},
-            {"type": "text", "text": STRUCTURED_PROMPT},
+            {"type": "image_url", "image_url": {"url": IMAGE_URL_PLACEHOLDER, "detail": "high"}},
+            {"type": "text", "text": prompt},
         ]
 
-        payload = {
+        payload: dict[str, Any] = {
             "model": self.model,
             "messages": [{"role": "user", "content": content_parts}],
             "temperature": 0,
             "max_tokens": 300,
             "response_format": {"type": "json_object"},
         }
-
-        with httpx.Client(timeout=timeout_seconds) as client:
-            response = client.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload,
+        if self.stream:
+            payload["stream"] = True
+        # 请求体边发送边编码 base64，不在内存中拼出完整的 data URL 和 JSON
+        body = ImageRequestBody(payload, image)
+        headers = {"Authorization": f"Bearer {self.api_key}", **body.headers}
+
+        post = self._post_stream if self.stream else self._post
+        started = time.perf_counter()
+        content = await post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            body=body,
+            timeout_seconds=timeout_seconds,
+        )
+        if self.cassette is not None:
+            image_digest = await asyncio.to_thread(body.image_url_digest)
+            entry = CassetteEntry(
+                fingerprint=request_fingerprint(payload, image_digest=image_digest),
+                model=self.model,
+                prompt=prompt,
+                source=source,
+                request_bytes=len(body),
+                content=content,
+                latency_ms=round((time.perf_counter() - started) * 1000, 1),
             )
-            response.raise_for_status()
-            data = response.json()
-
-        content = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-        parsed = parse_json_object(_extract_message_text(content))
+            await asyncio.to_thread(self.cassette.put, entry)
+        parsed = parse_json_object(content)
         if not parsed:
             return {}
 
-        invoice_date = _normalize_date(parsed.get("invoice_date"))
-        item_name = _normalize_item_name(parsed.get("item_name"))
-        amount = _normalize_amount(parsed.get("amount"))
+        invoice_date = normalize_date(parsed.get("invoice_date"))
+        item_name = normalize_item_name(parsed.get("item_name"))
+        amount = normalize_amount(parsed.get("amount"))
         return {
             "invoice_date": invoice_date,
             "item_name": item_name,
@@ -0,0 +1,58 @@
+"""Normalization of extracted invoice fields shared by the cloud and structured extractors."""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any
+
+
+DATE_PATTERN = re.compile(r"(20\d{2})[^\d]?(\d{1,2})[^\d]?(\d{1,2})")
+AMOUNT_PATTERN = re.compile(r"^\d+(?:\.\d{1,2})?$")
+
+
+def normalize_date(raw: Any) -> str | None:
+    if raw is None:
+        return None
+    text = str(raw).strip()
+    if not text:
+        return None
+    matched = DATE_PATTERN.search(text)
+    if not matched:
+        return None
+    year, month, day = matched.group(1), matched.group(2), matched.group(3)
+    try:
+        dt = datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    return dt.strftime("%Y%m%d")
+
+
+def normalize_amount(raw: Any) -> str | None:
+    if raw is None:
+        return None
+    text = str(raw).strip().replace("￥", "").replace("¥", "").replace(",", "")
+    if not text:
+        return None
+    if not AMOUNT_PATTERN.match(text):
+        return None
+    try:
+        value = Decimal(text)
+    except (InvalidOperation, ValueError):
+        return None
+
+    quantized = value.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    if quantized == quantized.to_integral_value():
+        return str(int(quantized))
+
+    normalized = format(quantized, "f").rstrip("0").rstrip(".")
+    return normalized
+
+
+def normalize_item_name(raw: Any) -> str | None:
+    if raw is None:
+        return None
+    text = str(raw).strip()
+    if not text:
+        return None
+    return text.splitlines()[0].strip() or None
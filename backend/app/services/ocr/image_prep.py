@@ -0,0 +1,89 @@
+"""Normalization of photographed or scanned invoice images before upload."""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+
+JPEG_QUALITIES = (88, 80, 72, 64, 56)
+MIN_LONG_EDGE = 1024
+DESKEW_SAMPLE_EDGE = 800
+DESKEW_MAX_DEGREES = 5.0
+DESKEW_STEP_DEGREES = 0.5
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    if image.mode in {"RGBA", "LA"} or (image.mode == "P" and "transparency" in image.info):
+        # 透明背景的截图铺白底，避免 JPEG 编码后变黑
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, "white")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _row_profile_score(image: Image.Image) -> float:
+    # 缩成一列即得到每行的平均灰度；文字行对齐水平时行间差异最大
+    column = image.resize((1, image.height), Image.Resampling.BOX)
+    values = column.tobytes()
+    mean = sum(values) / len(values)
+    return sum((value - mean) ** 2 for value in values)
+
+
+def estimate_skew(image: Image.Image) -> float:
+    """Angle in degrees that best aligns text rows horizontally."""
+    sample = ImageOps.invert(image.convert("L"))
+    sample.thumbnail((DESKEW_SAMPLE_EDGE, DESKEW_SAMPLE_EDGE))
+    steps = int(DESKEW_MAX_DEGREES / DESKEW_STEP_DEGREES)
+    best_angle, best_score = 0.0, _row_profile_score(sample)
+    for step in range(-steps, steps + 1):
+        angle = step * DESKEW_STEP_DEGREES
+        if angle == 0:
+            continue
+        score = _row_profile_score(sample.rotate(angle, resample=Image.Resampling.BILINEAR, fillcolor=0))
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def encode_within_budget(image: Image.Image, max_bytes: int) -> bytes:
+    """JPEG-encode, lowering quality and then resolution until under ``max_bytes``."""
+    for quality in JPEG_QUALITIES:
+        data = _encode_jpeg(image, quality)
+        if len(data) <= max_bytes:
+            return data
+    while len(data) > max_bytes and max(image.size) > MIN_LONG_EDGE:
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4), Image.Resampling.LANCZOS)
+        data = _encode_jpeg(image, JPEG_QUALITIES[-1])
+    return data
+
+
+def normalize_image(file_path: Path, *, max_edge: int, max_bytes: int, enhance: bool = False) -> bytes | None:
+    """Return upload-ready JPEG bytes, or None when the original can be sent unchanged.
+
+    Applies EXIF orientation and downscales to ``max_edge``; with ``enhance``
+    it also stretches contrast and straightens small rotations.
+    """
+    size = file_path.stat().st_size
+    with Image.open(file_path) as source:
+        orientation = source.getexif().get(0x0112, 1)
+        if not enhance and orientation == 1 and max(source.size) <= max_edge and size <= max_bytes:
+            return None
+        image = _flatten(ImageOps.exif_transpose(source))
+
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    if enhance:
+        image = ImageOps.autocontrast(image, cutoff=1)
+        angle = estimate_skew(image)
+        if angle:
+            image = image.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor="white")
+    return encode_within_budget(image, max_bytes)
@@ -0,0 +1,87 @@
+"""Fixed layout templates for cropping standard invoices before upload."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+# (left, top, right, bottom) as fractions of the rendered page
+Region = tuple[float, float, float, float]
+
+ASPECT_TOLERANCE = 0.05
+REGION_GAP = 12
+
+
+@dataclass(frozen=True, slots=True)
+class LayoutTemplate:
+    name: str
+    aspect_ratio: float
+    regions: tuple[Region, ...]
+
+
+LAYOUT_TEMPLATES: tuple[LayoutTemplate, ...] = (
+    # 数电/全电发票：A5 横版 210mm x 140mm
+    LayoutTemplate(
+        name="全电发票",
+        aspect_ratio=210 / 140,
+        regions=(
+            (0.60, 0.02, 0.98, 0.20),  # 开票日期
+            (0.02, 0.30, 0.60, 0.50),  # 项目名称表头及首行
+            (0.02, 0.66, 0.98, 0.80),  # 价税合计(小写)
+        ),
+    ),
+    # 增值税普通/专用发票：241mm x 140mm
+    LayoutTemplate(
+        name="增值税发票",
+        aspect_ratio=241 / 140,
+        regions=(
+            (0.62, 0.04, 0.98, 0.22),  # 开票日期
+            (0.02, 0.34, 0.50, 0.52),  # 货物或应税劳务、服务名称首行
+            (0.02, 0.68, 0.98, 0.80),  # 价税合计(小写)
+        ),
+    ),
+)
+
+
+def match_template(width: int, height: int) -> LayoutTemplate | None:
+    if width <= 0 or height <= 0:
+        return None
+    ratio = width / height
+    best: LayoutTemplate | None = None
+    best_delta = ASPECT_TOLERANCE
+    for template in LAYOUT_TEMPLATES:
+        delta = abs(ratio - template.aspect_ratio) / template.aspect_ratio
+        if delta <= best_delta:
+            best = template
+            best_delta = delta
+    return best
+
+
+def crop_regions(image: Image.Image, template: LayoutTemplate) -> Image.Image:
+    from PIL import Image
+
+    width, height = image.size
+    crops = [
+        image.crop((int(left * width), int(top * height), int(right * width), int(bottom * height)))
+        for left, top, right, bottom in template.regions
+    ]
+    canvas_width = max(crop.width for crop in crops)
+    canvas_height = sum(crop.height for crop in crops) + REGION_GAP * (len(crops) - 1)
+    canvas = Image.new("RGB", (canvas_width, canvas_height), "white")
+    offset = 0
+    for crop in crops:
+        canvas.paste(crop, (0, offset))
+        offset += crop.height + REGION_GAP
+        crop.close()
+    return canvas
+
+
+def crop_to_template(image: Image.Image) -> Image.Image | None:
+    """Stitch the template regions into one image, or None for unknown layouts."""
+    template = match_template(*image.size)
+    if template is None:
+        return None
+    return crop_regions(image, template)
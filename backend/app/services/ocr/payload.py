@@ -0,0 +1,301 @@
+"""Upload payload preparation with memory and disk caches and import-time prewarming."""
+from __future__ import annotations
+
+import base64
+import mimetypes
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from functools import partial
+from pathlib import Path
+
+from PIL import Image
+
+from app.config import settings
+from app.services.background import submit_background
+from app.services.disk_cache import DiskLRUCache
+from app.services.ocr.image_prep import normalize_image
+from app.services.ocr.render import render_pdf_page_png
+from app.services.ocr.render_pool import get_render_pool
+from app.services.ocr.structured import is_structured
+from app.utils.files import file_digest
+
+
+RENDER_DPI = 220
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedImage:
+    mime: str
+    data: bytes
+
+    def to_data_url(self) -> str:
+        content = base64.b64encode(self.data).decode("ascii")
+        return f"data:{self.mime};base64,{content}"
+
+
+PayloadKey = tuple[str, str]
+
+
+def _profile_key(file_path: Path, *, roi_crop: bool, page: int = 1) -> str:
+    if file_path.suffix.lower() != ".pdf":
+        enhance = "enhanced" if settings.image_enhance else "plain"
+        return f"img:edge{settings.image_max_edge}:max{settings.image_max_bytes}:{enhance}"
+    return f"pdf:p{page}:dpi{RENDER_DPI}:{'roi' if roi_crop else 'full'}"
+
+
+class PayloadCache:
+    """LRU of encoded images bounded by total bytes."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[PayloadKey, EncodedImage] = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def free_bytes(self) -> int:
+        with self._lock:
+            return self.max_bytes - self._bytes
+
+    def get(self, key: PayloadKey) -> EncodedImage | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: PayloadKey, value: EncodedImage, *, evict: bool = True) -> bool:
+        """Store ``value``; with ``evict=False`` only if it fits without evicting. Returns whether it was stored."""
+        size = len(value.data)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            previous = self._entries.get(key)
+            if not evict and self._bytes - (len(previous.data) if previous else 0) + size > self.max_bytes:
+                return False
+            if previous is not None:
+                del self._entries[key]
+                self._bytes -= len(previous.data)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.data)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+payload_cache = PayloadCache(settings.payload_cache_bytes)
+# 渲染结果落盘：重试、切换模型重新识别和重启后都不必再次栅格化同一页
+render_cache = DiskLRUCache(settings.app_data_dir / "cache" / "renders", settings.render_cache_bytes)
+_inflight: dict[PayloadKey, Future[EncodedImage | None]] = {}
+_inflight_lock = threading.Lock()
+
+
+def _encode(file_path: Path, *, roi_crop: bool, page: int) -> EncodedImage | None:
+    if file_path.suffix.lower() == ".pdf":
+        pool = get_render_pool()
+        if pool is None:
+            png = render_pdf_page_png(file_path, page, RENDER_DPI, roi_crop=roi_crop)
+        else:
+            png = pool.render(file_path, page, RENDER_DPI, roi_crop=roi_crop)
+        return EncodedImage("image/png", png) if png is not None else None
+
+    if roi_crop or page != 1:
+        # 照片版式不固定，只对 PDF 渲染页做模板裁剪
+        return None
+    mime, _ = mimetypes.guess_type(str(file_path))
+    if not mime:
+        return None
+    try:
+        normalized = normalize_image(
+            file_path,
+            max_edge=settings.image_max_edge,
+            max_bytes=settings.image_max_bytes,
+            enhance=settings.image_enhance,
+        )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        # Pillow 无法解码或像素数超限的文件原样上传，由模型端判断
+        normalized = None
+    if normalized is not None:
+        return EncodedImage("image/jpeg", normalized)
+    return EncodedImage(mime, file_path.read_bytes())
+
+
+def _render_cache_entry(key: PayloadKey) -> tuple[str, str]:
+    """Disk cache file name and mime type of a payload key."""
+    digest, profile = key
+    # PDF 页渲染为 PNG，图片规范化为 JPEG；原样上传的图片读源文件即可，不落盘
+    mime = "image/png" if profile.startswith("pdf:") else "image/jpeg"
+    return f"{digest}-{profile.replace(':', '_')}.{mime.removeprefix('image/')}", mime
+
+
+def _load_rendered(key: PayloadKey) -> EncodedImage | None:
+    if settings.render_cache_bytes <= 0:
+        return None
+    name, mime = _render_cache_entry(key)
+    data = render_cache.get(name)
+    return EncodedImage(mime, data) if data is not None else None
+
+
+def _store_rendered(key: PayloadKey, image: EncodedImage) -> None:
+    name, mime = _render_cache_entry(key)
+    if settings.render_cache_bytes > 0 and image.mime == mime:
+        render_cache.put(name, image.data)
+
+
+def cached_page_render(file_path: Path, page: int = 1) -> bytes | None:
+    """Full-page PNG of a PDF page if it was already rendered for recognition."""
+    try:
+        key = (file_digest(file_path), _profile_key(file_path, roi_crop=False, page=page))
+    except OSError:
+        return None
+    cached = payload_cache.get(key) or _load_rendered(key)
+    return cached.data if cached is not None else None
+
+
+def prepare_image(file_path: Path, *, roi_crop: bool = False, page: int = 1) -> EncodedImage | None:
+    """Return the encoded upload image, reusing cached or in-flight work."""
+    image, _ = _prepare(file_path, roi_crop=roi_crop, page=page, evict=True)
+    return image
+
+
+def _prepare(file_path: Path, *, roi_crop: bool, page: int, evict: bool) -> tuple[EncodedImage | None, bool]:
+    """Encoded image and whether the memory cache holds it (or had nothing to hold)."""
+    try:
+        key = (file_digest(file_path), _profile_key(file_path, roi_crop=roi_crop, page=page))
+    except OSError:
+        return None, True
+
+    cached = payload_cache.get(key)
+    if cached is not None:
+        return cached, True
+
+    with _inflight_lock:
+        pending = _inflight.get(key)
+        owner = pending is None
+        if owner:
+            pending = Future()
+            _inflight[key] = pending
+    if not owner:
+        return pending.result(), True
+
+    try:
+        image = _load_rendered(key)
+        if image is None:
+            image = _encode(file_path, roi_crop=roi_crop, page=page)
+            if image is not None:
+                _store_rendered(key, image)
+        stored = image is None or payload_cache.put(key, image, evict=evict)
+        pending.set_result(image)
+        return image, stored
+    except BaseException as exc:
+        pending.set_exception(exc)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _prewarm_one(file_path: Path, page: int, roi_crop: bool) -> bool:
+    """Cache one target without evicting anything; False once the budget is spent."""
+    if payload_cache.free_bytes <= 0:
+        return False
+    try:
+        _, stored = _prepare(file_path, roi_crop=roi_crop, page=page, evict=False)
+    except Exception:
+        return True
+    return stored
+
+
+def _finish_pooled_render(key: PayloadKey, pending: Future[EncodedImage | None], rendered: Future[bytes | None]) -> None:
+    try:
+        png = rendered.result()
+    except BaseException as exc:
+        pending.set_exception(exc)
+    else:
+        image = EncodedImage("image/png", png) if png is not None else None
+        if image is not None:
+            _store_rendered(key, image)
+            # 预热不挤占识别正在使用的缓存
+            payload_cache.put(key, image, evict=False)
+        pending.set_result(image)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _prewarm_pdf_pages(file_path: Path, pages: list[int], roi_crop: bool) -> None:
+    pool = get_render_pool()
+    if pool is None:
+        for page in pages:
+            if not _prewarm_one(file_path, page, roi_crop):
+                return
+        return
+    try:
+        digest = file_digest(file_path)
+    except OSError:
+        return
+    # 页面交给渲染进程池并行渲染，识别时通过 _inflight 等待对应页。渲染完成才占用缓存，
+    # 所以在途页数以进程数为限，并按已完成页的大小为在途页预留预算，预算用完即停止提交
+    window: set[Future[EncodedImage | None]] = set()
+    page_bytes = 0
+
+    def fits() -> bool:
+        free = payload_cache.free_bytes
+        return free > 0 and free >= (len(window) + 1) * page_bytes
+
+    for page in pages:
+        while window and (len(window) >= pool.workers or not fits()):
+            done, window = wait(window, return_when=FIRST_COMPLETED)
+            for finished in done:
+                image = finished.result() if finished.exception() is None else None
+                if image is not None:
+                    page_bytes = max(page_bytes, len(image.data))
+        if not fits():
+            return
+        key = (digest, _profile_key(file_path, roi_crop=roi_crop, page=page))
+        if payload_cache.get(key) is not None:
+            continue
+        with _inflight_lock:
+            if key in _inflight:
+                continue
+            pending: Future[EncodedImage | None] = Future()
+            _inflight[key] = pending
+        stored = _load_rendered(key)
+        if stored is not None:
+            fits_in_cache = payload_cache.put(key, stored, evict=False)
+            pending.set_result(stored)
+            with _inflight_lock:
+                _inflight.pop(key, None)
+            if not fits_in_cache:
+                return
+            continue
+        rendered = pool.submit(file_path, page, RENDER_DPI, roi_crop=roi_crop)
+        rendered.add_done_callback(partial(_finish_pooled_render, key, pending))
+        window.add(pending)
+
+
+def schedule_prewarm(targets: list[tuple[Path, int]], *, roi_crop: bool = False) -> None:
+    """Hash and encode (file, page) targets in the background while the user reviews the import."""
+    if settings.payload_cache_bytes <= 0:
+        return
+    pages_by_file: dict[Path, list[int]] = {}
+    for path, page in targets:
+        if not is_structured(path):
+            pages_by_file.setdefault(path, []).append(page)
+    for path, pages in pages_by_file.items():
+        if path.suffix.lower() == ".pdf":
+            submit_background(_prewarm_pdf_pages, path, pages, roi_crop)
+        else:
+            submit_background(_prewarm_one, path, pages[0], roi_crop)
@@ -1,35 +1,72 @@
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
 from pathlib import Path
 
-from app.schemas import InvoiceItem
-from app.services.ocr.cloud import SiliconFlowClient
+import httpx
+
+from app.config import settings
+from app.records import ItemRecord
+from app.services.ocr.cassette import Cassette
+from app.services.ocr.cloud import REQUIRED_FIELDS, SiliconFlowClient
+from app.services.ocr.qr import read_invoice_qr
+from app.services.ocr.structured import extract_structured_fields, is_structured
 from app.services.settings_store import infer_category
 
 
 class OcrPipeline:
-    def __init__(self, *, base_url: str, api_key: str, model: str) -> None:
+    def __init__(
+        self,
+        *,
+        base_url: str,
+        api_key: str,
+        model: str,
+        roi_crop: bool = False,
+        stream: bool = False,
+        qr_decode: bool | None = None,
+        http_client: httpx.AsyncClient | None = None,
+        cassette: Cassette | None = None,
+    ) -> None:
+        # 未指定时与 OCR_QR_DECODE 一致，直接构造的管线（测试、评测工具）也默认先读二维码
+        self.qr_decode = settings.ocr_qr_decode if qr_decode is None else qr_decode
         self.cloud_client = SiliconFlowClient(
             base_url=base_url,
             api_key=api_key,
             model=model,
+            roi_crop=roi_crop,
+            stream=stream,
+            http_client=http_client,
+            cassette=cassette,
         )
 
-    def recognize_item(self, item: InvoiceItem, category_mapping: dict[str, list[str]]) -> InvoiceItem:
-        if not self.cloud_client.is_configured:
+    async def recognize_item(
+        self,
+        item: ItemRecord,
+        category_mapping: dict[str, list[str]],
+        timeout_seconds: float = 45,
+    ) -> ItemRecord:
+        file_path = Path(item.source_path)
+        structured = is_structured(file_path)
+        if not structured and not self.cloud_client.is_configured:
             item.status = "failed"
             item.failure_reason = "api_key_not_configured"
             return item
 
-        file_path = Path(item.source_path)
         if not file_path.exists():
             item.status = "failed"
             item.failure_reason = "file_not_found"
             return item
 
         try:
-            extracted = self.cloud_client.extract_fields(file_path=file_path)
+            if structured:
+                # OFD/XML 电子发票自带结构化数据，本地解析即可，无需渲染和调用云端
+                extracted = await asyncio.to_thread(extract_structured_fields, file_path)
+            else:
+                extracted = await self._extract_with_qr(file_path, item.page or 1, timeout_seconds)
+        except (OSError, ValueError):
+            item.status = "failed"
+            item.failure_reason = "structured_parse_failed" if structured else "cloud_request_failed"
+            return item
         except Exception:
             item.status = "failed"
             item.failure_reason = "cloud_request_failed"
@@ -41,7 +78,7 @@ class OcrPipeline:
         item.category = infer_category(item.item_name, item.old_name, category_mapping)
         item.vendor_name = None
         item.extracted_text = None
-        item.updated_at = datetime.utcnow()
+        item.touch()
 
         required_ready = bool(item.invoice_date and item.item_name and item.amount)
         if not required_ready:
@@ -52,3 +89,16 @@ class OcrPipeline:
         item.status = "ok"
         item.failure_reason = None
         return item
+
+    async def _extract_with_qr(self, file_path: Path, page: int, timeout_seconds: float) -> dict:
+        # 二维码里能读到的字段本地解码，只把剩下的交给云端模型
+        qr = await asyncio.to_thread(read_invoice_qr, file_path, page) if self.qr_decode else None
+        known = {"invoice_date": qr.invoice_date, "amount": qr.amount} if qr else {}
+        missing = tuple(name for name in REQUIRED_FIELDS if not known.get(name))
+        extracted = await self.cloud_client.extract_fields(
+            file_path=file_path,
+            timeout_seconds=timeout_seconds,
+            page=page,
+            fields=missing,
+        )
+        return {**extracted, **{name: value for name, value in known.items() if value}}
@@ -0,0 +1,81 @@
+"""Local decoding of the QR code printed on Chinese VAT invoices.
+
+The payload is a comma separated record::
+
+    01,<type>,<code>,<number>,<amount>,<yyyymmdd>,<check code>,<crc>
+
+Decoding needs the optional ``zxing-cpp`` package (``fast`` extra); without
+it the stage is skipped and the cloud model reads every field.
+"""
+from __future__ import annotations
+
+import io
+from dataclasses import dataclass
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.ocr.fields import normalize_amount, normalize_date
+from app.services.ocr.payload import prepare_image
+
+try:
+    import zxingcpp  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zxingcpp = None
+
+
+# 数电票（31 专票 / 32 普票）二维码中的金额为价税合计；
+# 传统增值税发票二维码中是不含税金额，与文件名使用的价税合计不一致，只取日期
+TAX_INCLUSIVE_TYPES = {"31", "32"}
+CORNER_FRACTION = 0.4
+
+
+@dataclass(frozen=True, slots=True)
+class InvoiceQr:
+    invoice_type: str
+    invoice_number: str
+    invoice_date: str | None
+    amount: str | None
+
+
+def is_available() -> bool:
+    return zxingcpp is not None
+
+
+def parse_invoice_qr(text: str) -> InvoiceQr | None:
+    parts = [part.strip() for part in text.strip().split(",")]
+    if len(parts) < 6 or parts[0] != "01" or not parts[3]:
+        return None
+    invoice_date = normalize_date(parts[5])
+    if invoice_date is None:
+        return None
+    amount = normalize_amount(parts[4]) if parts[1] in TAX_INCLUSIVE_TYPES else None
+    return InvoiceQr(invoice_type=parts[1], invoice_number=parts[3], invoice_date=invoice_date, amount=amount)
+
+
+def decode_invoice_qr(image: Image.Image) -> InvoiceQr | None:
+    if zxingcpp is None:
+        return None
+    # 二维码印在左上角，先只扫角落，找不到（如照片旋转）再扫整页
+    corner = image.crop((0, 0, int(image.width * CORNER_FRACTION), int(image.height * CORNER_FRACTION)))
+    for candidate in (corner, image):
+        for barcode in zxingcpp.read_barcodes(candidate, formats=zxingcpp.BarcodeFormat.QRCode):
+            parsed = parse_invoice_qr(barcode.text)
+            if parsed is not None:
+                return parsed
+    return None
+
+
+def read_invoice_qr(file_path: Path, page: int = 1) -> InvoiceQr | None:
+    """Decode the invoice QR code from the full-page upload payload, or None."""
+    if zxingcpp is None:
+        return None
+    # 与上传共用整页渲染的负载缓存，随后的云端请求不会重复渲染
+    encoded = prepare_image(file_path, roi_crop=False, page=page)
+    if encoded is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(encoded.data)) as image:
+            return decode_invoice_qr(image.convert("L"))
+    except (OSError, ValueError):
+        return None
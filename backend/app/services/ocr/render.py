@@ -0,0 +1,83 @@
+"""PDF page rasterization."""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+from app.services.ocr.layout import crop_to_template
+from app.utils.pdf import PDFIUM_LOCK
+
+
+def render_pdf_page_png(
+    file_path: Path,
+    page: int = 1,
+    dpi: int = 220,
+    *,
+    roi_crop: bool = False,
+) -> bytes | None:
+    try:
+        import pypdfium2 as pdfium  # type: ignore
+    except Exception:
+        return None
+
+    if page < 1:
+        page = 1
+    if dpi < 72:
+        dpi = 72
+
+    pdf = None
+    page_obj = None
+    bitmap = None
+    image = None
+    cropped = None
+    buffer = None
+    try:
+        # 只有栅格化需要串行，裁剪和 PNG 编码在锁外并行
+        with PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(str(file_path))
+            if len(pdf) < page:
+                return None
+            page_obj = pdf[page - 1]
+            bitmap = page_obj.render(scale=dpi / 72.0)
+        image = bitmap.to_pil()
+        if roi_crop:
+            cropped = crop_to_template(image)
+            if cropped is None:
+                return None
+        buffer = io.BytesIO()
+        (cropped or image).save(buffer, format="PNG")
+        return buffer.getvalue()
+    except Exception:
+        return None
+    finally:
+        try:
+            if hasattr(cropped, "close"):
+                cropped.close()
+        except Exception:
+            pass
+        try:
+            if hasattr(image, "close"):
+                image.close()
+        except Exception:
+            pass
+        with PDFIUM_LOCK:
+            try:
+                if hasattr(bitmap, "close"):
+                    bitmap.close()
+            except Exception:
+                pass
+            try:
+                if hasattr(page_obj, "close"):
+                    page_obj.close()
+            except Exception:
+                pass
+            try:
+                if hasattr(pdf, "close"):
+                    pdf.close()
+            except Exception:
+                pass
+        try:
+            if buffer is not None:
+                buffer.close()
+        except Exception:
+            pass
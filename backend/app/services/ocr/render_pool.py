@@ -0,0 +1,56 @@
+"""Process pool for PDF rasterization and PNG encoding."""
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from app.config import settings
+from app.services.ocr.render import render_pdf_page_png
+
+
+class RenderPool:
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    def submit(self, file_path: Path, page: int = 1, dpi: int = 220, *, roi_crop: bool = False) -> Future[bytes | None]:
+        # 回传的是编码后的 PNG（通常几百 KB），走 pickle 只多一次拷贝，无需共享内存
+        return self._executor.submit(render_pdf_page_png, file_path, page, dpi, roi_crop=roi_crop)
+
+    def render(self, file_path: Path, page: int = 1, dpi: int = 220, *, roi_crop: bool = False) -> bytes | None:
+        try:
+            return self.submit(file_path, page, dpi, roi_crop=roi_crop).result()
+        except Exception:
+            return None
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: RenderPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool | None:
+    """Shared pool sized by RENDER_WORKERS; None keeps rendering in-process."""
+    global _pool
+    if settings.render_workers <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool(settings.render_workers)
+        return _pool
+
+
+def shutdown_render_pool() -> None:
+    """Stop the worker processes, if the pool was ever started."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
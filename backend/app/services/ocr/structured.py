@@ -0,0 +1,158 @@
+"""Local field extraction for e-invoices that carry structured data (OFD and XML).
+
+These files are read directly instead of being rendered and sent to the
+cloud model, so recognition takes milliseconds and needs no API key.
+"""
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, Iterable
+
+from app.services.importer import STRUCTURED_EXTENSIONS
+from app.services.ocr.fields import normalize_amount, normalize_date, normalize_item_name
+
+
+MAX_MEMBER_BYTES = 8 * 1024 * 1024
+
+# 按优先级排列的字段标签（小写、去命名空间），覆盖数电票 XML、OFD 自定义标签和旧版税控 XML 的拼音标签
+DATE_TAGS = ("issuetime", "issuedate", "invoicedate", "kprq", "requesttime")
+AMOUNT_TAGS = ("totaltax-includedamount", "taxinclusivetotalamount", "totaltaxincludedamount", "jshj")
+ITEM_TAGS = ("itemname", "goodsname", "xmmc", "hwmc", "spmc")
+
+# OFD.xml 中 CustomData 的中文名称映射到上面的标签
+CUSTOM_DATA_NAMES = {"开票日期": "issuedate", "价税合计": "taxinclusivetotalamount", "项目名称": "itemname"}
+
+
+def is_structured(file_path: Path) -> bool:
+    return file_path.suffix.lower() in STRUCTURED_EXTENSIONS
+
+
+def _local_name(tag: Any) -> str:
+    return str(tag).rsplit("}", 1)[-1].lower()
+
+
+def _text(element: ET.Element) -> str:
+    return "".join(element.itertext()).strip()
+
+
+def _tag_values(root: ET.Element) -> dict[str, str]:
+    values: dict[str, str] = {}
+    for element in root.iter():
+        if len(element):
+            continue
+        text = (element.text or "").strip()
+        if text:
+            values.setdefault(_local_name(element.tag), text)
+    return values
+
+
+def _pick(values: dict[str, str], tags: Iterable[str]) -> str | None:
+    for tag in tags:
+        if values.get(tag):
+            return values[tag]
+    return None
+
+
+def _fields(values: dict[str, str]) -> dict[str, str | None]:
+    return {
+        "invoice_date": normalize_date(_pick(values, DATE_TAGS)),
+        "item_name": normalize_item_name(_pick(values, ITEM_TAGS)),
+        "amount": normalize_amount(_pick(values, AMOUNT_TAGS)),
+    }
+
+
+def _read_member(archive: zipfile.ZipFile, name: str) -> ET.Element | None:
+    info = archive.getinfo(name)
+    if info.file_size > MAX_MEMBER_BYTES:
+        return None
+    try:
+        return ET.fromstring(archive.read(info))
+    except ET.ParseError:
+        return None
+
+
+def _ofd_text_objects(archive: zipfile.ZipFile, names: list[str]) -> dict[str, str]:
+    texts: dict[str, str] = {}
+    for name in names:
+        if PurePosixPath(name).name.lower() != "content.xml":
+            continue
+        root = _read_member(archive, name)
+        if root is None:
+            continue
+        for element in root.iter():
+            if _local_name(element.tag) == "textobject" and element.get("ID"):
+                texts[element.get("ID", "")] = _text(element)
+    return texts
+
+
+def _ofd_custom_tags(archive: zipfile.ZipFile, names: list[str]) -> dict[str, str]:
+    # CustomTag.xml 把语义标签（开票日期、价税合计等）指向页面中的文字对象 ID
+    tag_files = [name for name in names if PurePosixPath(name).name.lower() == "customtag.xml"]
+    if not tag_files:
+        return {}
+    texts = _ofd_text_objects(archive, names)
+    values: dict[str, str] = {}
+    for name in tag_files:
+        root = _read_member(archive, name)
+        if root is None:
+            continue
+        for element in root.iter():
+            refs = [child for child in element if _local_name(child.tag) == "objectref"]
+            if not refs:
+                continue
+            text = "".join(texts.get((ref.text or "").strip(), "") for ref in refs).strip()
+            if text:
+                values.setdefault(_local_name(element.tag), text)
+    return values
+
+
+def _ofd_custom_data(archive: zipfile.ZipFile) -> dict[str, str]:
+    if "OFD.xml" not in archive.namelist():
+        return {}
+    root = _read_member(archive, "OFD.xml")
+    if root is None:
+        return {}
+    values: dict[str, str] = {}
+    for element in root.iter():
+        if _local_name(element.tag) != "customdata":
+            continue
+        tag = CUSTOM_DATA_NAMES.get((element.get("Name") or "").strip())
+        if tag and _text(element):
+            values.setdefault(tag, _text(element))
+    return values
+
+
+def _ofd_values(file_path: Path) -> dict[str, str]:
+    values: dict[str, str] = {}
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+        # 优先使用附件中的原始发票 XML，其次是自定义标签和文档元数据
+        for name in names:
+            if "/attachs/" in name.lower() and name.lower().endswith(".xml"):
+                root = _read_member(archive, name)
+                if root is not None:
+                    for key, value in _tag_values(root).items():
+                        values.setdefault(key, value)
+        for key, value in {**_ofd_custom_data(archive), **_ofd_custom_tags(archive, names)}.items():
+            values.setdefault(key, value)
+    return values
+
+
+def extract_structured_fields(file_path: Path) -> dict[str, str | None]:
+    """Read invoice_date / item_name / amount from an OFD or XML e-invoice.
+
+    Raises ValueError when the file is not a readable OFD or XML document.
+    """
+    suffix = file_path.suffix.lower()
+    try:
+        if suffix == ".ofd":
+            values = _ofd_values(file_path)
+        elif suffix == ".xml":
+            values = _tag_values(ET.parse(file_path).getroot())
+        else:
+            raise ValueError(f"unsupported_structured_format: {suffix}")
+    except (zipfile.BadZipFile, ET.ParseError) as exc:
+        raise ValueError(f"structured_parse_failed: {exc}") from exc
+    return _fields(values)
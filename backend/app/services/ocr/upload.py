@@ -0,0 +1,64 @@
+"""Streamed chat-completion request bodies with the image base64-encoded on the fly."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+from app.services.ocr.payload import EncodedImage
+
+
+IMAGE_URL_PLACEHOLDER = "__invoice_image_data_url__"
+# 3 的整数倍，保证各块 base64 编码后可直接拼接而不产生填充字符
+CHUNK_RAW_BYTES = 48 * 1024
+
+
+class ImageRequestBody:
+    """JSON body whose single image data URL is encoded chunk by chunk while it is sent.
+
+    ``payload`` holds :data:`IMAGE_URL_PLACEHOLDER` where the data URL goes.
+    Besides the shared encoded image, an in-flight request holds only the
+    JSON text around the URL and one base64 chunk, instead of the base64
+    string, the data URL and the serialized JSON all at once.
+    """
+
+    def __init__(self, payload: dict[str, Any], image: EncodedImage) -> None:
+        encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        prefix, separator, suffix = encoded.partition(IMAGE_URL_PLACEHOLDER.encode("ascii"))
+        if not separator:
+            raise ValueError("payload has no image placeholder")
+        self.image = image
+        self._prefix = prefix + f"data:{image.mime};base64,".encode("ascii")
+        self._suffix = suffix
+
+    def __len__(self) -> int:
+        return len(self._prefix) + 4 * ((len(self.image.data) + 2) // 3) + len(self._suffix)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        # 显式给出长度，httpx 不再改用分块传输编码
+        return {"Content-Type": "application/json", "Content-Length": str(len(self))}
+
+    def _image_chunks(self) -> Iterator[bytes]:
+        view = memoryview(self.image.data)
+        for offset in range(0, len(view), CHUNK_RAW_BYTES):
+            yield base64.b64encode(view[offset : offset + CHUNK_RAW_BYTES])
+
+    def chunks(self) -> Iterator[bytes]:
+        yield self._prefix
+        yield from self._image_chunks()
+        yield self._suffix
+
+    # 只实现异步迭代：httpx 见到 __iter__ 会把它当作同步请求体，AsyncClient 拒绝发送
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for chunk in self.chunks():
+            yield chunk
+
+    def image_url_digest(self) -> str:
+        """SHA-256 of the data URL, computed without materializing it."""
+        digest = hashlib.sha256(f"data:{self.image.mime};base64,".encode("ascii"))
+        for chunk in self._image_chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,75 @@
+"""Detection of PDFs that bundle several invoices and per-invoice page extraction."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from uuid import uuid4
+
+from app.schemas import PdfSplitMode
+from app.services.ocr.layout import match_template
+from app.utils.files import place_without_overwrite
+from app.utils.pdf import PDFIUM_LOCK
+
+
+# (first_page, page_count), pages are 1-based
+PageRange = tuple[int, int]
+
+
+def _page_sizes(file_path: Path) -> list[tuple[float, float]]:
+    import pypdfium2 as pdfium  # type: ignore
+
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(str(file_path))
+        try:
+            return [pdf.get_page_size(index) for index in range(len(pdf))]
+        finally:
+            pdf.close()
+
+
+def plan_invoice_ranges(file_path: Path, mode: PdfSplitMode) -> list[PageRange]:
+    """Page ranges holding one invoice each; empty when the file should stay whole.
+
+    ``pages`` splits every page. ``auto`` starts a new invoice at each page whose
+    size matches an invoice layout and attaches other pages (detail lists,
+    attachments) to the preceding invoice.
+    """
+    if mode == "off" or file_path.suffix.lower() != ".pdf":
+        return []
+    try:
+        sizes = _page_sizes(file_path)
+    except Exception:
+        return []
+    if len(sizes) < 2:
+        return []
+    if mode == "pages":
+        return [(page, 1) for page in range(1, len(sizes) + 1)]
+
+    starts = [page for page, (width, height) in enumerate(sizes, start=1) if match_template(int(width), int(height))]
+    if len(starts) < 2:
+        return []
+    if starts[0] != 1:
+        starts[0] = 1
+    ends = [*starts[1:], len(sizes) + 1]
+    return [(start, end - start) for start, end in zip(starts, ends)]
+
+
+def extract_pages(source: Path, first_page: int, page_count: int, target: Path) -> None:
+    """Write ``page_count`` pages starting at ``first_page`` into a new PDF at ``target``."""
+    import pypdfium2 as pdfium  # type: ignore
+
+    tmp_path = target.with_name(f".{target.name}.{uuid4().hex}.tmp")
+    with PDFIUM_LOCK:
+        src = pdfium.PdfDocument(str(source))
+        dst = pdfium.PdfDocument.new()
+        try:
+            dst.import_pages(src, list(range(first_page - 1, first_page - 1 + page_count)))
+            with open(tmp_path, "wb") as stream:
+                dst.save(stream)
+                stream.flush()
+                os.fsync(stream.fileno())
+            # 与 rename.move_file 相同，以硬链接放到目标名下：目标已存在时报 target_exists，不会覆盖
+            place_without_overwrite(tmp_path, target)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+            dst.close()
+            src.close()
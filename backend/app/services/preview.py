@@ -0,0 +1,132 @@
+"""Downscaled page previews backed by a content-hash keyed disk cache."""
+from __future__ import annotations
+
+import io
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from app.config import settings
+from app.services.background import submit_prefetch
+from app.services.disk_cache import DiskLRUCache
+from app.utils.files import file_digest
+from app.utils.pdf import PDFIUM_LOCK
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+PREVIEW_SIZE_STEP = 128
+PREVIEW_MIN_SIZE = 256
+PREVIEW_MAX_SIZE = 4096
+PREVIEW_QUALITY = 85
+PREVIEW_MAX_PREFETCH = 10
+PREVIEW_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg"}
+
+preview_cache = DiskLRUCache(settings.app_data_dir / "cache" / "previews", settings.preview_cache_bytes)
+
+
+def normalize_preview_size(size: int) -> int:
+    # 按固定步长取整，减少不同窗口尺寸造成的缓存碎片
+    clamped = min(PREVIEW_MAX_SIZE, max(PREVIEW_MIN_SIZE, size))
+    return -(-clamped // PREVIEW_SIZE_STEP) * PREVIEW_SIZE_STEP
+
+
+def preview_key(file_path: Path, *, page: int, size: int) -> str:
+    return f"{file_digest(file_path)}-p{page}-s{size}.jpg"
+
+
+def _downscale_page_render(png: bytes, size: int) -> Image.Image | None:
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as source:
+        if max(source.size) < size:
+            return None
+        image = source.convert("RGB")
+    image.thumbnail((size, size))
+    return image
+
+
+def _render_pdf_preview(file_path: Path, page: int, size: int) -> Image.Image | None:
+    from app.services.ocr.payload import cached_page_render
+
+    # 识别时已渲染过整页的，直接缩小渲染缓存中的图片，不再打开 PDF 栅格化
+    png = cached_page_render(file_path, page)
+    if png is not None:
+        image = _downscale_page_render(png, size)
+        if image is not None:
+            return image
+
+    import pypdfium2 as pdfium  # type: ignore
+
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(str(file_path))
+        try:
+            if len(pdf) < page:
+                return None
+            page_obj = pdf[page - 1]
+            try:
+                width, height = page_obj.get_size()
+                bitmap = page_obj.render(scale=size / max(width, height, 1))
+                try:
+                    return bitmap.to_pil().convert("RGB")
+                finally:
+                    bitmap.close()
+            finally:
+                page_obj.close()
+        finally:
+            pdf.close()
+
+
+def _render_image_preview(file_path: Path, size: int) -> Image.Image:
+    from PIL import Image, ImageOps
+
+    with Image.open(file_path) as source:
+        image = ImageOps.exif_transpose(source).convert("RGB")
+    image.thumbnail((size, size))
+    return image
+
+
+def _render_preview(file_path: Path, page: int, size: int) -> bytes | None:
+    suffix = file_path.suffix.lower()
+    if suffix not in PREVIEW_EXTENSIONS:
+        return None
+    if suffix == ".pdf":
+        image = _render_pdf_preview(file_path, page, size)
+    elif page == 1:
+        image = _render_image_preview(file_path, size)
+    else:
+        image = None
+    if image is None:
+        return None
+    buffer = io.BytesIO()
+    try:
+        image.save(buffer, format="JPEG", quality=PREVIEW_QUALITY, optimize=True)
+        return buffer.getvalue()
+    finally:
+        image.close()
+
+
+def get_preview(file_path: Path, *, page: int = 1, size: int = 1024) -> bytes | None:
+    key = preview_key(file_path, page=page, size=size)
+    cached = preview_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        data = _render_preview(file_path, page, size)
+    except Exception:
+        return None
+    if data is not None:
+        preview_cache.put(key, data)
+    return data
+
+
+def _prefetch_one(file_path: Path, page: int, size: int) -> None:
+    try:
+        get_preview(file_path, page=page, size=size)
+    except OSError:
+        pass
+
+
+def schedule_preview_prefetch(targets: list[tuple[Path, int]], *, size: int = 1024) -> None:
+    for path, page in targets[:PREVIEW_MAX_PREFETCH]:
+        submit_prefetch(_prefetch_one, path, page, size)
@@ -0,0 +1,114 @@
+"""Opt-in per-request profiling."""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import pstats
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs
+from uuid import uuid4
+
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+TRUTHY_VALUES = {"1", "true", "yes", "on"}
+
+
+def _wants_profile(scope: dict[str, Any]) -> bool:
+    for key, value in scope.get("headers", []):
+        if key == PROFILE_HEADER:
+            return value.decode("latin-1").strip().lower() in TRUTHY_VALUES
+    query = scope.get("query_string", b"")
+    if not query or PROFILE_QUERY.encode() not in query:
+        return False
+    values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY, [])
+    return any(value.strip().lower() in TRUTHY_VALUES for value in values)
+
+
+class ProfilingMiddleware:
+    """Wrap a single flagged request in cProfile and dump the stats to disk.
+
+    Only installed when profiling is enabled in settings, so unflagged traffic
+    pays nothing beyond a header scan. On Python 3.12+ cProfile observes every
+    thread, which covers sync handlers running on the threadpool; it also means
+    concurrent requests show up in the profile, so only one request is profiled
+    at a time.
+    """
+
+    def __init__(self, app: Any, *, output_dir: Path) -> None:
+        self.app = app
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid4().hex[:8]}"
+
+        async def send_with_profile_id(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                headers = [*message.get("headers", []), (PROFILE_ID_HEADER, profile_id.encode("ascii"))]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._lock.release()
+            self._dump(profile_id, profiler, scope, elapsed_ms)
+
+    def _dump(self, profile_id: str, profiler: cProfile.Profile, scope: dict[str, Any], elapsed_ms: float) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(self.output_dir / f"{profile_id}.prof"))
+        meta = {
+            "id": profile_id,
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "duration_ms": round(elapsed_ms, 3),
+            "created_at": datetime.now().isoformat(),
+        }
+        (self.output_dir / f"{profile_id}.json").write_text(json.dumps(meta), encoding="utf-8")
+
+
+def list_profiles(output_dir: Path) -> list[dict[str, Any]]:
+    if not output_dir.exists():
+        return []
+    profiles: list[dict[str, Any]] = []
+    for meta_path in sorted(output_dir.glob("*.json"), reverse=True):
+        try:
+            profiles.append(json.loads(meta_path.read_text(encoding="utf-8")))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return profiles
+
+
+def profile_path(output_dir: Path, profile_id: str) -> Path | None:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = output_dir / f"{profile_id}.prof"
+    return path if path.exists() else None
+
+
+def render_profile_text(path: Path, limit: int = 60) -> str:
+    buffer = io.StringIO()
+    stats = pstats.Stats(str(path), stream=buffer)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
@@ -1,12 +1,106 @@
 from __future__ import annotations
 
+import errno
+import os
+import shutil
 from pathlib import Path
+from uuid import uuid4
 
 from app.schemas import CommitRenameItemResult, RenamePlanItem
+from app.services.pdf_split import extract_pages
+from app.utils.files import place_without_overwrite, target_exists_error
+
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class DirectoryCache:
+    """Creates each target directory once per batch and remembers its device."""
+
+    def __init__(self) -> None:
+        self._created: set[Path] = set()
+        self._devices: dict[Path, int] = {}
+
+    def ensure(self, directory: Path) -> None:
+        if directory not in self._created:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._created.add(directory)
+
+    def device(self, directory: Path) -> int:
+        device = self._devices.get(directory)
+        if device is None:
+            device = self._devices[directory] = os.stat(directory).st_dev
+        return device
+
+
+def _fsync_directory(directory: Path) -> None:
+    # Windows 无法打开目录句柄，NTFS 的元数据日志已保证改名持久
+    if os.name == "nt":
+        return
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def _same_file(source: Path, target: Path) -> bool:
+    try:
+        return os.path.samefile(source, target)
+    except OSError:
+        return False
+
+
+def _copy_across_devices(source: Path, target: Path) -> None:
+    # 先完整写入目标目录下的临时文件并落盘，再以不覆盖的方式放到目标名下，最后才删除源文件；
+    # 中途失败时源文件保持不变，目标位置也不会出现半截文件
+    tmp_path = target.with_name(f".{target.name}.{uuid4().hex}.tmp")
+    try:
+        with source.open("rb") as reader, tmp_path.open("xb") as writer:
+            shutil.copyfileobj(reader, writer, COPY_CHUNK_BYTES)
+            writer.flush()
+            os.fsync(writer.fileno())
+        shutil.copystat(source, tmp_path)
+        place_without_overwrite(tmp_path, target)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    _fsync_directory(target.parent)
+    source.unlink()
+
+
+def move_file(source: Path, target: Path, directories: DirectoryCache) -> None:
+    """Move by link + unlink on the same device, else a streamed copy + fsync + unlink.
+
+    Never overwrites: an existing ``target`` (e.g. created after the plan was
+    built) raises ``FileExistsError``.
+    """
+    if _same_file(source, target):
+        # 大小写不敏感的文件系统上只改大小写，目标就是源文件本身
+        os.replace(source, target)
+        return
+    if target.exists():
+        raise target_exists_error(target)
+    if directories.device(source.parent) == directories.device(target.parent):
+        try:
+            place_without_overwrite(source, target)
+            return
+        except OSError as exc:
+            # 同一 st_dev 仍可能跨挂载点（如绑定挂载），按跨设备处理
+            if exc.errno != errno.EXDEV:
+                raise
+    _copy_across_devices(source, target)
 
 
 def execute_rename_plan(plan: list[RenamePlanItem]) -> list[CommitRenameItemResult]:
+    """Execute a plan from ``build_rename_plan``; conflicts were already checked there."""
     results: list[CommitRenameItemResult] = []
+    directories = DirectoryCache()
     for item in plan:
         if item.action != "rename":
             results.append(
@@ -35,7 +129,12 @@ def execute_rename_plan(plan: list[RenamePlanItem]) -> list[CommitRenameItemResu
             continue
 
         try:
-            source.rename(target)
+            directories.ensure(target.parent)
+            if item.page is not None:
+                # 合并 PDF 中的单张发票另存为独立文件，原文件保留给其余页
+                extract_pages(source, item.page, item.page_count, target)
+            else:
+                move_file(source, target, directories)
             result = CommitRenameItemResult(
                 item_id=item.item_id,
                 source_path=item.source_path,
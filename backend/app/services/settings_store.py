@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import sys
 
 from dotenv import dotenv_values, set_key
 
@@ -140,5 +141,6 @@ def infer_category(item_name: str | None, filename: str, mapping: dict[str, list
         for keyword in keywords:
             token = keyword.strip().lower()
             if token and token in source:
-                return category
+                # 类别名驻留后，大任务中的条目共享同一字符串
+                return sys.intern(category)
     return "其他"
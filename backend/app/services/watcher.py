@@ -0,0 +1,259 @@
+"""Watch-folder ingestion with inotify on Linux and a polling fallback."""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app.services.importer import is_invoice_candidate, is_invoice_file
+
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+READ_BUFFER_SIZE = 64 * 1024
+TICK_SECONDS = 0.5
+
+
+class _PollingSource:
+    """Rescans only directories whose mtime changed since the previous poll."""
+
+    name = "polling"
+
+    def __init__(self, root: Path, stop: threading.Event, interval: float) -> None:
+        self.root = root
+        self.stop = stop
+        self.interval = interval
+        self._dir_mtimes: dict[str, int] = {}
+
+    def _scan_dir(self, directory: str, found: set[str]) -> None:
+        try:
+            self._dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            self._dir_mtimes.pop(directory, None)
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in self._dir_mtimes:
+                        self._scan_dir(entry.path, found)
+                elif entry.is_file():
+                    found.add(entry.path)
+            except OSError:
+                continue
+
+    def initial_files(self) -> set[str]:
+        found: set[str] = set()
+        self._scan_dir(str(self.root), found)
+        return found
+
+    def poll(self, timeout: float) -> set[str]:
+        self.stop.wait(max(timeout, self.interval))
+        found: set[str] = set()
+        for directory, mtime_ns in list(self._dir_mtimes.items()):
+            try:
+                current = os.stat(directory).st_mtime_ns
+            except OSError:
+                self._dir_mtimes.pop(directory, None)
+                continue
+            if current != mtime_ns:
+                self._scan_dir(directory, found)
+        return found
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifySource:
+    name = "inotify"
+
+    def __init__(self, root: Path, stop: threading.Event) -> None:
+        self.root = root
+        self.stop = stop
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: dict[int, str] = {}
+
+    def _add_tree(self, directory: str, found: set[str]) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            logger.warning("inotify_add_watch failed for %s (errno %s)", directory, ctypes.get_errno())
+        else:
+            self._dirs[wd] = directory
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    self._add_tree(entry.path, found)
+                elif entry.is_file():
+                    found.add(entry.path)
+            except OSError:
+                continue
+
+    def initial_files(self) -> set[str]:
+        found: set[str] = set()
+        self._add_tree(str(self.root), found)
+        return found
+
+    def poll(self, timeout: float) -> set[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, READ_BUFFER_SIZE)
+        except BlockingIOError:
+            return set()
+
+        found: set[str] = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                return self.initial_files()
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path, found)
+                continue
+            found.add(path)
+        return found
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class FolderWatcher:
+    """Emit new invoice files under ``root`` once they stop changing.
+
+    A file is handed to ``on_files`` after its size and mtime have been stable
+    for ``settle_seconds``, so half-written scans are never ingested. Every
+    path is accepted at most once per watcher: paths that ``on_files``
+    returns as not accepted, or the whole batch if it raises, are handed
+    over again after another settle period.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        on_files: Callable[[list[Path]], Iterable[Path] | None],
+        *,
+        settle_seconds: float = 2.0,
+        poll_interval: float = 2.0,
+        include_existing: bool = False,
+        force_polling: bool = False,
+    ) -> None:
+        self.root = root
+        self.on_files = on_files
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.include_existing = include_existing
+        self.force_polling = force_polling
+        self.backend = "pending"
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _open_source(self) -> _InotifySource | _PollingSource:
+        if sys.platform.startswith("linux") and not self.force_polling:
+            try:
+                return _InotifySource(self.root, self._stop)
+            except (OSError, AttributeError):
+                logger.warning("inotify unavailable, falling back to polling for %s", self.root)
+        return _PollingSource(self.root, self._stop, self.poll_interval)
+
+    def start(self) -> None:
+        source = self._open_source()
+        self.backend = source.name
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(source,),
+            name=f"watch:{self.root.name}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _run(self, source: _InotifySource | _PollingSource) -> None:
+        seen: set[str] = set()
+        # path -> (size, mtime_ns, monotonic time of the last observed change)
+        pending: dict[str, tuple[int, int, float]] = {}
+
+        def consider(paths: set[str]) -> None:
+            for path in paths:
+                if path not in seen and is_invoice_candidate(Path(path)):
+                    pending.setdefault(path, (-1, -1, time.monotonic()))
+
+        try:
+            initial = source.initial_files()
+            if self.include_existing:
+                consider(initial)
+            else:
+                seen.update(initial)
+
+            while not self._stop.is_set():
+                consider(source.poll(TICK_SECONDS))
+                ready = self._settle(pending)
+                # 扩展名符合但内容不是发票的文件（如任意 .xml）写完后再判断，之后不再理会
+                skipped = {path for path in ready if not is_invoice_file(Path(path))}
+                seen.update(skipped)
+                ready = [path for path in ready if path not in skipped]
+                if not ready:
+                    continue
+                try:
+                    rejected = {str(path) for path in self.on_files([Path(path) for path in sorted(ready)]) or ()}
+                except Exception:
+                    logger.exception("Watch ingestion failed for %s", self.root)
+                    rejected = set(ready)
+                # 只有被接收的文件才算处理过，其余重新等待一个稳定期后再提交
+                seen.update(path for path in ready if path not in rejected)
+                retry_at = time.monotonic()
+                for path in rejected:
+                    pending[path] = (-1, -1, retry_at)
+        finally:
+            source.close()
+
+    def _settle(self, pending: dict[str, tuple[int, int, float]]) -> list[str]:
+        now = time.monotonic()
+        ready: list[str] = []
+        for path, (size, mtime_ns, changed_at) in list(pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                pending.pop(path, None)
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+            elif stat.st_size > 0 and now - changed_at >= self.settle_seconds:
+                pending.pop(path, None)
+                ready.append(path)
+        return ready
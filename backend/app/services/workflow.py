@@ -0,0 +1,161 @@
+"""Invoice workflow shared by the API handlers, the CLI and queue workers."""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from app.config import settings
+from app.records import ItemRecord
+from app.schemas import PdfSplitMode
+from app.services.duplicates import (
+    DuplicateIndex,
+    flag_import_duplicates,
+    record_recognized,
+    reuse_batch_fields,
+    reuse_indexed_fields,
+)
+from app.services.jobs import JobQueue
+from app.services.pdf_split import plan_invoice_ranges
+
+if TYPE_CHECKING:
+    import httpx
+
+    from app.services.ocr.cassette import Cassette
+    from app.services.ocr.pipeline import OcrPipeline
+
+
+def open_duplicate_index() -> DuplicateIndex | None:
+    if not settings.duplicate_index_enabled:
+        return None
+    return DuplicateIndex(settings.app_data_dir / "invoice_index.sqlite3")
+
+
+def open_job_queue() -> JobQueue:
+    return JobQueue(settings.app_data_dir / "jobs.sqlite3", max_attempts=settings.job_max_attempts)
+
+
+def new_pipeline(
+    settings_data: dict,
+    *,
+    api_key_override: str | None = None,
+    http_client: httpx.AsyncClient | None = None,
+) -> OcrPipeline:
+    # 识别链路（httpx、Pillow、渲染进程池）首次使用时才导入，缩短 API 冷启动
+    from app.services.ocr.cassette import Cassette
+    from app.services.ocr.pipeline import OcrPipeline
+
+    api_key = (api_key_override or "").strip() or str(settings_data["siliconflow_api_key"])
+    return OcrPipeline(
+        base_url=str(settings_data["siliconflow_base_url"]),
+        api_key=api_key,
+        model=str(settings_data["siliconflow_model"]),
+        roi_crop=settings.ocr_roi_crop,
+        stream=settings.ocr_streaming,
+        qr_decode=settings.ocr_qr_decode,
+        http_client=http_client,
+        cassette=Cassette(settings.ocr_cassette_dir) if settings.ocr_cassette_dir else None,
+    )
+
+
+def new_items(
+    files: list[Path],
+    index: DuplicateIndex | None,
+    *,
+    prewarm: bool = True,
+    split_mode: PdfSplitMode | None = None,
+) -> list[ItemRecord]:
+    split_mode = split_mode or settings.pdf_split_mode
+    items: list[ItemRecord] = []
+    for file_path in files:
+        ranges = plan_invoice_ranges(file_path, split_mode)
+        if not ranges:
+            items.append(ItemRecord(source_path=str(file_path), old_name=file_path.name, file_ext=file_path.suffix.lower()))
+            continue
+        items.extend(
+            ItemRecord(
+                source_path=str(file_path),
+                old_name=file_path.name,
+                file_ext=file_path.suffix.lower(),
+                page=first_page,
+                page_count=page_count,
+            )
+            for first_page, page_count in ranges
+        )
+    flag_import_duplicates(items, index)
+    if prewarm:
+        from app.services.ocr.payload import schedule_prewarm
+
+        schedule_prewarm([(Path(item.source_path), item.page or 1) for item in items], roi_crop=settings.ocr_roi_crop)
+    return items
+
+
+async def _recognize_one(
+    item: ItemRecord,
+    pipeline: OcrPipeline,
+    mapping: dict[str, list[str]],
+    index: DuplicateIndex | None,
+    semaphore: asyncio.Semaphore,
+    item_timeout: float,
+    original: tuple[ItemRecord, asyncio.Task] | None = None,
+) -> None:
+    if original is not None:
+        original_item, original_task = original
+        # 同批次内容相同的文件等第一份识别完直接复制结果，不再单独调用云端；第一份失败时再自行识别
+        await asyncio.wait([original_task])
+        if reuse_batch_fields(item, original_item, mapping):
+            item.touch()
+            return
+    async with semaphore:
+        if not reuse_indexed_fields(item, index, mapping):
+            try:
+                async with asyncio.timeout(item_timeout):
+                    await pipeline.recognize_item(item=item, category_mapping=mapping, timeout_seconds=item_timeout)
+            except TimeoutError:
+                item.status = "failed"
+                item.failure_reason = "item_timeout"
+            record_recognized(item, index)
+    item.touch()
+
+
+async def run_recognition(
+    items: list[ItemRecord],
+    pipeline: OcrPipeline,
+    mapping: dict[str, list[str]],
+    index: DuplicateIndex | None,
+    *,
+    concurrency: int | None = None,
+    deadline_seconds: float | None = None,
+    item_timeout_seconds: float | None = None,
+) -> int:
+    """Recognize ``items`` in place and return how many were interrupted.
+
+    Items still running or waiting when ``deadline_seconds`` elapses are
+    cancelled and marked ``interrupted`` so a later call can resume them.
+    """
+    if not items:
+        return 0
+    semaphore = asyncio.Semaphore(max(concurrency or settings.recognize_concurrency, 1))
+    item_timeout = item_timeout_seconds or settings.recognize_item_timeout
+    running: dict[asyncio.Task, ItemRecord] = {}
+    originals: dict[str, tuple[ItemRecord, asyncio.Task]] = {}
+    for item in items:
+        original = originals.get(item.content_hash) if item.content_hash else None
+        task = asyncio.create_task(_recognize_one(item, pipeline, mapping, index, semaphore, item_timeout, original))
+        running[task] = item
+        if item.content_hash and original is None:
+            originals[item.content_hash] = (item, task)
+    done, pending = await asyncio.wait(running, timeout=deadline_seconds)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    for task in pending:
+        item = running[task]
+        item.status = "interrupted"
+        item.failure_reason = "deadline_exceeded"
+        item.touch()
+    for task in done:
+        # 与 gather 一致：单条识别中的意外异常仍向调用方抛出
+        task.result()
+    return len(pending)
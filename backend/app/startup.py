@@ -0,0 +1,82 @@
+"""Startup timing and background warm-up for the desktop sidecar.
+
+Heavy modules (httpx, Pillow, pypdfium2, the OCR pipeline) are imported on
+first use so the API starts listening early; once it does, a background
+thread imports them ahead of the first request. ``/api/ready`` reports both
+phases, measured from the moment this module was first imported.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.schemas import ReadinessState
+
+
+logger = logging.getLogger(__name__)
+
+BOOT_AT = time.perf_counter()
+WARMUP_MODULES = (
+    "httpx",
+    "PIL.Image",
+    "pypdfium2",
+    "app.services.ocr.payload",
+    "app.services.ocr.pipeline",
+    "app.services.watcher",
+)
+
+_lock = threading.Lock()
+_ready_at: float | None = None
+_warm_at: float | None = None
+_module_ms: dict[str, float] = {}
+
+
+def _elapsed_ms(moment: float | None) -> float | None:
+    return round((moment - BOOT_AT) * 1000, 1) if moment is not None else None
+
+
+def _warm_up() -> None:
+    global _warm_at
+    started = time.perf_counter()
+    for name in WARMUP_MODULES:
+        began = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            logger.warning("Warm-up import of %s failed", name, exc_info=True)
+            continue
+        with _lock:
+            _module_ms[name] = round((time.perf_counter() - began) * 1000, 1)
+    with _lock:
+        _warm_at = time.perf_counter()
+    logger.info("Warm-up finished in %.0f ms", (_warm_at - started) * 1000)
+
+
+def mark_ready(*, warm_up: bool = True) -> None:
+    """Record that the app is serving and start importing deferred modules."""
+    global _ready_at
+    with _lock:
+        if _ready_at is not None:
+            return
+        _ready_at = time.perf_counter()
+    logger.info("API ready %.0f ms after boot", (_ready_at - BOOT_AT) * 1000)
+    if warm_up:
+        threading.Thread(target=_warm_up, name="startup-warmup", daemon=True).start()
+
+
+def readiness() -> ReadinessState:
+    # 本模块要在启动最早期导入以记录起点，不能在顶层导入 pydantic 模型
+    from app.schemas import ReadinessState
+
+    with _lock:
+        return ReadinessState(
+            ready=_ready_at is not None,
+            warm=_warm_at is not None,
+            startup_ms=_elapsed_ms(_ready_at),
+            warmup_ms=round((_warm_at - _ready_at) * 1000, 1) if _warm_at and _ready_at else None,
+            warmup_modules=dict(_module_ms),
+        )
@@ -1,20 +1,404 @@
+"""Task store with an idle TTL and LRU spill-to-disk under item/byte budgets."""
 from __future__ import annotations
 
+import json
+import logging
+import os
+import sys
 import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+from uuid import uuid4
 
-from app.schemas import TaskState
+from app.records import TaskRecord, to_datetime
+from app.schemas import TaskInfo, TaskState, TaskStoreStats, TaskSummary
+
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECONDS = 60.0
+# 删除或过期任务的 id 保留这么久，足够覆盖仍持有记录的请求的迟到保存
+TOMBSTONE_SECONDS = 3600.0
+SIZE_SAMPLE = 256
+
+
+def estimate_task_bytes(task: TaskRecord) -> int:
+    """Approximate resident size, extrapolated from an evenly spaced sample of items."""
+    items = task.items
+    size = sys.getsizeof(task) + sys.getsizeof(items)
+    if not items:
+        return size
+    sample = items[:: max(len(items) // SIZE_SAMPLE, 1)]
+    per_item = sum(item.estimate_bytes() for item in sample) / len(sample)
+    return size + int(per_item * len(items))
+
+
+@dataclass(slots=True)
+class _Entry:
+    task: TaskRecord | None
+    template: str
+    created_at: float
+    updated_at: float
+    last_access: float
+    items: int
+    bytes: int
+    summary: TaskSummary
+    pins: int = 0
+    # 每次访问或保存递增；落盘完成时据此判断期间是否有人动过任务
+    generation: int = 0
+    # 正在锁外落盘或加载
+    busy: bool = False
+
+    @property
+    def resident(self) -> bool:
+        return self.task is not None
+
+
+@dataclass(slots=True)
+class _Spill:
+    task_id: str
+    entry: _Entry
+    generation: int
+    task: TaskRecord
+    meta: dict
 
 
 class InMemoryTaskStore:
-    def __init__(self) -> None:
+    """Holds live task records; callers mutate them in place and save to publish.
+
+    Records are shared, so a read-modify-save must run under
+    :meth:`locked` for that task; concurrent edits then never see (or
+    publish) each other's half-applied changes.
+
+    Tasks idle for longer than ``ttl_seconds`` are deleted. When resident
+    tasks exceed ``max_items`` or ``max_bytes``, the least recently used
+    unpinned ones are written to ``spill_dir`` and loaded back on access.
+    Without a spill directory they are dropped instead. Spilling and loading
+    run outside the store lock. Deleted and expired ids are remembered for
+    ``TOMBSTONE_SECONDS`` so a late save from a handler still holding the
+    record cannot bring the task back.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Path | None = None,
+        *,
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_items: int = 1_000_000,
+        max_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.spill_dir = spill_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.max_bytes = max_bytes
         self._lock = threading.Lock()
-        self._tasks: dict[str, TaskState] = {}
+        self._idle = threading.Condition(self._lock)
+        self._entries: OrderedDict[str, _Entry] | None = None
+        # task_id -> 删除或过期的时间，在清理过期任务时一并淘汰
+        self._tombstones: dict[str, float] = {}
+        self._task_locks: dict[str, threading.RLock] = {}
+        self._last_sweep = 0.0
+
+    def _ensure_entries(self) -> OrderedDict[str, _Entry]:
+        if self._entries is not None:
+            return self._entries
+        # 重启后从落盘的元数据恢复任务列表，正文在访问时再加载
+        restored: list[tuple[str, _Entry]] = []
+        if self.spill_dir is not None and self.spill_dir.is_dir():
+            for meta_path in self.spill_dir.glob("*.meta.json"):
+                try:
+                    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                    entry = _Entry(
+                        task=None,
+                        template=meta["template"],
+                        created_at=meta["created_at"],
+                        updated_at=meta["updated_at"],
+                        last_access=meta["last_access"],
+                        items=meta["items"],
+                        bytes=meta["bytes"],
+                        summary=TaskSummary.model_validate(meta["summary"]),
+                    )
+                except (OSError, ValueError, KeyError):
+                    logger.warning("Skipping unreadable spilled task %s", meta_path.name)
+                    continue
+                restored.append((meta_path.name.removesuffix(".meta.json"), entry))
+        restored.sort(key=lambda pair: pair[1].last_access)
+        self._entries = OrderedDict(restored)
+        return self._entries
+
+    def _paths(self, task_id: str) -> tuple[Path, Path]:
+        assert self.spill_dir is not None
+        return self.spill_dir / f"{task_id}.json", self.spill_dir / f"{task_id}.meta.json"
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _remove_files(self, task_id: str) -> None:
+        if self.spill_dir is None:
+            return
+        for path in self._paths(task_id):
+            path.unlink(missing_ok=True)
+
+    def _settled(self, task_id: str) -> _Entry | None:
+        # 等待正在锁外加载的任务就位；正在落盘的任务仍驻留，可直接使用
+        entries = self._ensure_entries()
+        while (entry := entries.get(task_id)) is not None and entry.busy and entry.task is None:
+            self._idle.wait()
+        return entry
+
+    def _write_spilled(self, victim: _Spill) -> bool:
+        assert self.spill_dir is not None
+        body_path, meta_path = self._paths(victim.task_id)
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(body_path, victim.task.to_model().model_dump_json().encode("utf-8"))
+            self._write_atomic(meta_path, json.dumps(victim.meta).encode("utf-8"))
+        except OSError:
+            logger.exception("Failed to spill task %s", victim.task_id)
+            self._remove_files(victim.task_id)
+            return False
+        return True
 
-    def save_task(self, task: TaskState) -> None:
+    def _spill(self, victims: list[_Spill]) -> None:
+        for victim in victims:
+            # 正被处理的任务不落盘；持有任务锁期间也不会有人改动待序列化的记录
+            task_lock = self._task_lock(victim.task_id)
+            if task_lock.acquire(blocking=False):
+                try:
+                    written = self._write_spilled(victim)
+                finally:
+                    task_lock.release()
+            else:
+                written = False
+                victim.generation = -1
+            with self._lock:
+                entries = self._ensure_entries()
+                entry = victim.entry
+                entry.busy = False
+                self._idle.notify_all()
+                if entries.get(victim.task_id) is not entry or entry.generation != victim.generation:
+                    # 落盘期间任务被删除、访问、保存过或正被处理，以内存中的为准
+                    if written:
+                        self._remove_files(victim.task_id)
+                elif written:
+                    entry.task = None
+                else:
+                    del entries[victim.task_id]
+
+    def _read_spilled(self, task_id: str) -> TaskRecord | None:
+        body_path, _ = self._paths(task_id)
+        try:
+            task = TaskRecord.from_model(TaskState.model_validate_json(body_path.read_bytes()))
+        except (OSError, ValueError):
+            logger.exception("Failed to load spilled task %s", task_id)
+            return None
+        self._remove_files(task_id)
+        return task
+
+    def _forget(self, task_id: str, now: float) -> None:
+        """Drop a deleted or expired task and refuse later saves of its id."""
+        del self._ensure_entries()[task_id]
+        self._tombstones[task_id] = now
+        self._task_locks.pop(task_id, None)
+        self._remove_files(task_id)
+
+    def _sweep_expired(self, now: float) -> None:
+        entries = self._ensure_entries()
+        expired = [
+            task_id
+            for task_id, entry in entries.items()
+            if not entry.pins and not entry.busy and now - entry.last_access > self.ttl_seconds
+        ]
+        for task_id in expired:
+            self._forget(task_id, now)
+        self._tombstones = {
+            task_id: removed_at
+            for task_id, removed_at in self._tombstones.items()
+            if now - removed_at < TOMBSTONE_SECONDS
+        }
+        self._last_sweep = now
+
+    def _enforce_limits(self, keep: str) -> list[_Spill]:
+        """Pick LRU victims; the caller writes them out after releasing the lock."""
+        now = time.time()
+        if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self._sweep_expired(now)
+
+        entries = self._ensure_entries()
+        counted = [entry for entry in entries.values() if entry.resident and not entry.busy]
+        resident_items = sum(entry.items for entry in counted)
+        resident_bytes = sum(entry.bytes for entry in counted)
+        victims: list[_Spill] = []
+        for task_id, entry in list(entries.items()):
+            if resident_items <= self.max_items and resident_bytes <= self.max_bytes:
+                break
+            if task_id == keep or entry.pins or entry.busy or entry.task is None:
+                continue
+            if self.spill_dir is None:
+                del entries[task_id]
+            else:
+                entry.busy = True
+                meta = {
+                    "template": entry.template,
+                    "created_at": entry.created_at,
+                    "updated_at": entry.updated_at,
+                    "last_access": entry.last_access,
+                    "items": entry.items,
+                    "bytes": entry.bytes,
+                    "summary": entry.summary.model_dump(),
+                }
+                victims.append(_Spill(task_id, entry, entry.generation, entry.task, meta))
+            resident_items -= entry.items
+            resident_bytes -= entry.bytes
+        return victims
+
+    def _accessed(self, task_id: str, entry: _Entry, now: float) -> list[_Spill]:
+        entry.last_access = now
+        entry.generation += 1
+        self._ensure_entries().move_to_end(task_id)
+        return self._enforce_limits(keep=task_id)
+
+    def save_task(self, task: TaskRecord) -> bool:
+        """Publish ``task``; returns False if it was deleted or expired in the meantime."""
+        now = time.time()
         with self._lock:
-            self._tasks[task.id] = task.model_copy(deep=True)
+            if task.id in self._tombstones:
+                return False
+            entries = self._ensure_entries()
+            entry = self._settled(task.id)
+            if entry is None:
+                entry = _Entry(
+                    task=task,
+                    template=task.template,
+                    created_at=task.created_at,
+                    updated_at=task.updated_at,
+                    last_access=now,
+                    items=0,
+                    bytes=0,
+                    summary=task.summary,
+                )
+                entries[task.id] = entry
+            elif not entry.resident:
+                # 落盘期间仍被持有的记录再次保存，以内存中的为准
+                self._remove_files(task.id)
+            entry.task = task
+            entry.template = task.template
+            entry.updated_at = task.updated_at
+            entry.items = len(task.items)
+            entry.bytes = estimate_task_bytes(task)
+            entry.summary = task.summary
+            victims = self._accessed(task.id, entry, now)
+        self._spill(victims)
+        return True
+
+    def get_task(self, task_id: str) -> TaskRecord | None:
+        now = time.time()
+        victims: list[_Spill] = []
+        with self._lock:
+            entries = self._ensure_entries()
+            entry = self._settled(task_id)
+            if entry is None:
+                return None
+            if not entry.pins and now - entry.last_access > self.ttl_seconds:
+                self._forget(task_id, now)
+                return None
+            task = entry.task
+            if task is None:
+                entry.busy = True
+            else:
+                victims = self._accessed(task_id, entry, now)
+        if task is None:
+            # 在锁外读取落盘文件，其他任务的读写不必排队等待
+            task = self._read_spilled(task_id)
+            with self._lock:
+                entry.busy = False
+                self._idle.notify_all()
+                if entries.get(task_id) is not entry:
+                    return None
+                if task is None:
+                    del entries[task_id]
+                    return None
+                entry.task = task
+                victims = self._accessed(task_id, entry, now)
+        self._spill(victims)
+        return task
+
+    def delete_task(self, task_id: str) -> bool:
+        """Delete a task, pinned or not; later saves of the same id are refused."""
+        with self._lock:
+            entry = self._settled(task_id)
+            if entry is None:
+                return False
+            self._forget(task_id, time.time())
+            return True
+
+    def _task_lock(self, task_id: str) -> threading.RLock:
+        with self._lock:
+            return self._task_locks.setdefault(task_id, threading.RLock())
+
+    @contextmanager
+    def locked(self, task_id: str) -> Iterator[None]:
+        """Serialize read-modify-save sequences on one task across threads."""
+        with self._task_lock(task_id):
+            yield
+
+    def pin(self, task_id: str) -> None:
+        """Keep a task resident and exempt from TTL while it is in use."""
+        with self._lock:
+            entry = self._ensure_entries().get(task_id)
+            if entry is not None:
+                entry.pins += 1
+
+    def unpin(self, task_id: str) -> None:
+        with self._lock:
+            entry = self._ensure_entries().get(task_id)
+            if entry is not None and entry.pins:
+                entry.pins -= 1
+                entry.last_access = time.time()
+
+    @contextmanager
+    def pinned(self, task_id: str) -> Iterator[None]:
+        self.pin(task_id)
+        try:
+            yield
+        finally:
+            self.unpin(task_id)
 
-    def get_task(self, task_id: str) -> TaskState | None:
+    def stats(self) -> TaskStoreStats:
         with self._lock:
-            task = self._tasks.get(task_id)
-            return task.model_copy(deep=True) if task else None
+            entries = self._ensure_entries()
+            tasks = [
+                TaskInfo(
+                    id=task_id,
+                    template=entry.template,
+                    created_at=to_datetime(entry.created_at),
+                    updated_at=to_datetime(entry.updated_at),
+                    last_access_at=to_datetime(entry.last_access),
+                    items=entry.items,
+                    estimated_bytes=entry.bytes,
+                    resident=entry.resident,
+                    pinned=entry.pins > 0,
+                    summary=entry.summary,
+                )
+                for task_id, entry in reversed(entries.items())
+            ]
+        resident = [info for info in tasks if info.resident]
+        return TaskStoreStats(
+            resident_tasks=len(resident),
+            spilled_tasks=len(tasks) - len(resident),
+            resident_items=sum(info.items for info in resident),
+            resident_bytes=sum(info.estimated_bytes for info in resident),
+            max_items=self.max_items,
+            max_bytes=self.max_bytes,
+            ttl_seconds=int(self.ttl_seconds),
+            tasks=tasks,
+        )
@@ -0,0 +1,329 @@
+"""Accuracy-vs-latency evaluation of recognition settings: ``python -m app.tools.ocr_eval``.
+
+Runs a labeled invoice set through :class:`OcrPipeline` once per
+configuration and reports field accuracy, per-item latency and bytes on the
+wire. With ``--replay`` the model answers come from recorded cassettes via
+the in-process stub (no network, no credits). With ``--record`` the real API
+is called and its answers are recorded for later replays.
+
+Labels are CSV (``file,page,invoice_date,item_name,amount``) or a JSON list
+of objects with the same keys; paths are relative to the labels file.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import statistics
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+from pydantic import TypeAdapter
+
+from app.config import Settings, settings
+from app.records import ItemRecord
+from app.services.ocr.cassette import Cassette
+from app.services.ocr.cloud import REQUIRED_FIELDS
+from app.services.ocr.fields import normalize_amount, normalize_date, normalize_item_name
+from app.services.ocr.payload import payload_cache
+from app.services.ocr.pipeline import OcrPipeline
+from app.tools.vlm_stub import LatencyModel, create_stub_app
+
+
+STUB_BASE_URL = "http://vlm-stub/v1"
+
+
+@dataclass(frozen=True, slots=True)
+class LabeledInvoice:
+    path: Path
+    page: int | None
+    invoice_date: str | None
+    item_name: str | None
+    amount: str | None
+
+
+@dataclass(slots=True)
+class EvalConfig:
+    name: str
+    overrides: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def parse(cls, spec: str) -> EvalConfig:
+        """``name:key=value,key=value`` with keys naming :class:`Settings` fields."""
+        name, _, rest = spec.partition(":")
+        overrides: dict[str, Any] = {}
+        for pair in filter(None, (part.strip() for part in rest.split(","))):
+            key, separator, value = pair.partition("=")
+            key = key.strip().lower()
+            if not separator or key not in Settings.model_fields:
+                raise ValueError(f"invalid override {pair!r} in config {name!r}")
+            overrides[key] = TypeAdapter(Settings.model_fields[key].annotation).validate_python(value.strip())
+        return cls(name=name.strip() or "baseline", overrides=overrides)
+
+
+@dataclass(slots=True)
+class EvalResult:
+    name: str
+    overrides: dict[str, Any]
+    items: int
+    ok: int
+    accuracy: dict[str, float]
+    latency_ms: dict[str, float]
+    wall_ms: float
+    requests: int
+    request_bytes: int
+    response_bytes: int
+    stub: dict[str, int] | None = None
+    stream: dict[str, float] | None = None
+
+
+def load_labels(path: Path) -> list[LabeledInvoice]:
+    if path.suffix.lower() == ".json":
+        rows = json.loads(path.read_text(encoding="utf-8"))
+    else:
+        with path.open(encoding="utf-8-sig", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+    labels = []
+    for row in rows:
+        page = str(row.get("page") or "").strip()
+        labels.append(
+            LabeledInvoice(
+                path=(path.parent / str(row["file"])).resolve(),
+                page=int(page) if page else None,
+                invoice_date=normalize_date(row.get("invoice_date")),
+                item_name=normalize_item_name(row.get("item_name")),
+                amount=normalize_amount(row.get("amount")),
+            )
+        )
+    return labels
+
+
+@contextmanager
+def _overridden(overrides: dict[str, Any]) -> Iterator[None]:
+    # 各模块直接引用全局 settings 对象，只能原地修改并在结束后还原
+    previous = {key: getattr(settings, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(settings, key, value)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            setattr(settings, key, value)
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, counter: _WireCounter) -> None:
+        self._stream = stream
+        self._counter = counter
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._counter.response_bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class _WireCounter(httpx.AsyncBaseTransport):
+    """Transport wrapper counting request and response body bytes."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+        self.requests = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        # 请求体是流式生成的，按 Content-Length 计数而不读取内容
+        self.request_bytes += int(request.headers.get("content-length", 0))
+        response = await self._transport.handle_async_request(request)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CountingStream(response.stream, self),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 1)
+
+
+def _score(labels: list[LabeledInvoice], items: list[ItemRecord]) -> dict[str, float]:
+    matches = {name: 0 for name in (*REQUIRED_FIELDS, "all")}
+    for label, item in zip(labels, items):
+        correct = [getattr(label, name) == getattr(item, name) for name in REQUIRED_FIELDS]
+        for name, hit in zip(REQUIRED_FIELDS, correct):
+            matches[name] += hit
+        matches["all"] += all(correct)
+    return {name: round(count / max(len(labels), 1), 4) for name, count in matches.items()}
+
+
+async def evaluate(
+    config: EvalConfig,
+    labels: list[LabeledInvoice],
+    *,
+    replay: Cassette | None = None,
+    record: Cassette | None = None,
+    latency: LatencyModel | None = None,
+    error_rate: float = 0.0,
+    seed: int | None = None,
+    concurrency: int = 8,
+    timeout_seconds: float = 45,
+) -> EvalResult:
+    """Recognize every labeled invoice under ``config`` and score the results."""
+    # 绕过渲染磁盘缓存并清空负载缓存，使每个配置都计入自己的渲染和编码耗时
+    with _overridden({**config.overrides, "render_cache_bytes": 0}):
+        payload_cache.clear()
+        stub_app = None
+        if replay is not None:
+            stub_app = create_stub_app(replay, latency=latency, error_rate=error_rate, seed=seed)
+            counter = _WireCounter(httpx.ASGITransport(app=stub_app))
+            base_url, api_key = STUB_BASE_URL, "replay"
+        else:
+            counter = _WireCounter(httpx.AsyncHTTPTransport())
+            base_url, api_key = settings.siliconflow_base_url, settings.siliconflow_api_key
+
+        items = [
+            ItemRecord(
+                source_path=str(label.path),
+                old_name=label.path.name,
+                file_ext=label.path.suffix.lower(),
+                page=label.page,
+            )
+            for label in labels
+        ]
+        latencies: list[float] = []
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        async with httpx.AsyncClient(transport=counter, timeout=timeout_seconds) as client:
+            pipeline = OcrPipeline(
+                base_url=base_url,
+                api_key=api_key,
+                model=settings.siliconflow_model,
+                roi_crop=settings.ocr_roi_crop,
+                stream=settings.ocr_streaming,
+                qr_decode=settings.ocr_qr_decode,
+                http_client=client,
+                cassette=record,
+            )
+
+            async def run_one(item: ItemRecord) -> None:
+                async with semaphore:
+                    started = time.perf_counter()
+                    await pipeline.recognize_item(item, {}, timeout_seconds=timeout_seconds)
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(run_one(item) for item in items))
+            wall_ms = (time.perf_counter() - started) * 1000
+            stream_stats = pipeline.cloud_client.stream_stats.summary() if settings.ocr_streaming else None
+
+    stub_stats = stub_app.state.stats if stub_app is not None else None
+    return EvalResult(
+        name=config.name,
+        overrides={key: str(value) for key, value in config.overrides.items()},
+        items=len(items),
+        ok=sum(item.status == "ok" for item in items),
+        accuracy=_score(labels, items),
+        latency_ms={
+            "mean": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+            "p50": _percentile(latencies, 0.5) if latencies else 0.0,
+            "p95": _percentile(latencies, 0.95) if latencies else 0.0,
+        },
+        wall_ms=round(wall_ms, 1),
+        requests=counter.requests,
+        request_bytes=counter.request_bytes,
+        response_bytes=counter.response_bytes,
+        stub=(
+            {"hits": stub_stats.hits, "misses": stub_stats.misses, "injected_errors": stub_stats.injected_errors}
+            if stub_stats is not None
+            else None
+        ),
+        stream=stream_stats,
+    )
+
+
+def _print_results(results: list[EvalResult]) -> None:
+    print(
+        f"{'config':<16} {'all':>6} {'date':>6} {'item':>6} {'amount':>6}"
+        f" {'p50 ms':>8} {'p95 ms':>8} {'wall ms':>9} {'req KiB':>9} {'misses':>6}"
+    )
+    for result in results:
+        accuracy = result.accuracy
+        misses = result.stub["misses"] if result.stub else "-"
+        print(
+            f"{result.name:<16} {accuracy['all']:>6.1%} {accuracy['invoice_date']:>6.1%} {accuracy['item_name']:>6.1%}"
+            f" {accuracy['amount']:>6.1%} {result.latency_ms['p50']:>8.0f} {result.latency_ms['p95']:>8.0f}"
+            f" {result.wall_ms:>9.0f} {result.request_bytes / 1024:>9.1f} {misses:>6}"
+        )
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.ocr_eval", description="识别准确率与延迟评测")
+    parser.add_argument("labels", type=Path, help="标注文件（CSV 或 JSON）")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--replay", type=Path, help="从磁带目录离线回放模型回答")
+    source.add_argument("--record", type=Path, help="调用真实接口并把回答录制到该目录")
+    parser.add_argument(
+        "--config",
+        action="append",
+        default=[],
+        help="待比较的配置，格式 名称:字段=值,字段=值，如 small:image_max_edge=1280；可重复",
+    )
+    parser.add_argument("--latency", default="recorded", help="回放延迟分布，同 app.tools.vlm_stub")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回放时注入失败的请求比例")
+    parser.add_argument("--seed", type=int, default=0, help="回放随机种子")
+    parser.add_argument("--concurrency", type=int, default=settings.recognize_concurrency, help="并发识别数")
+    parser.add_argument("--json", dest="json_path", type=Path, help="把结果写入 JSON 文件")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    labels = load_labels(args.labels)
+    configs = [EvalConfig.parse(spec) for spec in args.config] or [EvalConfig("baseline")]
+    if args.record is not None and not settings.siliconflow_api_key.strip():
+        print("录制模式需要在 .env 中配置 SILICONFLOW_API_KEY")
+        return 3
+
+    replay = Cassette(args.replay) if args.replay is not None else None
+    record = Cassette(args.record) if args.record is not None else None
+    results = [
+        asyncio.run(
+            evaluate(
+                config,
+                labels,
+                replay=replay,
+                record=record,
+                latency=LatencyModel.parse(args.latency),
+                error_rate=args.error_rate,
+                seed=args.seed,
+                concurrency=args.concurrency,
+                timeout_seconds=settings.recognize_item_timeout,
+            )
+        )
+        for config in configs
+    ]
+    _print_results(results)
+    if args.json_path:
+        args.json_path.write_text(
+            json.dumps([asdict(result) for result in results], ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,175 @@
+"""Cold-start benchmark: ``python -m app.tools.startup_bench``.
+
+Imports the app in fresh interpreters with ``-X importtime`` and reports
+the median import time per module, and optionally starts the production
+server to measure time until ``/api/ready`` answers and until it is warm.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+@dataclass(slots=True)
+class ModuleTiming:
+    module: str
+    self_ms: float
+    cumulative_ms: float
+
+
+def parse_importtime(stderr: str) -> dict[str, tuple[float, float]]:
+    """Map module name to (self, cumulative) milliseconds from ``-X importtime`` output."""
+    timings: dict[str, tuple[float, float]] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+            timings[name.strip()] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+        except ValueError:
+            continue
+    return timings
+
+
+def _isolated_env(data_dir: str) -> dict[str, str]:
+    # 使用临时数据目录，避免基准测试读写真实任务和索引
+    env = {**os.environ, "APP_DATA_DIR": data_dir}
+    # 该变量只要非空（包括 "0"）就会禁止写 .pyc；去掉它，按正常启动的字节码缓存计时
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def measure_imports(module: str, runs: int) -> tuple[list[float], list[ModuleTiming]]:
+    totals: list[float] = []
+    samples: dict[str, list[tuple[float, float]]] = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for _ in range(runs):
+            completed = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET.format(module=module)],
+                cwd=BACKEND_DIR,
+                env=_isolated_env(data_dir),
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            totals.append(float(completed.stdout.strip().splitlines()[-1]))
+            for name, timing in parse_importtime(completed.stderr).items():
+                samples.setdefault(name, []).append(timing)
+    modules = [
+        ModuleTiming(
+            module=name,
+            self_ms=round(statistics.median(value[0] for value in values), 2),
+            cumulative_ms=round(statistics.median(value[1] for value in values), 2),
+        )
+        for name, values in samples.items()
+    ]
+    modules.sort(key=lambda timing: timing.cumulative_ms, reverse=True)
+    return totals, modules
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return int(probe.getsockname()[1])
+
+
+def _get_json(url: str) -> dict | None:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def measure_server(timeout: float) -> dict[str, float | None]:
+    """Wall-clock ms from spawning ``app.server`` until it answers and until it is warm."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/api/ready"
+    with tempfile.TemporaryDirectory() as data_dir:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "app.server", "--port", str(port)],
+            cwd=BACKEND_DIR,
+            env=_isolated_env(data_dir),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        answered_ms = warm_ms = None
+        state: dict | None = None
+        try:
+            while time.perf_counter() - started < timeout:
+                state = _get_json(url)
+                now_ms = (time.perf_counter() - started) * 1000
+                if state is not None and answered_ms is None:
+                    answered_ms = now_ms
+                if state is not None and state.get("warm"):
+                    warm_ms = now_ms
+                    break
+                time.sleep(0.01)
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+    return {
+        "first_response_ms": round(answered_ms, 1) if answered_ms is not None else None,
+        "warm_ms": round(warm_ms, 1) if warm_ms is not None else None,
+        "reported_startup_ms": state.get("startup_ms") if state else None,
+        "reported_warmup_ms": state.get("warmup_ms") if state else None,
+    }
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.startup_bench", description="后端冷启动基准测试")
+    parser.add_argument("--module", default="app.main", help="要测量导入耗时的模块（默认 app.main）")
+    parser.add_argument("--runs", type=int, default=5, help="重复次数，结果取中位数")
+    parser.add_argument("--top", type=int, default=20, help="输出累计耗时最高的模块数")
+    parser.add_argument("--prefix", default="", help="只列出以此前缀开头的模块，如 app.")
+    parser.add_argument("--server", action="store_true", help="同时启动 app.server 测量就绪与预热耗时")
+    parser.add_argument("--timeout", type=float, default=30.0, help="等待服务就绪的最长秒数")
+    parser.add_argument("--json", dest="json_path", help="把结果写入 JSON 文件，便于对比")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    totals, modules = measure_imports(args.module, max(args.runs, 1))
+    listed = [timing for timing in modules if timing.module.startswith(args.prefix)][: args.top]
+
+    print(f"import {args.module}: median {statistics.median(totals):.1f} ms over {len(totals)} runs")
+    print(f"{'cumulative ms':>14} {'self ms':>10}  module")
+    for timing in listed:
+        print(f"{timing.cumulative_ms:>14.2f} {timing.self_ms:>10.2f}  {timing.module}")
+
+    result: dict = {
+        "module": args.module,
+        "runs": len(totals),
+        "import_ms": round(statistics.median(totals), 2),
+        "modules": [asdict(timing) for timing in modules],
+    }
+    if args.server:
+        result["server"] = measure_server(args.timeout)
+        print("server: " + ", ".join(f"{key}={value}" for key, value in result["server"].items()))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,173 @@
+"""OpenAI-compatible stub that replays recorded cassettes: ``python -m app.tools.vlm_stub``.
+
+Point ``SILICONFLOW_BASE_URL`` at ``http://127.0.0.1:<port>/v1`` to run the
+app offline. Each answer is delayed by a configurable latency distribution,
+and a fraction of requests can be failed to exercise retries and error paths.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.ocr.cassette import Cassette, request_fingerprint
+
+
+STREAM_CHUNK_CHARS = 16
+
+
+@dataclass(frozen=True, slots=True)
+class LatencyModel:
+    """Delay per answer: ``recorded[:scale]``, ``fixed:ms``, ``uniform:lo:hi`` or ``lognormal:median:sigma``."""
+
+    kind: str = "recorded"
+    a: float = 1.0
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> LatencyModel:
+        name, _, rest = spec.strip().partition(":")
+        values = [float(value) for value in rest.split(":") if value]
+        if name == "recorded" and len(values) <= 1:
+            return cls("recorded", values[0] if values else 1.0)
+        if name == "fixed" and len(values) == 1:
+            return cls("fixed", values[0])
+        if name in {"uniform", "lognormal"} and len(values) == 2:
+            return cls(name, values[0], values[1])
+        raise ValueError(f"invalid latency spec: {spec!r}")
+
+    def sample_ms(self, rng: random.Random, recorded_ms: float) -> float:
+        if self.kind == "recorded":
+            return recorded_ms * self.a
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        # 对数正态：a 为中位数，b 为对数标准差，长尾接近真实云端延迟
+        return rng.lognormvariate(0.0, self.b) * self.a
+
+
+@dataclass(slots=True)
+class StubStats:
+    hits: int = 0
+    misses: int = 0
+    injected_errors: int = 0
+    missed_fingerprints: list[str] = field(default_factory=list)
+
+
+def _error(status: int, message: str, error_type: str) -> JSONResponse:
+    return JSONResponse({"error": {"message": message, "type": error_type}}, status_code=status)
+
+
+def _completion(model: str, content: str) -> dict[str, Any]:
+    return {
+        "id": f"stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+def _stream_lines(model: str, content: str) -> list[str]:
+    lines = []
+    for start in range(0, len(content), STREAM_CHUNK_CHARS):
+        chunk = {
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start : start + STREAM_CHUNK_CHARS]}}],
+        }
+        lines.append(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+    lines.append("data: [DONE]\n\n")
+    return lines
+
+
+def create_stub_app(
+    cassette: Cassette,
+    *,
+    latency: LatencyModel | None = None,
+    error_rate: float = 0.0,
+    error_status: int = 503,
+    seed: int | None = None,
+) -> FastAPI:
+    """Build the stub; hit/miss/error counters are kept on ``app.state.stats``."""
+    latency = latency or LatencyModel()
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    stats = StubStats()
+    app = FastAPI(title="VLM cassette stub")
+    app.state.stats = stats
+
+    @app.get("/v1/models")
+    async def list_models() -> dict[str, Any]:
+        return {"object": "list", "data": []}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        payload = await request.json()
+        fingerprint = request_fingerprint(payload)
+        entry = cassette.get(fingerprint)
+        with rng_lock:
+            failed = rng.random() < error_rate
+            delay_ms = latency.sample_ms(rng, entry.latency_ms if entry else 0.0)
+        await asyncio.sleep(max(delay_ms, 0.0) / 1000)
+
+        if failed:
+            stats.injected_errors += 1
+            return _error(error_status, "injected failure", "stub_injected_error")
+        if entry is None:
+            stats.misses += 1
+            stats.missed_fingerprints.append(fingerprint)
+            return _error(404, f"no cassette entry for {fingerprint}", "cassette_miss")
+        stats.hits += 1
+
+        model = str(payload.get("model") or entry.model)
+        if payload.get("stream"):
+            return StreamingResponse(iter(_stream_lines(model, entry.content)), media_type="text/event-stream")
+        return _completion(model, entry.content)
+
+    return app
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.tools.vlm_stub", description="回放录制磁带的 OpenAI 兼容模拟服务")
+    parser.add_argument("--cassettes", type=Path, required=True, help="磁带目录（OCR_CASSETTE_DIR 录制的结果）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8790, help="监听端口")
+    parser.add_argument("--latency", default="recorded", help="延迟分布：recorded[:倍数] / fixed:毫秒 / uniform:下限:上限 / lognormal:中位数:sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="注入失败的请求比例（0~1）")
+    parser.add_argument("--error-status", type=int, default=503, help="注入失败时返回的 HTTP 状态码")
+    parser.add_argument("--seed", type=int, help="随机种子，便于复现")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    import uvicorn
+
+    cassette = Cassette(args.cassettes)
+    app = create_stub_app(
+        cassette,
+        latency=LatencyModel.parse(args.latency),
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    print(f"Replaying {len(cassette)} recorded calls at http://{args.host}:{args.port}/v1")
+    try:
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    finally:
+        print(json.dumps(asdict(app.state.stats), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+"""File helpers."""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DIGEST_MEMO_LIMIT = 4096
+
+_digest_memo: dict[tuple[str, int, int], str] = {}
+_digest_lock = threading.Lock()
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of the file content, memoized by path, size and mtime."""
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _digest_lock:
+        cached = _digest_memo.get(memo_key)
+    if cached:
+        return cached
+
+    hasher = hashlib.sha256()
+    with path.open("rb") as handle:
+        while chunk := handle.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+
+    with _digest_lock:
+        if len(_digest_memo) >= DIGEST_MEMO_LIMIT:
+            _digest_memo.clear()
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def target_exists_error(target: Path) -> FileExistsError:
+    return FileExistsError(f"target_exists: {target}")
+
+
+def place_without_overwrite(source: Path, target: Path) -> None:
+    """Give ``source`` the name ``target``; fails instead of replacing an existing file.
+
+    Raises ``OSError`` with ``EXDEV`` when the two are on different devices.
+    """
+    # 硬链接在目标已存在时直接失败，检查与改名之间不会被其他进程抢先写入
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        raise target_exists_error(target) from None
+    except OSError as exc:
+        if exc.errno == errno.EXDEV:
+            raise
+        # 不支持硬链接的文件系统（FAT/exFAT、部分网络盘）退回先检查再改名
+        if target.exists():
+            raise target_exists_error(target) from None
+        os.rename(source, target)
+        return
+    source.unlink()
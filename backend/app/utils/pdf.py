@@ -0,0 +1,9 @@
+"""Process-wide guard for pdfium, which is not thread-safe."""
+from __future__ import annotations
+
+import threading
+
+
+# 渲染、预览、拆分都可能在线程池中并发调用 pdfium；所有 pdfium 调用都须持有此锁。
+# 渲染进程池的各子进程各有一份 pdfium，互不影响，可真正并行。
+PDFIUM_LOCK = threading.Lock()
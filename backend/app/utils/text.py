@@ -57,3 +57,48 @@ def parse_json_object(raw: str) -> dict:
             return {}
     return {}
 
+
+class JsonObjectScanner:
+    """Incrementally locate the first complete top-level JSON object in streamed text.
+
+    ``feed`` returns the parsed object (via ``parse_json_object``) as soon as
+    its closing brace arrives, so callers can stop reading the stream.
+    """
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self.result: dict | None = None
+
+    def feed(self, chunk: str) -> dict | None:
+        if self.result is not None:
+            return self.result
+        start = 0 if self._depth else None
+        for position, char in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == "{":
+                if self._depth == 0:
+                    start = position
+                self._depth += 1
+            elif self._depth == 0:
+                # 对象之前的 markdown 围栏或说明文字直接丢弃
+                continue
+            elif char == '"':
+                self._in_string = True
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start : position + 1])
+                    self.result = parse_json_object("".join(self._parts))
+                    return self.result
+        if self._depth:
+            self._parts.append(chunk[start:])
+        return None
@@ -0,0 +1,144 @@
+"""Recognition worker: ``python -m app.worker``.
+
+Pulls jobs from the local queue that the API fills when JOB_QUEUE_ENABLED is
+set, runs them through the OCR pipeline and writes the fields back.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from contextlib import nullcontext
+from uuid import uuid4
+
+import httpx
+
+from app.config import settings
+from app.services.jobs import Job, JobQueue
+from app.services.ocr.render_pool import shutdown_render_pool
+from app.services.settings_store import load_runtime_settings
+from app.services.workflow import new_pipeline, open_duplicate_index, open_job_queue, run_recognition
+
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL_SECONDS = 3600.0
+PURGE_AFTER_SECONDS = 24 * 3600.0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="发票识别队列 worker")
+    parser.add_argument("--processes", type=int, default=1, help="启动的 worker 进程数（默认 1）")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.recognize_concurrency,
+        help="每个进程同时进行的云端调用数",
+    )
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="队列为空时的轮询间隔（秒）")
+    parser.add_argument("--drain", action="store_true", help="队列清空后退出")
+    return parser
+
+
+async def run_worker(
+    queue: JobQueue,
+    *,
+    concurrency: int,
+    poll_interval: float = 1.0,
+    drain: bool = False,
+    http_client: httpx.AsyncClient | None = None,
+) -> int:
+    """Process jobs until cancelled (or until the queue is empty with ``drain``)."""
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+    index = open_duplicate_index()
+    concurrency = max(concurrency, 1)
+    in_flight: dict[asyncio.Task, Job] = {}
+    processed = 0
+    last_purge = 0.0
+    # 识别耗时可能超过租约：定期续租，租约只在 worker 真正失联后才过期
+    renew_interval = settings.job_visibility_timeout / 3
+    last_renewal = time.monotonic()
+
+    async def process(job: Job, settings_data: dict) -> None:
+        pipeline = new_pipeline(settings_data, http_client=client)
+        await run_recognition([job.item], pipeline, dict(settings_data["category_mapping"]), index, concurrency=1)
+        if not await asyncio.to_thread(queue.complete, job, owner):
+            logger.warning("Lease lost for job %s, result discarded", job.id)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) if http_client is None else nullcontext(http_client) as client:
+        while True:
+            if time.monotonic() - last_purge >= PURGE_INTERVAL_SECONDS:
+                await asyncio.to_thread(queue.purge_finished, PURGE_AFTER_SECONDS)
+                last_purge = time.monotonic()
+            if in_flight and time.monotonic() - last_renewal >= renew_interval:
+                await asyncio.to_thread(queue.renew, list(in_flight.values()), owner, settings.job_visibility_timeout)
+                last_renewal = time.monotonic()
+
+            capacity = concurrency - len(in_flight)
+            jobs = await asyncio.to_thread(queue.lease, owner, capacity, settings.job_visibility_timeout) if capacity else []
+            if jobs:
+                # 每批租约重新读取设置，界面改动模型或 Key 后无需重启 worker
+                settings_data = load_runtime_settings()
+                in_flight.update((asyncio.create_task(process(job, settings_data)), job) for job in jobs)
+            elif not in_flight:
+                if drain:
+                    return processed
+                await asyncio.sleep(poll_interval)
+                continue
+
+            done, _ = await asyncio.wait(
+                in_flight,
+                timeout=0 if jobs and len(in_flight) < concurrency else poll_interval,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for finished in done:
+                del in_flight[finished]
+                processed += 1
+                if finished.exception() is not None:
+                    # 未写回的任务在租约超时后会被重新领取
+                    logger.error("Recognition job crashed", exc_info=finished.exception())
+
+
+def _worker_main(concurrency: int, poll_interval: float, drain: bool) -> None:
+    logging.basicConfig(level=settings.log_level)
+    try:
+        processed = asyncio.run(
+            run_worker(open_job_queue(), concurrency=concurrency, poll_interval=poll_interval, drain=drain)
+        )
+    except KeyboardInterrupt:
+        return
+    finally:
+        shutdown_render_pool()
+    logger.info("Worker %s processed %d jobs", os.getpid(), processed)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    worker_args = (args.concurrency, args.poll_interval, args.drain)
+    if args.processes <= 1:
+        _worker_main(*worker_args)
+        return 0
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_worker_main, args=worker_args, name=f"recognize-worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
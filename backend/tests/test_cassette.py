@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.records import ItemRecord
+from app.services.ocr.cassette import Cassette, request_fingerprint
+from app.services.ocr.pipeline import OcrPipeline
+from app.tools.ocr_eval import EvalConfig, evaluate, load_labels
+from app.tools.vlm_stub import LatencyModel
+
+ANSWER = {"invoice_date": "2024-01-05", "item_name": "*餐饮服务*餐费", "amount": "26.80"}
+
+
+def _record(tmp_path: Path) -> tuple[Cassette, Path]:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        content = json.dumps(ANSWER, ensure_ascii=False)
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    path = tmp_path / "invoice.png"
+    Image.new("RGB", (400, 300), "white").save(path)
+    cassette = Cassette(tmp_path / "cassettes")
+    pipeline = OcrPipeline(
+        base_url="https://vlm.test/v1",
+        api_key="sk-test",
+        model="test-model",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        cassette=cassette,
+    )
+    item = ItemRecord(source_path=str(path), old_name=path.name, file_ext=".png")
+    asyncio.run(pipeline.recognize_item(item, {}))
+    assert item.status == "ok"
+    return cassette, path
+
+
+def test_fingerprint_ignores_stream_flag_but_not_image() -> None:
+    payload = {
+        "model": "m",
+        "messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": "data:a"}}]}],
+    }
+    other_image = json.loads(json.dumps(payload).replace("data:a", "data:b"))
+
+    assert request_fingerprint(payload) == request_fingerprint({**payload, "stream": True})
+    assert request_fingerprint(payload) != request_fingerprint(other_image)
+
+
+def test_replay_scores_recorded_answers_offline(tmp_path: Path) -> None:
+    _, path = _record(tmp_path)
+    labels_path = tmp_path / "labels.csv"
+    labels_path.write_text(
+        f"file,page,invoice_date,item_name,amount\n{path.name},,20240105,*餐饮服务*餐费,26.8\n", encoding="utf-8"
+    )
+    labels = load_labels(labels_path)
+    replay = Cassette(tmp_path / "cassettes")
+
+    async def run(config: EvalConfig):
+        return await evaluate(config, labels, replay=replay, latency=LatencyModel.parse("fixed:5"))
+
+    baseline = asyncio.run(run(EvalConfig.parse("baseline:ocr_qr_decode=false,siliconflow_model=test-model")))
+    streamed = asyncio.run(run(EvalConfig.parse("stream:ocr_streaming=true,ocr_qr_decode=false,siliconflow_model=test-model")))
+    # 改变上传尺寸后请求指纹不同，需要重新录制才能评测准确率
+    resized = asyncio.run(run(EvalConfig.parse("small:image_max_edge=128,ocr_qr_decode=false,siliconflow_model=test-model")))
+
+    assert (baseline.accuracy["all"], baseline.stub["hits"], baseline.request_bytes > 0) == (1.0, 1, True)
+    assert (streamed.accuracy["all"], streamed.stub["hits"]) == (1.0, 1)
+    assert (resized.accuracy["all"], resized.stub["misses"]) == (0.0, 1)
+
+
+def test_latency_specs() -> None:
+    rng = random.Random(0)
+
+    assert LatencyModel.parse("recorded:0.5").sample_ms(rng, 800) == 400
+    assert 100 <= LatencyModel.parse("uniform:100:200").sample_ms(rng, 0) <= 200
+    with pytest.raises(ValueError):
+        LatencyModel.parse("gamma:1")
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.services.disk_cache import DiskLRUCache
+
+
+def test_disk_cache_evicts_oldest_entry(tmp_path: Path) -> None:
+    cache = DiskLRUCache(tmp_path, max_bytes=10)
+    cache.put("a.jpg", b"1234")
+    cache.put("b.jpg", b"1234")
+    assert cache.get("a.jpg") == b"1234"
+
+    cache.put("c.jpg", b"1234")
+
+    assert cache.get("b.jpg") is None
+    assert not (tmp_path / "b.jpg").exists()
+    assert cache.stats()["bytes"] == 8
+
+
+def test_disk_cache_index_is_rebuilt_from_disk(tmp_path: Path) -> None:
+    DiskLRUCache(tmp_path, max_bytes=100).put("a.jpg", b"data")
+
+    reopened = DiskLRUCache(tmp_path, max_bytes=100)
+
+    assert reopened.get("a.jpg") == b"data"
+    assert reopened.get("../escape") is None
+
+
+def test_disk_cache_sees_entries_written_by_other_processes(tmp_path: Path, monkeypatch) -> None:
+    cache = DiskLRUCache(tmp_path, max_bytes=10)
+    assert cache.get("a.jpg") is None
+    other = DiskLRUCache(tmp_path, max_bytes=10)
+    other.put("a.jpg", b"1234")
+    other.put("b.jpg", b"1234")
+
+    assert cache.get("a.jpg") == b"1234"
+
+    # 到达重扫间隔后，写入时把 b.jpg 也计入容量，淘汰最久未用的条目
+    monkeypatch.setattr("app.services.disk_cache.RESCAN_SECONDS", 0.0)
+    cache.put("c.jpg", b"1234")
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.jpg", "c.jpg"]
+    assert cache.stats()["bytes"] == 8
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.records import ItemRecord
+from app.services.duplicates import DuplicateIndex, flag_import_duplicates, record_recognized, reuse_indexed_fields
+from app.services.naming import apply_name_preview, build_rename_plan
+
+
+def _imported(path: Path) -> ItemRecord:
+    return ItemRecord(source_path=str(path), old_name=path.name, file_ext=path.suffix)
+
+
+def _recognized(item: ItemRecord) -> ItemRecord:
+    item.invoice_date = "20251205"
+    item.item_name = "*餐饮服务*餐费"
+    item.amount = "23.31"
+    item.category = "餐饮"
+    item.status = "ok"
+    return item
+
+
+def test_same_content_is_flagged_and_reuses_fields(tmp_path: Path) -> None:
+    index = DuplicateIndex(tmp_path / "index.sqlite3")
+    first_path = tmp_path / "a.pdf"
+    second_path = tmp_path / "b.pdf"
+    first_path.write_bytes(b"invoice-1")
+    second_path.write_bytes(b"invoice-1")
+
+    first = _imported(first_path)
+    flag_import_duplicates([first], index)
+    record_recognized(_recognized(first), index)
+
+    second = _imported(second_path)
+    flag_import_duplicates([second], index)
+
+    assert second.duplicate_kind == "content"
+    assert second.duplicate_of == str(first_path)
+    assert reuse_indexed_fields(second, index, {"餐饮": ["餐饮服务"]})
+    assert second.amount == "23.31"
+    assert second.category == "餐饮"
+
+
+def test_same_fields_flag_duplicate_and_skip_rename(tmp_path: Path) -> None:
+    index = DuplicateIndex(tmp_path / "index.sqlite3")
+    scan_path = tmp_path / "scan.pdf"
+    photo_path = tmp_path / "photo.pdf"
+    scan_path.write_bytes(b"scan")
+    photo_path.write_bytes(b"photo")
+
+    items = [_imported(scan_path), _imported(photo_path)]
+    flag_import_duplicates(items, index)
+    for item in items:
+        record_recognized(_recognized(item), index)
+
+    apply_name_preview(items)
+    plan = build_rename_plan(items)
+
+    assert items[1].duplicate_kind == "fields"
+    assert items[0].suggested_name == items[1].suggested_name == "20251205-餐饮-23.31元.pdf"
+    assert plan[0].action == "rename"
+    assert plan[1].action == "skip"
+    assert plan[1].reason == "duplicate_invoice"
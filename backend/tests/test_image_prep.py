@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+from PIL import Image, ImageDraw
+
+from app.services.ocr.image_prep import estimate_skew, normalize_image
+
+
+def _text_rows(width: int, height: int) -> Image.Image:
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for top in range(40, height - 40, 60):
+        draw.rectangle((40, top, width - 40, top + 12), fill="black")
+    return image
+
+
+def test_photo_is_transposed_downscaled_and_budgeted(tmp_path: Path) -> None:
+    path = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # 相机横拿拍摄，需顺时针旋转 90°
+    _text_rows(4000, 3000).save(path, format="JPEG", quality=95, exif=exif)
+
+    data = normalize_image(path, max_edge=2048, max_bytes=200_000)
+
+    assert data is not None and len(data) <= 200_000
+    with Image.open(io.BytesIO(data)) as result:
+        width, height = result.size
+    assert height > width
+    assert height <= 2048
+    assert width * 4 == height * 3
+
+
+def test_small_upright_image_is_sent_unchanged(tmp_path: Path) -> None:
+    path = tmp_path / "scan.png"
+    _text_rows(800, 600).save(path)
+    assert normalize_image(path, max_edge=2048, max_bytes=1_500_000) is None
+
+
+def test_estimate_skew_recovers_small_rotation() -> None:
+    tilted = _text_rows(1200, 900).rotate(-2, fillcolor="white", resample=Image.Resampling.BICUBIC)
+    assert estimate_skew(tilted) == 2.0
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+
+import httpx
+
+from app.records import ItemRecord, TaskRecord
+from app.services.jobs import JobQueue
+from app.worker import run_worker
+
+
+def _item(name: str) -> ItemRecord:
+    return ItemRecord(source_path=f"/missing/{name}", old_name=name, file_ext=".pdf")
+
+
+def test_expired_lease_is_retried_then_marked_dead(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "jobs.sqlite3", max_attempts=2)
+    item = _item("a.pdf")
+    queue.enqueue("task", [item])
+
+    first = queue.lease("crashed-worker", 10, visibility_timeout=0.01)
+    assert [job.item.id for job in first] == [item.id]
+    assert queue.lease("other", 10, visibility_timeout=30) == []
+
+    time.sleep(0.02)
+    second = queue.lease("other", 10, visibility_timeout=0.01)
+    assert second[0].attempts == 2
+    assert not queue.complete(first[0], "crashed-worker")
+
+    time.sleep(0.02)
+    assert queue.lease("third", 10, visibility_timeout=30) == []
+    results = queue.take_results("task")
+    assert [(result.item_id, result.dead) for result in results] == [(item.id, True)]
+    assert queue.take_results("task") == []
+
+
+def test_worker_drains_queue_and_writes_results_back(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    items = [_item(f"{index}.pdf") for index in range(3)]
+    queue.enqueue("task", items)
+    assert queue.active_count("task") == 3
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(500)))
+    processed = asyncio.run(run_worker(queue, concurrency=2, poll_interval=0.01, drain=True, http_client=client))
+
+    assert processed == 3
+    assert queue.active_count("task") == 0
+    results = queue.take_results("task")
+    assert {result.item_id for result in results} == {item.id for item in items}
+    assert all(result.values["status"] == "failed" for result in results)
+
+
+def test_renewed_lease_is_not_taken_over(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    queue.enqueue("task", [_item("slow.pdf")])
+    jobs = queue.lease("slow-worker", 10, visibility_timeout=0.05)
+
+    time.sleep(0.03)
+    assert queue.renew(jobs, "slow-worker", visibility_timeout=30) == 1
+    time.sleep(0.05)
+    assert queue.lease("other", 10, visibility_timeout=30) == []
+    assert queue.renew(jobs, "other", visibility_timeout=30) == 0
+    assert queue.complete(jobs[0], "slow-worker")
+    assert queue.active_count("task") == 0
+    assert queue.active_count("never-enqueued") == 0
+
+
+def test_api_merges_worker_results_without_a_read(tmp_path: Path, monkeypatch) -> None:
+    from app import main
+
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    monkeypatch.setattr(main, "job_queue", queue)
+    item = _item("a.pdf")
+    task = TaskRecord(id="merge-task", items=[item])
+    main.store.save_task(task)
+    queue.enqueue(task.id, [item])
+    published: list[int] = []
+    monkeypatch.setattr(main.live_hub, "publish", lambda task, **kwargs: published.append(task.version))
+
+    [job] = queue.lease("worker", 10, visibility_timeout=30)
+    job.item.update({"status": "ok", "amount": "23.3"})
+    assert queue.complete(job, "worker")
+    version = task.version
+    main._collect_job_results()
+
+    assert (item.status, item.amount) == ("ok", "23.3")
+    assert published == [version + 1]
+    assert queue.finished_tasks() == []
+    main.store.delete_task(task.id)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from PIL import Image
+
+from app.services.ocr.layout import LAYOUT_TEMPLATES, REGION_GAP, crop_to_template, match_template
+
+
+def test_match_template_by_page_aspect_ratio() -> None:
+    assert match_template(2100, 1400).name == "全电发票"
+    assert match_template(2410, 1400).name == "增值税发票"
+    assert match_template(1240, 1754) is None
+
+
+def test_crop_stitches_regions_vertically() -> None:
+    image = Image.new("RGB", (2100, 1400), "white")
+    cropped = crop_to_template(image)
+
+    assert cropped is not None
+    regions = LAYOUT_TEMPLATES[0].regions
+    expected_height = sum(int(bottom * 1400) - int(top * 1400) for _, top, _, bottom in regions)
+    assert cropped.height == expected_height + REGION_GAP * (len(regions) - 1)
+    assert cropped.width * cropped.height < image.width * image.height
+
+
+def test_unknown_layout_is_not_cropped() -> None:
+    assert crop_to_template(Image.new("RGB", (1000, 1000), "white")) is None
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+from app.records import ItemRecord, TaskRecord
+from app.services.live import LiveSyncHub
+from app.services.naming import apply_name_preview
+
+
+def _task(count: int) -> TaskRecord:
+    items = [
+        ItemRecord(source_path=f"/tmp/{index}.pdf", old_name=f"{index}.pdf", file_ext=".pdf", status="ok")
+        for index in range(count)
+    ]
+    for item in items:
+        item.update({"invoice_date": "20240105", "category": "餐饮", "amount": str(10 + items.index(item))})
+    apply_name_preview(items)
+    return TaskRecord(id="task-1", items=items, version=3)
+
+
+def _save(hub: LiveSyncHub, task: TaskRecord, saved_at: float) -> None:
+    # 与 main._save_task 相同的版本推进方式
+    since, base_version = task.updated_at, task.version
+    task.updated_at = saved_at
+    task.version += 1
+    hub.publish(task, since=since, base_version=base_version)
+
+
+def test_diff_carries_only_touched_and_removed_items() -> None:
+    async def run() -> list[dict]:
+        hub = LiveSyncHub()
+        task = _task(50)
+        task.updated_at = time.time()
+        subscription = hub.subscribe(task, asyncio.get_running_loop())
+
+        edited = task.items[7]
+        edited.update({"amount": "99"})
+        edited.touch()
+        apply_name_preview(task.items, template=task.template)
+        _save(hub, task, edited.updated_at + 1)
+
+        removed = task.items.pop()
+        _save(hub, task, task.updated_at + 1)
+
+        hub.unsubscribe(subscription)
+        _save(hub, task, task.updated_at + 1)
+        await asyncio.sleep(0)
+        messages = []
+        while not subscription.queue.empty():
+            messages.append(json.loads(subscription.queue.get_nowait()))
+        assert removed.id in messages[1]["removed"]
+        return messages
+
+    first, second = asyncio.run(run())
+
+    assert (first["base_version"], first["version"]) == (3, 4)
+    assert [item["amount"] for item in first["items"]] == ["99"]
+    assert first["items"][0]["suggested_name"].startswith("20240105-餐饮-99")
+    assert (second["base_version"], second["items"]) == (4, [])
+
+
+def test_unchanged_preview_does_not_touch_items() -> None:
+    task = _task(3)
+    stamps = [item.updated_at for item in task.items]
+
+    apply_name_preview(task.items, template=task.template)
+
+    assert [item.updated_at for item in task.items] == stamps
@@ -1,11 +1,11 @@
 from __future__ import annotations
 
-from app.schemas import InvoiceItem
+from app.records import ItemRecord
 from app.services.naming import apply_name_preview, build_rename_plan
 
 
-def _item(name: str, date: str, category: str, amount: str) -> InvoiceItem:
-    return InvoiceItem(
+def _item(name: str, date: str, category: str, amount: str) -> ItemRecord:
+    return ItemRecord(
         source_path=f"E:/tmp/{name}",
         old_name=name,
         file_ext=".pdf",
@@ -37,3 +37,20 @@ def test_same_name_is_skipped() -> None:
     assert plan[0].action == "skip"
     assert plan[0].conflict_type == "same_name"
 
+
+def test_directory_template_builds_organized_targets(tmp_path) -> None:
+    items = [
+        _item("a.pdf", "2025-12-05", "餐饮", "23.31"),
+        _item("b.pdf", "2025-11-30", "交通", "8"),
+        _item("c.pdf", "2025-12-06", "住宿", "300"),
+    ]
+    (tmp_path / "2025").write_text("not a directory")
+
+    apply_name_preview(items, template="{yyyy}/{mm}/../{category}/{date}-{amount}")
+    plan = build_rename_plan(items, target_root=tmp_path / "out")
+    blocked = build_rename_plan(items, target_root=tmp_path)
+
+    assert items[0].suggested_name == "2025/12/餐饮/20251205-23.31元.pdf"
+    assert plan[1].target_path == str(tmp_path / "out" / "2025" / "11" / "交通" / "20251130-8元.pdf")
+    assert [entry.action for entry in plan] == ["rename"] * 3
+    assert {(entry.action, entry.reason) for entry in blocked} == {("skip", "target_dir_blocked")}
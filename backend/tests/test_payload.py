@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import Image
+
+from app.services.disk_cache import DiskLRUCache
+from app.services.ocr import payload
+from app.services.ocr.payload import EncodedImage, PayloadCache, prepare_image
+
+
+def test_payload_cache_evicts_least_recently_used() -> None:
+    cache = PayloadCache(max_bytes=10)
+    cache.put(("a", "raw"), EncodedImage("image/png", b"1234"))
+    cache.put(("b", "raw"), EncodedImage("image/png", b"1234"))
+    assert cache.get(("a", "raw")) is not None
+
+    cache.put(("c", "raw"), EncodedImage("image/png", b"1234"))
+
+    assert cache.get(("b", "raw")) is None
+    assert cache.get(("a", "raw")) is not None
+    assert cache.stats()["bytes"] == 8
+
+
+def test_prepare_image_reuses_cached_payload(tmp_path: Path) -> None:
+    path = tmp_path / "invoice.png"
+    path.write_bytes(b"\x89PNG fake")
+
+    first = prepare_image(path)
+    second = prepare_image(path)
+
+    assert first is second
+    assert first.to_data_url().startswith("data:image/png;base64,")
+
+
+def test_page_renders_persist_on_disk_across_memory_evictions(tmp_path: Path, monkeypatch) -> None:
+    renders: list[tuple[int, bool]] = []
+
+    def fake_render(file_path: Path, page: int, dpi: int, *, roi_crop: bool = False) -> bytes:
+        renders.append((page, roi_crop))
+        return b"\x89PNG page %d" % page
+
+    monkeypatch.setattr(payload, "get_render_pool", lambda: None)
+    monkeypatch.setattr(payload, "render_pdf_page_png", fake_render)
+    monkeypatch.setattr(payload, "payload_cache", PayloadCache(max_bytes=1024))
+    monkeypatch.setattr(payload, "render_cache", DiskLRUCache(tmp_path / "renders", max_bytes=1024))
+    path = tmp_path / "invoice.pdf"
+    path.write_bytes(b"%PDF-1.7 invoice")
+
+    first = prepare_image(path, page=2)
+    # 模拟重启或内存缓存被挤出后重新识别（如切换模型）
+    payload.payload_cache.clear()
+    second = prepare_image(path, page=2)
+    prepare_image(path, page=2, roi_crop=True)
+
+    assert renders == [(2, False), (2, True)]
+    assert (second.mime, second.data) == (first.mime, first.data) == ("image/png", b"\x89PNG page 2")
+    assert payload.cached_page_render(path, 2) == first.data
+
+
+def test_prewarm_stops_instead_of_evicting_cached_payloads(tmp_path: Path, monkeypatch) -> None:
+    renders: list[int] = []
+
+    def fake_render(file_path: Path, page: int, dpi: int, *, roi_crop: bool = False) -> bytes:
+        renders.append(page)
+        return b"p" * 400
+
+    cache = PayloadCache(max_bytes=1000)
+    cache.put(("in-use", "raw"), EncodedImage("image/png", b"x" * 300))
+    monkeypatch.setattr(payload, "get_render_pool", lambda: None)
+    monkeypatch.setattr(payload, "render_pdf_page_png", fake_render)
+    monkeypatch.setattr(payload, "payload_cache", cache)
+    monkeypatch.setattr(payload, "render_cache", DiskLRUCache(tmp_path / "renders", max_bytes=0))
+    path = tmp_path / "bundle.pdf"
+    path.write_bytes(b"%PDF-1.7 bundle")
+
+    payload._prewarm_pdf_pages(path, [1, 2, 3, 4], roi_crop=False)
+
+    assert cache.get(("in-use", "raw")) is not None
+    assert renders == [1, 2]
+    assert cache.stats()["bytes"] == 700
+    assert not cache.put(("late", "raw"), EncodedImage("image/png", b"y" * 400), evict=False)
+
+
+def test_pooled_prewarm_keeps_submissions_within_the_budget(tmp_path: Path, monkeypatch) -> None:
+    submitted: list[int] = []
+
+    class FakePool:
+        workers = 2
+
+        def submit(self, file_path: Path, page: int, dpi: int, *, roi_crop: bool = False) -> Future:
+            submitted.append(page)
+            done: Future = Future()
+            done.set_result(b"p" * 400)
+            return done
+
+    cache = PayloadCache(max_bytes=1000)
+    monkeypatch.setattr(payload, "get_render_pool", lambda: FakePool())
+    monkeypatch.setattr(payload, "payload_cache", cache)
+    monkeypatch.setattr(payload, "render_cache", DiskLRUCache(tmp_path / "renders", max_bytes=0))
+    path = tmp_path / "bundle.pdf"
+    path.write_bytes(b"%PDF-1.7 bundle")
+
+    payload._prewarm_pdf_pages(path, list(range(1, 11)), roi_crop=False)
+
+    assert submitted == [1, 2]
+    assert cache.stats()["bytes"] == 800
+
+
+def test_decompression_bomb_is_uploaded_unchanged(tmp_path: Path, monkeypatch) -> None:
+    def bomb(*args, **kwargs) -> bytes:
+        raise Image.DecompressionBombError("too many pixels")
+
+    monkeypatch.setattr(payload, "normalize_image", bomb)
+    path = tmp_path / "huge.png"
+    path.write_bytes(b"\x89PNG huge")
+
+    image = prepare_image(path)
+
+    assert (image.mime, image.data) == ("image/png", b"\x89PNG huge")
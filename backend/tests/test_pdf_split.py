@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pypdfium2 as pdfium
+import pytest
+
+from app.schemas import InvoiceItem
+from app.services.naming import build_rename_plan
+from app.services.pdf_split import extract_pages, plan_invoice_ranges
+from app.services.rename import execute_rename_plan
+from app.services.workflow import new_items
+
+INVOICE_PAGE = (595, 397)  # 210mm x 140mm
+DETAIL_PAGE = (595, 842)  # A4 销货清单
+
+
+def _merged_pdf(path: Path, sizes: list[tuple[int, int]]) -> Path:
+    pdf = pdfium.PdfDocument.new()
+    for width, height in sizes:
+        pdf.new_page(width, height)
+    pdf.save(str(path))
+    pdf.close()
+    return path
+
+
+def test_auto_split_attaches_detail_pages_to_preceding_invoice(tmp_path: Path) -> None:
+    path = _merged_pdf(tmp_path / "merged.pdf", [INVOICE_PAGE, DETAIL_PAGE, INVOICE_PAGE, INVOICE_PAGE])
+
+    assert plan_invoice_ranges(path, "auto") == [(1, 2), (3, 1), (4, 1)]
+    assert plan_invoice_ranges(path, "pages") == [(1, 1), (2, 1), (3, 1), (4, 1)]
+    assert plan_invoice_ranges(path, "off") == []
+
+
+def test_split_items_extract_their_pages_on_rename(tmp_path: Path) -> None:
+    path = _merged_pdf(tmp_path / "merged.pdf", [INVOICE_PAGE, DETAIL_PAGE, INVOICE_PAGE])
+    items = new_items([path], None, prewarm=False, split_mode="auto")
+
+    assert [(item.page, item.page_count) for item in items] == [(1, 2), (3, 1)]
+    assert len({item.content_hash for item in items}) == 2
+    for index, item in enumerate(items):
+        item.status = "ok"
+        item.suggested_name = f"invoice-{index}.pdf"
+
+    results = execute_rename_plan(build_rename_plan(items))
+
+    assert [result.result for result in results] == ["renamed", "renamed"]
+    assert path.exists()
+    assert len(pdfium.PdfDocument(str(tmp_path / "invoice-0.pdf"))) == 2
+    assert len(pdfium.PdfDocument(str(tmp_path / "invoice-1.pdf"))) == 1
+
+
+def test_extract_pages_never_overwrites_an_existing_target(tmp_path: Path) -> None:
+    path = _merged_pdf(tmp_path / "merged.pdf", [INVOICE_PAGE, INVOICE_PAGE])
+    target = tmp_path / "invoice.pdf"
+    target.write_bytes(b"%PDF someone else's")
+
+    with pytest.raises(FileExistsError, match="target_exists"):
+        extract_pages(path, 2, 1, target)
+
+    assert target.read_bytes() == b"%PDF someone else's"
+    assert sorted(child.name for child in tmp_path.iterdir()) == ["invoice.pdf", "merged.pdf"]
+
+
+def test_reference_output_leaves_files_untouched(tmp_path: Path) -> None:
+    item = InvoiceItem(source_path=str(tmp_path / "merged.pdf"), old_name="merged.pdf", file_ext=".pdf", page=2)
+    item.status = "ok"
+    item.suggested_name = "invoice.pdf"
+
+    plan = build_rename_plan([item], page_output="reference")
+
+    assert (plan[0].action, plan[0].reason, plan[0].page) == ("skip", "page_reference", 2)
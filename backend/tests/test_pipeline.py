@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+from pathlib import Path
+
+import httpx
+
+from app.records import ItemRecord
+from app.services.ocr import cloud
+from app.services.ocr.cloud import SiliconFlowClient
+from app.services.ocr.payload import EncodedImage
+from app.services.ocr.pipeline import OcrPipeline
+from app.services.duplicates import flag_import_duplicates
+from app.services.workflow import run_recognition
+
+
+def _completion(content: dict) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(content, ensure_ascii=False)}}]})
+
+
+def _pipeline(handler, *, stream: bool = False) -> OcrPipeline:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return OcrPipeline(
+        base_url="https://vlm.test/v1",
+        api_key="sk-test",
+        model="test-model",
+        stream=stream,
+        http_client=client,
+    )
+
+
+def _image_item(tmp_path: Path, name: str) -> ItemRecord:
+    path = tmp_path / name
+    path.write_bytes(name.encode())
+    return ItemRecord(source_path=str(path), old_name=name, file_ext=".png")
+
+
+def test_recognition_runs_items_concurrently(tmp_path: Path) -> None:
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        return _completion({"invoice_date": "2025-12-05", "item_name": "*餐饮服务*餐费", "amount": "¥23.30"})
+
+    items = [_image_item(tmp_path, f"{index}.png") for index in range(6)]
+    asyncio.run(run_recognition(items, _pipeline(handler), {"餐饮": ["餐饮服务"]}, None, concurrency=3))
+
+    assert peak == 3
+    assert all(item.status == "ok" for item in items)
+    assert items[0].invoice_date == "20251205"
+    assert items[0].amount == "23.3"
+    assert items[0].category == "餐饮"
+
+
+def test_same_batch_copies_share_one_cloud_call(tmp_path: Path) -> None:
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        return _completion({"invoice_date": "2025-12-05", "item_name": "*餐饮服务*餐费", "amount": "¥23.30"})
+
+    first = _image_item(tmp_path, "a.png")
+    copy_path = tmp_path / "a-copy.png"
+    copy_path.write_bytes(b"a.png")
+    copy = ItemRecord(source_path=str(copy_path), old_name=copy_path.name, file_ext=".png")
+    flag_import_duplicates([first, copy], None)
+
+    asyncio.run(run_recognition([first, copy], _pipeline(handler), {"餐饮": ["餐饮服务"]}, None, concurrency=2))
+
+    assert calls == 1
+    assert copy.duplicate_kind == "content"
+    assert (copy.status, copy.amount, copy.category) == ("ok", "23.3", "餐饮")
+
+
+def test_cloud_error_marks_item_failed(tmp_path: Path) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500)
+
+    item = _image_item(tmp_path, "a.png")
+    asyncio.run(run_recognition([item], _pipeline(handler), {}, None))
+
+    assert item.status == "failed"
+    assert item.failure_reason == "cloud_request_failed"
+
+
+def test_streaming_stops_reading_once_object_closes(tmp_path: Path) -> None:
+    pieces = ['{"invoice_date": "2025-12-05", ', '"item_name": "*餐饮服务*餐费", ', '"amount": "23.30"}', " 以上为识别结果"]
+    sent: list[str] = []
+
+    async def events():
+        for piece in pieces:
+            sent.append(piece)
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=events())
+
+    item = _image_item(tmp_path, "a.png")
+    pipeline = _pipeline(handler, stream=True)
+    asyncio.run(run_recognition([item], pipeline, {}, None))
+
+    assert item.status == "ok"
+    assert item.amount == "23.3"
+    assert sent == pieces[:3]
+    stats = pipeline.cloud_client.stream_stats
+    assert (stats.requests, stats.first_tokens, stats.objects) == (1, 1, 1)
+
+
+def test_stream_without_closed_object_reports_no_object_time(tmp_path: Path) -> None:
+    async def events():
+        chunk = {"choices": [{"delta": {"content": '{"invoice_date": "2025-12-05", '}}]}
+        yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=events())
+
+    pipeline = _pipeline(handler, stream=True)
+    asyncio.run(run_recognition([_image_item(tmp_path, "a.png")], pipeline, {}, None))
+
+    stats = pipeline.cloud_client.stream_stats
+    assert (stats.requests, stats.first_tokens, stats.objects) == (1, 1, 0)
+    assert stats.summary()["object_ms"] == 0.0
+
+
+def test_deadline_interrupts_unfinished_items(tmp_path: Path) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if base64.b64encode(b"slow.png").decode() in body["messages"][0]["content"][0]["image_url"]["url"]:
+            await asyncio.sleep(5)
+        return _completion({"invoice_date": "2025-12-05", "item_name": "餐费", "amount": "1"})
+
+    fast = _image_item(tmp_path, "fast.png")
+    slow = _image_item(tmp_path, "slow.png")
+    interrupted = asyncio.run(
+        run_recognition([fast, slow], _pipeline(handler), {}, None, concurrency=2, deadline_seconds=0.3)
+    )
+
+    assert interrupted == 1
+    assert fast.status == "ok"
+    assert (slow.status, slow.failure_reason) == ("interrupted", "deadline_exceeded")
+
+
+def test_item_timeout_fails_only_that_item(tmp_path: Path) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(5)
+        return _completion({})
+
+    item = _image_item(tmp_path, "a.png")
+    assert asyncio.run(run_recognition([item], _pipeline(handler), {}, None, item_timeout_seconds=0.1)) == 0
+    assert (item.status, item.failure_reason) == ("failed", "item_timeout")
+
+
+def test_roi_request_error_falls_back_to_full_page(tmp_path: Path, monkeypatch) -> None:
+    bodies: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = request.content.decode()
+        bodies.append(body)
+        if json.dumps(cloud.ROI_PROMPT_HINT, ensure_ascii=False)[1:-1] in body:
+            return httpx.Response(400)
+        return _completion({"invoice_date": "2025-12-05", "item_name": "*餐饮服务*餐费", "amount": "23.30"})
+
+    monkeypatch.setattr(cloud, "prepare_image", lambda *args, **kwargs: EncodedImage("image/png", b"png"))
+    client = SiliconFlowClient(
+        "https://vlm.test/v1",
+        "sk-test",
+        "test-model",
+        roi_crop=True,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+    extracted = asyncio.run(client.extract_fields(tmp_path / "invoice.pdf"))
+
+    assert len(bodies) == 2
+    assert extracted["amount"] == "23.3"
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import pstats
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import main
+from app.services.profiling import ProfilingMiddleware
+
+
+def test_flagged_request_is_profiled_and_downloadable(tmp_path: Path, monkeypatch) -> None:
+    profiled = FastAPI()
+    profiled.add_middleware(ProfilingMiddleware, output_dir=tmp_path)
+
+    @profiled.get("/work")
+    def work() -> dict:
+        return {"total": sum(range(1000))}
+
+    with TestClient(profiled) as client:
+        plain = client.get("/work")
+        response = client.get("/work", params={"profile": "1"})
+
+    assert "x-profile-id" not in plain.headers
+    profile_id = response.headers["x-profile-id"]
+
+    monkeypatch.setattr(main.settings, "profiling_enabled", True)
+    monkeypatch.setattr(main, "PROFILE_DIR", tmp_path)
+    with TestClient(main.app) as client:
+        listed = client.get("/api/profiles").json()
+        download = client.get(f"/api/profiles/{profile_id}")
+        text = client.get(f"/api/profiles/{profile_id}", params={"format": "text"})
+
+    assert [entry["id"] for entry in listed] == [profile_id]
+    assert listed[0]["path"] == "/work"
+    downloaded = tmp_path / "downloaded.prof"
+    downloaded.write_bytes(download.content)
+    assert pstats.Stats(str(downloaded)).total_calls > 0
+    assert "function calls" in text.text
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from PIL import Image
+
+from app.records import ItemRecord
+from app.services.ocr import pipeline as pipeline_module
+from app.services.ocr.pipeline import OcrPipeline
+from app.services.ocr.qr import InvoiceQr, decode_invoice_qr, parse_invoice_qr
+
+DIGITAL_QR = "01,32,,24312000000001234567,276.00,20240105,,2D61,"
+
+
+def test_parse_keeps_amount_only_for_digital_invoices() -> None:
+    assert parse_invoice_qr(DIGITAL_QR) == InvoiceQr("32", "24312000000001234567", "20240105", "276")
+    # 传统增值税发票二维码里是不含税金额
+    legacy = parse_invoice_qr("01,10,044031900111,12345678,100.00,20190101,12345678901234567890,ABCD,")
+    assert legacy is not None and (legacy.invoice_date, legacy.amount) == ("20190101", None)
+    assert parse_invoice_qr("https://example.com/not-an-invoice") is None
+
+
+def test_decode_finds_qr_in_page_corner() -> None:
+    zxingcpp = pytest.importorskip("zxingcpp")
+    symbol = zxingcpp.create_barcode(DIGITAL_QR, zxingcpp.BarcodeFormat.QRCode).to_image(scale=4)
+    page = Image.new("L", (1800, 1200), 255)
+    page.paste(Image.frombuffer("L", (symbol.shape[1], symbol.shape[0]), bytes(symbol)), (60, 60))
+
+    assert decode_invoice_qr(page) == parse_invoice_qr(DIGITAL_QR)
+
+
+def test_pipeline_asks_cloud_only_for_fields_missing_from_qr(tmp_path: Path, monkeypatch) -> None:
+    prompts: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        prompts.append(body["messages"][0]["content"][1]["text"])
+        content = json.dumps({"item_name": "*餐饮服务*餐费"}, ensure_ascii=False)
+        return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+    monkeypatch.setattr(pipeline_module, "read_invoice_qr", lambda path, page: parse_invoice_qr(DIGITAL_QR))
+    path = tmp_path / "invoice.png"
+    path.write_bytes(b"png")
+    pipeline = OcrPipeline(
+        base_url="https://vlm.test/v1",
+        api_key="sk-test",
+        model="test-model",
+        qr_decode=True,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    item = ItemRecord(source_path=str(path), old_name=path.name, file_ext=".png")
+
+    asyncio.run(pipeline.recognize_item(item, {}))
+
+    assert (item.status, item.invoice_date, item.amount, item.item_name) == ("ok", "20240105", "276", "*餐饮服务*餐费")
+    assert "item_name" in prompts[0] and "invoice_date" not in prompts[0] and "amount" not in prompts[0]
+
+
+def test_pipeline_follows_the_qr_setting_by_default(monkeypatch) -> None:
+    def build(**kwargs) -> OcrPipeline:
+        return OcrPipeline(base_url="https://vlm.test/v1", api_key="sk-test", model="test-model", **kwargs)
+
+    monkeypatch.setattr(pipeline_module.settings, "ocr_qr_decode", True)
+    assert build().qr_decode is True
+    assert build(qr_decode=False).qr_decode is False
+    monkeypatch.setattr(pipeline_module.settings, "ocr_qr_decode", False)
+    assert build().qr_decode is False
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from dataclasses import fields
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.records import ItemRecord, TaskRecord
+from app.schemas import InvoiceItem, TaskState
+
+
+def test_item_record_mirrors_invoice_item_fields() -> None:
+    assert {field.name for field in fields(ItemRecord)} == set(InvoiceItem.model_fields)
+
+
+def test_task_record_round_trips_through_api_model() -> None:
+    item = ItemRecord(source_path="/tmp/a.pdf", old_name="a.pdf", file_ext=".pdf")
+    item.update({"category": "".join(["餐", "饮"]), "status": "ok", "amount": "23.3"})
+    task = TaskRecord(id="task-1", items=[item])
+
+    model = task.to_model()
+    assert model.items[0].category == "餐饮"
+    assert model.items[0].updated_at.tzinfo is None
+
+    restored = TaskRecord.from_model(TaskState.model_validate_json(model.model_dump_json()))
+    assert restored.items[0].id == item.id
+    assert restored.items[0].amount == "23.3"
+    assert abs(restored.items[0].updated_at - item.updated_at) < 1e-3
+    assert restored.items[0].category is item.category
+
+
+def test_explicit_null_patch_of_non_nullable_fields_is_refused(tmp_path: Path) -> None:
+    from app.main import app
+
+    invoice = tmp_path / "a.png"
+    invoice.write_bytes(b"\x89PNG fake")
+    with TestClient(app) as client:
+        task = client.post("/api/import", json={"paths": [str(invoice)]}).json()
+        item_id = task["items"][0]["id"]
+        url = f"/api/items/{task['id']}/{item_id}"
+
+        refused = [client.patch(url, json={name: None}).status_code for name in ("duplicate_kind", "selected")]
+        accepted = client.patch(url, json={"duplicate_kind": "none", "amount": None})
+        client.delete(f"/api/tasks/{task['id']}")
+
+    assert refused == [422, 422]
+    assert accepted.status_code == 200
+    patched = accepted.json()["items"][0]
+    assert (patched["duplicate_kind"], patched["selected"]) == ("none", True)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from app.schemas import RenamePlanItem
+from app.services import rename as rename_module
+from app.services.rename import DirectoryCache, execute_rename_plan
+from app.utils.files import place_without_overwrite
+
+
+def _plan(source: Path, target: Path) -> RenamePlanItem:
+    return RenamePlanItem(
+        item_id=source.name,
+        source_path=str(source),
+        target_path=str(target),
+        old_name=source.name,
+        target_name=target.name,
+        action="rename",
+    )
+
+
+def test_directories_are_created_once_per_batch(tmp_path: Path, monkeypatch) -> None:
+    sources = []
+    for index in range(3):
+        source = tmp_path / f"{index}.pdf"
+        source.write_bytes(b"%PDF" + bytes([index]))
+        sources.append(source)
+    created: list[Path] = []
+    ensure = DirectoryCache.ensure
+
+    def counting_ensure(self: DirectoryCache, directory: Path) -> None:
+        if directory not in self._created:
+            created.append(directory)
+        ensure(self, directory)
+
+    monkeypatch.setattr(DirectoryCache, "ensure", counting_ensure)
+    target_dir = tmp_path / "2025" / "12" / "餐饮"
+    results = execute_rename_plan([_plan(source, target_dir / source.name) for source in sources])
+
+    assert [result.result for result in results] == ["renamed"] * 3
+    assert created == [target_dir]
+    assert sorted(path.name for path in target_dir.iterdir()) == ["0.pdf", "1.pdf", "2.pdf"]
+
+
+def test_cross_device_move_copies_then_unlinks(tmp_path: Path, monkeypatch) -> None:
+    source = tmp_path / "in" / "a.pdf"
+    source.parent.mkdir()
+    source.write_bytes(b"%PDF-1.7 invoice")
+    target = tmp_path / "out" / "a.pdf"
+    monkeypatch.setattr(DirectoryCache, "device", lambda self, directory: hash(directory.name))
+    linked: list[tuple[Path, Path]] = []
+    real_link = rename_module.os.link
+
+    def recording_link(src: Path, dst: Path) -> None:
+        linked.append((Path(src), Path(dst)))
+        real_link(src, dst)
+
+    monkeypatch.setattr(rename_module.os, "link", recording_link)
+
+    results = execute_rename_plan([_plan(source, target)])
+
+    assert results[0].result == "renamed"
+    assert target.read_bytes() == b"%PDF-1.7 invoice" and not source.exists()
+    # 只有临时文件链接到目标名，源文件没有直接移动过去
+    assert [dst for _, dst in linked] == [target] and linked[0][0].name.endswith(".tmp")
+    assert [path.name for path in target.parent.iterdir()] == ["a.pdf"]
+
+
+def test_move_never_overwrites_a_target_created_after_planning(tmp_path: Path, monkeypatch) -> None:
+    source = tmp_path / "a.pdf"
+    source.write_bytes(b"%PDF new")
+    target = tmp_path / "out" / "a.pdf"
+    plan = [_plan(source, target)]
+    target.parent.mkdir()
+    target.write_bytes(b"%PDF someone else's")
+
+    same_device = execute_rename_plan(plan)
+    monkeypatch.setattr(DirectoryCache, "device", lambda self, directory: hash(directory.name))
+    cross_device = execute_rename_plan(plan)
+
+    assert [result.result for result in same_device + cross_device] == ["failed", "failed"]
+    assert same_device[0].message.startswith("target_exists")
+    assert source.read_bytes() == b"%PDF new"
+    assert target.read_bytes() == b"%PDF someone else's"
+    assert sorted(path.name for path in target.parent.iterdir()) == ["a.pdf"]
+    # 检查之后才出现的目标同样不会被覆盖
+    with pytest.raises(FileExistsError):
+        place_without_overwrite(source, target)
+    assert target.read_bytes() == b"%PDF someone else's"
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from fastapi import Request
+
+from app.schemas import InvoiceItem, TaskState
+from app.serialization import model_response
+
+
+def _request(**headers: str) -> Request:
+    raw_headers = [(key.replace("_", "-").encode(), value.encode()) for key, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw_headers})
+
+
+def _task(size: int) -> TaskState:
+    items = [InvoiceItem(source_path=f"/tmp/{index}.pdf", old_name=f"{index}.pdf", file_ext=".pdf") for index in range(size)]
+    return TaskState(id="task", items=items)
+
+
+def test_json_is_default() -> None:
+    response = model_response(_request(accept="application/json"), _task(2))
+
+    assert response.media_type == "application/json"
+    assert len(json.loads(response.body)["items"]) == 2
+
+
+def test_msgpack_is_negotiated() -> None:
+    msgpack = pytest.importorskip("msgpack")
+    response = model_response(_request(accept="application/msgpack"), _task(2))
+
+    assert response.media_type == "application/msgpack"
+    assert msgpack.unpackb(response.body)["id"] == "task"
+
+
+def test_large_bodies_use_brotli_when_accepted() -> None:
+    brotli = pytest.importorskip("brotli")
+    response = model_response(_request(accept_encoding="gzip, br"), _task(200))
+
+    assert response.headers["content-encoding"] == "br"
+    assert json.loads(brotli.decompress(response.body))["items"][199]["old_name"] == "199.pdf"
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.tools.startup_bench import BACKEND_DIR, parse_importtime
+
+DEFERRED_MODULES = ("httpx", "PIL.Image", "pypdfium2", "app.services.ocr.pipeline", "app.services.watcher")
+
+
+def test_parse_importtime_reads_self_and_cumulative() -> None:
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   _io",
+            "import time:      1500 |      32000 | app.config",
+            "unrelated warning",
+        ]
+    )
+
+    assert parse_importtime(stderr) == {"_io": (0.12, 0.12), "app.config": (1.5, 32.0)}
+
+
+def test_importing_app_defers_heavy_modules(tmp_path: Path) -> None:
+    probe = "import sys, app.main; print(','.join(name for name in {!r} if name in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-c", probe.format(DEFERRED_MODULES)],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "APP_DATA_DIR": str(tmp_path)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert completed.stdout.strip() == ""
+
+
+def test_ready_endpoint_reports_startup_phases() -> None:
+    from app.main import app
+
+    with TestClient(app) as client:
+        state = client.get("/api/ready").json()
+
+    assert state["ready"] is True
+    assert state["startup_ms"] is not None and state["startup_ms"] > 0
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+from app.records import ItemRecord, TaskRecord
+from app import storage
+from app.storage import InMemoryTaskStore
+
+
+def _task(task_id: str, count: int) -> TaskRecord:
+    items = [ItemRecord(source_path=f"/tmp/{task_id}/{index}.pdf", old_name=f"{index}.pdf", file_ext=".pdf") for index in range(count)]
+    return TaskRecord(id=task_id, items=items)
+
+
+def test_least_recently_used_task_spills_and_reloads(tmp_path: Path) -> None:
+    store = InMemoryTaskStore(tmp_path, max_items=5)
+    store.save_task(_task("a", 3))
+    store.save_task(_task("b", 3))
+
+    stats = store.stats()
+    assert stats.resident_tasks == 1
+    assert stats.spilled_tasks == 1
+    assert (tmp_path / "a.json").exists()
+
+    reloaded = store.get_task("a")
+    assert reloaded is not None
+    assert [item.old_name for item in reloaded.items] == ["0.pdf", "1.pdf", "2.pdf"]
+    assert not (tmp_path / "a.json").exists()
+    assert (tmp_path / "b.json").exists()
+
+    restarted = InMemoryTaskStore(tmp_path, max_items=5)
+    assert restarted.get_task("b") is not None
+
+
+def test_pinned_tasks_stay_resident_and_idle_tasks_expire(tmp_path: Path) -> None:
+    store = InMemoryTaskStore(tmp_path, max_items=5, ttl_seconds=0.05)
+    store.save_task(_task("busy", 3))
+    store.pin("busy")
+    store.save_task(_task("other", 3))
+    assert store.stats().spilled_tasks == 0
+
+    time.sleep(0.1)
+    assert store.get_task("other") is None
+    assert store.get_task("busy") is not None
+    assert store.delete_task("busy")
+    assert store.get_task("busy") is None
+
+
+def test_deleted_task_is_not_recreated_by_a_late_save(tmp_path: Path) -> None:
+    store = InMemoryTaskStore(tmp_path)
+    task = _task("held", 2)
+    store.save_task(task)
+    store.pin("held")
+
+    assert store.delete_task("held")
+    task.items.pop()
+    assert not store.save_task(task)
+    assert store.get_task("held") is None
+    assert store.stats().tasks == []
+
+
+def test_expired_task_is_not_recreated_and_tombstones_are_pruned(tmp_path: Path, monkeypatch) -> None:
+    store = InMemoryTaskStore(tmp_path, ttl_seconds=0.05)
+    held = _task("held", 2)
+    store.save_task(held)
+    store.save_task(_task("gone", 1))
+    store.delete_task("gone")
+
+    time.sleep(0.1)
+    assert store.get_task("held") is None
+    assert not store.save_task(held)
+
+    # 墓碑过期后随清理一起淘汰，集合不会无限增长
+    monkeypatch.setattr(storage, "TOMBSTONE_SECONDS", 0.0)
+    store._sweep_expired(time.time())
+    assert store._tombstones == {}
+    assert store.save_task(_task("gone", 1))
+
+
+def test_spill_and_load_run_outside_the_store_lock(tmp_path: Path, monkeypatch) -> None:
+    store = InMemoryTaskStore(tmp_path, max_items=5)
+    locked_during_io: list[bool] = []
+    write_spilled, read_spilled = store._write_spilled, store._read_spilled
+
+    def spy_write(victim):
+        locked_during_io.append(store._lock.locked())
+        return write_spilled(victim)
+
+    def spy_read(task_id):
+        locked_during_io.append(store._lock.locked())
+        return read_spilled(task_id)
+
+    monkeypatch.setattr(store, "_write_spilled", spy_write)
+    monkeypatch.setattr(store, "_read_spilled", spy_read)
+    store.save_task(_task("a", 3))
+    store.save_task(_task("b", 3))
+    assert store.get_task("a") is not None
+    assert locked_during_io and not any(locked_during_io)
+
+
+def test_tasks_held_under_their_lock_are_not_spilled(tmp_path: Path) -> None:
+    store = InMemoryTaskStore(tmp_path, max_items=5)
+    store.save_task(_task("a", 3))
+    held, release = threading.Event(), threading.Event()
+
+    def hold() -> None:
+        with store.locked("a"):
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    store.save_task(_task("b", 3))
+    assert store.stats().spilled_tasks == 0
+    release.set()
+    holder.join()
+
+    store.save_task(_task("c", 3))
+    assert store.stats().spilled_tasks == 2
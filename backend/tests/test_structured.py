@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import zipfile
+from pathlib import Path
+
+from app.records import ItemRecord
+from app.services.importer import collect_invoice_files
+from app.services.ocr.pipeline import OcrPipeline
+from app.services.ocr.structured import extract_structured_fields
+
+EINVOICE_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<EInvoice>
+  <EInvoiceData>
+    <BasicInformation>
+      <TotalAmWithoutTax>25.28</TotalAmWithoutTax>
+      <TotalTax-includedAmount>26.80</TotalTax-includedAmount>
+    </BasicInformation>
+    <IssuItemInformation>
+      <ItemName>*餐饮服务*餐费</ItemName>
+      <TotaltaxIncludedAmount>26.80</TotaltaxIncludedAmount>
+    </IssuItemInformation>
+  </EInvoiceData>
+  <TaxSupervisionInfo>
+    <IssueTime>2024-03-05 10:21:00</IssueTime>
+  </TaxSupervisionInfo>
+</EInvoice>
+"""
+
+OFD_CUSTOM_TAG = """<?xml version="1.0" encoding="UTF-8"?>
+<fp:FaPiao xmlns:fp="http://www.edrm.com.cn/fp">
+  <fp:IssueDate><fp:ObjectRef PageRef="1">11</fp:ObjectRef></fp:IssueDate>
+  <fp:TaxInclusiveTotalAmount><fp:ObjectRef PageRef="1">12</fp:ObjectRef></fp:TaxInclusiveTotalAmount>
+  <fp:ItemName><fp:ObjectRef PageRef="1">13</fp:ObjectRef><fp:ObjectRef PageRef="1">14</fp:ObjectRef></fp:ItemName>
+</fp:FaPiao>
+"""
+
+OFD_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<ofd:Page xmlns:ofd="http://www.ofdspec.org/2016">
+  <ofd:Content><ofd:Layer ID="10">
+    <ofd:TextObject ID="11"><ofd:TextCode X="0" Y="0">2024年03月05日</ofd:TextCode></ofd:TextObject>
+    <ofd:TextObject ID="12"><ofd:TextCode X="0" Y="0">¥1,280.50</ofd:TextCode></ofd:TextObject>
+    <ofd:TextObject ID="13"><ofd:TextCode X="0" Y="0">*信息技术服务*</ofd:TextCode></ofd:TextObject>
+    <ofd:TextObject ID="14"><ofd:TextCode X="0" Y="0">软件服务费</ofd:TextCode></ofd:TextObject>
+  </ofd:Layer></ofd:Content>
+</ofd:Page>
+"""
+
+
+def _ofd(path: Path) -> Path:
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("OFD.xml", '<ofd:OFD xmlns:ofd="http://www.ofdspec.org/2016"/>')
+        archive.writestr("Doc_0/Tags/CustomTag.xml", OFD_CUSTOM_TAG)
+        archive.writestr("Doc_0/Pages/Page_0/Content.xml", OFD_CONTENT)
+    return path
+
+
+def test_xml_invoice_uses_invoice_level_total(tmp_path: Path) -> None:
+    path = tmp_path / "invoice.xml"
+    path.write_text(EINVOICE_XML, encoding="utf-8")
+
+    assert extract_structured_fields(path) == {
+        "invoice_date": "20240305",
+        "item_name": "*餐饮服务*餐费",
+        "amount": "26.8",
+    }
+
+
+def test_ofd_custom_tags_resolve_page_text_objects(tmp_path: Path) -> None:
+    fields = extract_structured_fields(_ofd(tmp_path / "invoice.ofd"))
+
+    assert fields == {"invoice_date": "20240305", "item_name": "*信息技术服务*软件服务费", "amount": "1280.5"}
+
+
+def test_pipeline_parses_structured_files_without_api_key(tmp_path: Path) -> None:
+    good = _ofd(tmp_path / "good.ofd")
+    broken = tmp_path / "broken.ofd"
+    broken.write_bytes(b"not a zip")
+    pipeline = OcrPipeline(base_url="https://vlm.test/v1", api_key="", model="test-model")
+    items = [ItemRecord(source_path=str(path), old_name=path.name, file_ext=".ofd") for path in (good, broken)]
+
+    async def run() -> None:
+        for item in items:
+            await pipeline.recognize_item(item, {})
+
+    asyncio.run(run())
+
+    assert (items[0].status, items[0].amount) == ("ok", "1280.5")
+    assert (items[1].status, items[1].failure_reason) == ("failed", "structured_parse_failed")
+
+
+def test_import_skips_xml_files_that_are_not_invoices(tmp_path: Path) -> None:
+    (tmp_path / "invoice.xml").write_text(EINVOICE_XML, encoding="utf-8")
+    (tmp_path / "fapiao.xml").write_text(OFD_CUSTOM_TAG, encoding="utf-8")
+    (tmp_path / "pom.xml").write_text('<?xml version="1.0"?>\n<project><name>demo</name></project>\n')
+
+    files = collect_invoice_files([str(tmp_path)])
+
+    assert [path.name for path in files] == ["fapiao.xml", "invoice.xml"]
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from app.utils.text import JsonObjectScanner
+
+
+def test_scanner_completes_on_closing_brace_across_chunks() -> None:
+    scanner = JsonObjectScanner()
+    chunks = ['```json\n{"invoice_date": "2025-', '12-05", "item_name": "a{b}\\"c"', ', "amount": "1"}', "\n```\n多余说明"]
+
+    assert scanner.feed(chunks[0]) is None
+    assert scanner.feed(chunks[1]) is None
+    assert scanner.feed(chunks[2]) == {"invoice_date": "2025-12-05", "item_name": 'a{b}"c', "amount": "1"}
+    assert scanner.feed(chunks[3]) == scanner.result
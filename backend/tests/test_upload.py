@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import os
+import tracemalloc
+
+import httpx
+
+from app.services.ocr.payload import EncodedImage
+from app.services.ocr.upload import IMAGE_URL_PLACEHOLDER, ImageRequestBody
+
+
+def _payload() -> dict:
+    content = [{"type": "image_url", "image_url": {"url": IMAGE_URL_PLACEHOLDER}}, {"type": "text", "text": "提取字段"}]
+    return {"model": "m", "messages": [{"role": "user", "content": content}]}
+
+
+def test_streamed_body_matches_declared_length_and_data_url() -> None:
+    image = EncodedImage("image/png", os.urandom(100_001))
+    body = ImageRequestBody(_payload(), image)
+    received: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request)
+        return httpx.Response(200, json={})
+
+    async def send() -> None:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await client.post("https://vlm.test/v1/chat/completions", headers=body.headers, content=body)
+
+    asyncio.run(send())
+
+    request = received[0]
+    sent = json.loads(request.content)
+    assert int(request.headers["content-length"]) == len(request.content) == len(body)
+    assert "transfer-encoding" not in request.headers
+    url = sent["messages"][0]["content"][0]["image_url"]["url"]
+    assert url == "data:image/png;base64," + base64.b64encode(image.data).decode("ascii")
+    assert sent["messages"][0]["content"][1]["text"] == "提取字段"
+
+
+def test_sending_allocates_one_chunk_at_a_time() -> None:
+    image = EncodedImage("image/jpeg", os.urandom(4 * 1024 * 1024))
+    body = ImageRequestBody(_payload(), image)
+
+    tracemalloc.start()
+    try:
+        sent = sum(len(chunk) for chunk in body.chunks())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert sent == len(body)
+    assert peak < len(image.data) // 16
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.services.watcher import FolderWatcher
+
+
+@pytest.mark.parametrize("force_polling", [True, False])
+def test_watcher_emits_new_settled_files_once(tmp_path: Path, force_polling: bool) -> None:
+    (tmp_path / "existing.pdf").write_bytes(b"old")
+    emitted: list[Path] = []
+    arrived = threading.Event()
+
+    def on_files(files: list[Path]) -> None:
+        emitted.extend(files)
+        arrived.set()
+
+    watcher = FolderWatcher(
+        tmp_path,
+        on_files,
+        settle_seconds=0.2,
+        poll_interval=0.1,
+        force_polling=force_polling,
+    )
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        nested = tmp_path / "scanner"
+        nested.mkdir()
+        (nested / "new.pdf").write_bytes(b"new")
+        (nested / "notes.txt").write_bytes(b"ignored")
+        (tmp_path / "~$lock.pdf").write_bytes(b"ignored")
+
+        assert arrived.wait(timeout=5)
+        time.sleep(0.5)
+    finally:
+        watcher.stop()
+
+    assert emitted == [nested / "new.pdf"]
+
+
+def test_watcher_retries_files_that_were_not_accepted(tmp_path: Path) -> None:
+    batches: list[list[Path]] = []
+    accepted = threading.Event()
+
+    def on_files(files: list[Path]) -> list[Path]:
+        batches.append(files)
+        if len(batches) == 1:
+            raise RuntimeError("task busy")
+        if len(batches) == 2:
+            return [path for path in files if path.name == "b.pdf"]
+        accepted.set()
+        return []
+
+    watcher = FolderWatcher(tmp_path, on_files, settle_seconds=0.1, poll_interval=0.1, force_polling=True)
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        (tmp_path / "a.pdf").write_bytes(b"a")
+        (tmp_path / "b.pdf").write_bytes(b"b")
+        assert accepted.wait(timeout=5)
+        time.sleep(0.5)
+    finally:
+        watcher.stop()
+
+    names = [[path.name for path in batch] for batch in batches]
+    assert names == [["a.pdf", "b.pdf"], ["a.pdf", "b.pdf"], ["b.pdf"]]
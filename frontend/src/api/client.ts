@@ -47,6 +47,17 @@ export async function fetchTask(taskId: string): Promise<TaskState> {
   return data;
 }
 
+export function previewImageUrl(taskId: string, itemId: string, size: number, prefetch = 0): string {
+  const params = new URLSearchParams({ size: String(size), prefetch: String(prefetch) });
+  return `${defaultApiBase}/api/tasks/${taskId}/items/${itemId}/preview?${params.toString()}`;
+}
+
+export function liveChannelUrl(taskId: string): string {
+  const base = new URL(defaultApiBase, window.location.href);
+  base.protocol = base.protocol === "https:" ? "wss:" : "ws:";
+  return `${base.origin}/api/tasks/${taskId}/live`;
+}
+
 export async function patchItem(
   taskId: string,
   itemId: string,
@@ -0,0 +1,104 @@
+import { liveChannelUrl } from "./client";
+import type { LiveMessage, LiveOp, TaskDiff, TaskState } from "./types";
+
+const RECONNECT_DELAY_MS = 2000;
+
+export interface LiveHandlers {
+  onSnapshot: (task: TaskState) => void;
+  onDiff: (diff: TaskDiff) => void;
+  onDeleted?: () => void;
+}
+
+interface PendingOp {
+  resolve: (version: number) => void;
+  reject: (error: Error) => void;
+}
+
+// 每个任务一条 WebSocket：上行小粒度编辑操作，下行按条目的增量（带任务版本号）
+export class TaskLiveChannel {
+  private socket: WebSocket | null = null;
+  private closed = false;
+  private nextOpId = 1;
+  private pending = new Map<string, PendingOp>();
+
+  constructor(
+    readonly taskId: string,
+    private readonly handlers: LiveHandlers,
+  ) {}
+
+  get isOpen(): boolean {
+    return this.socket?.readyState === WebSocket.OPEN;
+  }
+
+  connect() {
+    if (this.closed || typeof WebSocket === "undefined") return;
+    const socket = new WebSocket(liveChannelUrl(this.taskId));
+    socket.onmessage = (event) => this.handleMessage(JSON.parse(String(event.data)) as LiveMessage);
+    socket.onclose = (event) => {
+      this.socket = null;
+      this.failPending("live_channel_closed");
+      // 任务不存在或已删除时不再重连
+      if (event.code === 4404) {
+        this.closed = true;
+        this.handlers.onDeleted?.();
+        return;
+      }
+      if (!this.closed) {
+        setTimeout(() => this.connect(), RECONNECT_DELAY_MS);
+      }
+    };
+    this.socket = socket;
+  }
+
+  close() {
+    this.closed = true;
+    this.socket?.close();
+    this.socket = null;
+    this.failPending("live_channel_closed");
+  }
+
+  request(op: LiveOp): Promise<number> {
+    if (!this.socket || !this.isOpen) {
+      return Promise.reject(new Error("live_channel_closed"));
+    }
+    const opId = String(this.nextOpId++);
+    const socket = this.socket;
+    return new Promise((resolve, reject) => {
+      this.pending.set(opId, { resolve, reject });
+      socket.send(JSON.stringify({ ...op, op_id: opId }));
+    });
+  }
+
+  requestSnapshot() {
+    if (this.isOpen) {
+      this.socket?.send(JSON.stringify({ op: "snapshot" }));
+    }
+  }
+
+  private handleMessage(message: LiveMessage) {
+    if (message.type === "diff") {
+      this.handlers.onDiff(message);
+    } else if (message.type === "snapshot") {
+      this.handlers.onSnapshot(message.task);
+    } else if (message.type === "ack") {
+      this.settle(message.op_id)?.resolve(message.version);
+    } else if (message.type === "error") {
+      const detail = typeof message.detail === "string" ? message.detail : JSON.stringify(message.detail);
+      this.settle(message.op_id)?.reject(new Error(detail));
+    }
+  }
+
+  private settle(opId: string | null): PendingOp | undefined {
+    if (!opId) return undefined;
+    const entry = this.pending.get(opId);
+    this.pending.delete(opId);
+    return entry;
+  }
+
+  private failPending(reason: string) {
+    for (const entry of this.pending.values()) {
+      entry.reject(new Error(reason));
+    }
+    this.pending.clear();
+  }
+}
@@ -1,6 +1,7 @@
-export type InvoiceStatus = "pending" | "ok" | "failed";
+export type InvoiceStatus = "pending" | "ok" | "failed" | "interrupted";
 export type RenameAction = "rename" | "skip" | "manual_edit_required";
-export type ConflictType = "none" | "same_name" | "exists_other";
+export type ConflictType = "none" | "same_name" | "exists_other" | "duplicate";
+export type DuplicateKind = "none" | "content" | "fields";
 export type CommitResultStatus = "pending" | "renamed" | "skipped" | "failed";
 
 export interface TaskSummary {
@@ -12,6 +13,9 @@ export interface TaskSummary {
   rename_ready: number;
   renamed: number;
   skipped: number;
+  duplicate: number;
+  queued: number;
+  interrupted: number;
 }
 
 export interface InvoiceItem {
@@ -19,6 +23,9 @@ export interface InvoiceItem {
   source_path: string;
   old_name: string;
   file_ext: string;
+  page: number | null;
+  page_count: number;
+  content_hash: string | null;
   invoice_date: string | null;
   item_name: string | null;
   amount: string | null;
@@ -34,11 +41,14 @@ export interface InvoiceItem {
   conflict_type: ConflictType;
   result: CommitResultStatus;
   result_message: string | null;
+  duplicate_kind: DuplicateKind;
+  duplicate_of: string | null;
   updated_at: string;
 }
 
 export interface TaskState {
   id: string;
+  version: number;
   created_at: string;
   updated_at: string;
   template: string;
@@ -52,6 +62,8 @@ export interface CommitPlanItem {
   target_path: string;
   old_name: string;
   target_name: string;
+  page: number | null;
+  page_count: number;
   action: RenameAction;
   conflict_type: ConflictType;
   reason: string | null;
@@ -90,6 +102,29 @@ export interface SyncItemPatch {
   category: string | null;
 }
 
+export interface TaskDiff {
+  type: "diff";
+  task_id: string;
+  version: number;
+  base_version: number;
+  template: string;
+  summary: TaskSummary;
+  items: InvoiceItem[];
+  removed: string[];
+}
+
+export type LiveOp =
+  | { op: "patch"; item_id: string; fields: Record<string, unknown> }
+  | { op: "sync"; items: SyncItemPatch[] }
+  | { op: "snapshot" };
+
+export type LiveMessage =
+  | TaskDiff
+  | { type: "snapshot"; op_id: string | null; task: TaskState }
+  | { type: "ack"; op_id: string | null; version: number }
+  | { type: "error"; op_id: string | null; detail: unknown }
+  | { type: "deleted"; task_id: string };
+
 export interface AppSettings {
   siliconflow_base_url: string;
   siliconflow_model: string;
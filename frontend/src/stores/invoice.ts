@@ -12,6 +12,7 @@ import {
   syncItems,
   updateSettings,
 } from "../api/client";
+import { TaskLiveChannel } from "../api/live";
 import { isTauriRuntime, renameByTauri } from "../api/tauri";
 import type {
   AppSettings,
@@ -21,10 +22,16 @@ import type {
   CommitRenameResponse,
   InvoiceItem,
   SyncItemPatch,
+  TaskDiff,
   TaskState,
 } from "../api/types";
 import { applyNamePreviewLocal } from "../utils/naming";
 
+const QUEUE_POLL_INTERVAL_MS = 1000;
+
+// WebSocket 实例不放进响应式 state
+let liveChannel: TaskLiveChannel | null = null;
+
 interface InvoiceState {
   task: TaskState | null;
   loading: boolean;
@@ -163,6 +170,59 @@ export const useInvoiceStore = defineStore("invoice", {
       }
       this.task = nextTask;
     },
+    applyDiff(diff: TaskDiff) {
+      const task = this.task;
+      if (!task || diff.task_id !== task.id || diff.version <= task.version) return;
+      if (diff.base_version !== task.version) {
+        // 漏收了中间版本，改为拉取完整快照
+        liveChannel?.requestSnapshot();
+        return;
+      }
+      const positions = new Map(task.items.map((item, index) => [item.id, index]));
+      for (const item of diff.items) {
+        const position = positions.get(item.id);
+        if (position === undefined) {
+          task.items.push(item);
+          continue;
+        }
+        // 勾选状态和未提交的本地编辑以本机为准
+        item.selected = task.items[position].selected;
+        const localEdit = this.localEdits[item.id];
+        if (localEdit) {
+          item.invoice_date = localEdit.invoice_date;
+          item.amount = localEdit.amount;
+          item.category = localEdit.category;
+        }
+        task.items[position] = item;
+      }
+      if (diff.removed.length) {
+        const removed = new Set(diff.removed);
+        task.items = task.items.filter((item) => !removed.has(item.id));
+        for (const itemId of diff.removed) {
+          delete this.localEdits[itemId];
+        }
+      }
+      task.version = diff.version;
+      task.template = diff.template;
+      task.summary = diff.summary;
+      this.recomputePreviewLocally();
+    },
+    connectLive() {
+      const taskId = this.task?.id;
+      if (liveChannel?.taskId === taskId) return;
+      liveChannel?.close();
+      liveChannel = null;
+      if (!taskId) return;
+      liveChannel = new TaskLiveChannel(taskId, {
+        onSnapshot: (task) => {
+          if (this.task?.id !== task.id) return;
+          this.applyTask(task, this.selectionSnapshot());
+          this.recomputePreviewLocally();
+        },
+        onDiff: (diff) => this.applyDiff(diff),
+      });
+      liveChannel.connect();
+    },
     currentTemplate(): string {
       return this.task?.template || this.settings?.filename_template || DEFAULT_TEMPLATE;
     },
@@ -249,6 +309,7 @@ export const useInvoiceStore = defineStore("invoice", {
         this.renameTotal = 0;
         this.renameDone = 0;
         this.recomputePreviewLocally();
+        this.connectLive();
         this.message = `已导入 ${this.task.summary.total} 个文件`;
       } catch (error) {
         this.handleError(error);
@@ -329,6 +390,14 @@ export const useInvoiceStore = defineStore("invoice", {
           this.recomputePreviewLocally();
           this.recognizeDone += 1;
         }
+        // 后端启用识别队列时请求立即返回，轮询到队列中的条目全部完成
+        while (this.task && this.task.summary.queued > 0) {
+          this.recognizeDone = Math.max(this.recognizeTotal - this.task.summary.queued, 0);
+          await new Promise((resolve) => setTimeout(resolve, QUEUE_POLL_INTERVAL_MS));
+          this.applyTask(await fetchTask(this.task.id), selection);
+          this.recomputePreviewLocally();
+        }
+        this.recognizeDone = this.recognizeTotal;
         this.message = `识别完成（${this.recognizeDone}/${this.recognizeTotal}）`;
       } catch (error) {
         this.handleError(error);
@@ -350,13 +419,34 @@ export const useInvoiceStore = defineStore("invoice", {
         category: value.category,
       }));
       if (!patches.length) return;
-      const selection = this.selectionSnapshot();
-      const nextTask = await syncItems(this.task.id, patches);
-      for (const patch of patches) {
-        delete this.localEdits[patch.item_id];
+      // 记下本次提交的编辑对象：确认前又被改过的条目保留新的本地编辑
+      const sent = new Map(patches.map((patch) => [patch.item_id, this.localEdits[patch.item_id]]));
+      const settle = () => {
+        for (const [itemId, edit] of sent) {
+          if (this.localEdits[itemId] === edit) {
+            delete this.localEdits[itemId];
+          }
+        }
+      };
+      let synced = false;
+      if (liveChannel?.isOpen && liveChannel.taskId === this.task.id) {
+        // 实时通道只上行改动的条目，结果以增量形式推回（ack 前已到达）；
+        // 收到 ack 才丢弃本地编辑，被拒绝或连接断开时改走 HTTP 同步
+        try {
+          await liveChannel.request({ op: "sync", items: patches });
+          settle();
+          synced = true;
+        } catch {
+          // 编辑仍在 localEdits 中，下面整体重发
+        }
+      }
+      if (!synced) {
+        const selection = this.selectionSnapshot();
+        const nextTask = await syncItems(this.task.id, patches);
+        settle();
+        this.applyTask(nextTask, selection);
+        this.recomputePreviewLocally();
       }
-      this.applyTask(nextTask, selection);
-      this.recomputePreviewLocally();
       if (!silent) {
         this.message = "已同步编辑内容";
       }
@@ -438,8 +528,10 @@ export const useInvoiceStore = defineStore("invoice", {
 
         if (isTauriRuntime()) {
           this.lastPlan = await buildCommitPlan(this.task.id, this.selectedIds);
-          const plan = this.lastPlan.plan;
-          this.renameTotal = plan.length;
+          // 拆分出的单页发票需要后端抽取页面生成新文件，其余仍由 Tauri 本地改名
+          const plan = this.lastPlan.plan.filter((planItem) => planItem.page == null);
+          const pageIds = this.lastPlan.plan.filter((planItem) => planItem.page != null).map((planItem) => planItem.item_id);
+          this.renameTotal = this.lastPlan.plan.length;
           this.renameDone = 0;
 
           const tauriResults: CommitRenameItemResult[] = [];
@@ -455,7 +547,10 @@ export const useInvoiceStore = defineStore("invoice", {
             tauriResults.push(first);
             this.renameDone += 1;
           }
+          const pageResults = pageIds.length ? (await commitRename(this.task.id, pageIds)).results : [];
+          this.renameDone += pageResults.length;
           this.lastRename = await syncCommitResults(this.task.id, tauriResults);
+          this.lastRename.results.push(...pageResults);
         } else {
           this.lastRename = await commitRename(this.task.id, this.selectedIds);
           this.renameTotal = this.lastRename.results.length;
@@ -3,6 +3,7 @@ import type { InvoiceItem } from "../api/types";
 const INVALID_FILENAME_PATTERN = /[<>:"/\\|?*\x00-\x1F]+/g;
 const WHITESPACE_PATTERN = /\s+/g;
 const EXT_SUFFIX_PATTERN = /\.[A-Za-z0-9]{1,12}$/;
+const PATH_SEPARATOR_PATTERN = /[\\/]+/;
 
 function normalizeSpaces(value: string): string {
   return value.replace(WHITESPACE_PATTERN, " ").trim();
@@ -27,6 +28,14 @@ function normalizeBaseName(value: string, ext: string): string {
   return sanitizeComponent(base, "未命名");
 }
 
+// 模板可含目录（整理模式），与后端 _normalize_relative_name 保持一致
+function normalizeRelativeName(value: string, ext: string): string {
+  const parts = value.trim().split(PATH_SEPARATOR_PATTERN);
+  const name = parts.pop() ?? "";
+  const directories = parts.map((part) => sanitizeComponent(part, "")).filter(Boolean);
+  return [...directories, `${normalizeBaseName(name, ext)}.${ext}`].join("/");
+}
+
 function formatDate(dateValue: string | null): string {
   if (!dateValue) return "19700101";
   const digits = dateValue.replace(/\D+/g, "");
@@ -55,7 +64,10 @@ function renderTemplate(
     .replace(/\{date\}/g, tokens.date)
     .replace(/\{category\}/g, tokens.category)
     .replace(/\{amount\}/g, tokens.amount)
-    .replace(/\{ext\}/g, tokens.ext);
+    .replace(/\{ext\}/g, tokens.ext)
+    .replace(/\{yyyy\}/g, tokens.date.slice(0, 4))
+    .replace(/\{mm\}/g, tokens.date.slice(4, 6))
+    .replace(/\{dd\}/g, tokens.date.slice(6, 8));
 }
 
 export function applyNamePreviewLocal(items: InvoiceItem[], template: string): void {
@@ -70,15 +82,19 @@ export function applyNamePreviewLocal(items: InvoiceItem[], template: string): v
     item.action = "skip";
     item.conflict_type = "none";
 
-    if (item.status === "pending" || item.status === "failed") {
+    if (item.status === "pending" || item.status === "failed" || item.status === "interrupted") {
       item.suggested_name = null;
       item.action = "manual_edit_required";
       continue;
     }
 
     const groupKey = `${item.invoice_date ?? ""}|${item.category ?? "其他"}|${item.amount ?? "0.00"}`;
-    const nextCount = (counters.get(groupKey) ?? 0) + 1;
-    counters.set(groupKey, nextCount);
+    // 重复发票不占用序号，与后端 apply_name_preview 保持一致
+    const isDuplicate = item.duplicate_kind !== "none";
+    if (!isDuplicate) {
+      counters.set(groupKey, (counters.get(groupKey) ?? 0) + 1);
+    }
+    const nextCount = Math.max(counters.get(groupKey) ?? 0, 1);
 
     let category = item.category || "其他";
     if (nextCount > 1) {
@@ -93,8 +109,7 @@ export function applyNamePreviewLocal(items: InvoiceItem[], template: string): v
       ext,
     });
 
-    const baseName = normalizeBaseName(rendered, ext);
-    item.suggested_name = `${baseName}.${ext}`;
-    item.action = "rename";
+    item.suggested_name = normalizeRelativeName(rendered, ext);
+    item.action = isDuplicate ? "skip" : "rename";
   }
 }
@@ -3,7 +3,9 @@ use base64::{
     Engine as _,
 };
 use serde::{Deserialize, Serialize};
-use std::path::PathBuf;
+use std::collections::HashSet;
+use std::fs::File;
+use std::path::{Path, PathBuf};
 use std::thread;
 use std::time::Duration;
 
@@ -35,12 +37,18 @@ pub struct PreviewPayload {
 const MAX_PREVIEW_FILE_SIZE: u64 = 20 * 1024 * 1024;
 const RENAME_MAX_RETRIES: u32 = 10;
 const RENAME_RETRY_DELAY_MS: u64 = 180;
-
-fn try_rename_with_retry(source: &PathBuf, target: &PathBuf) -> std::io::Result<()> {
+// 跨磁盘移动时 rename 返回的系统错误码：Windows ERROR_NOT_SAME_DEVICE / Unix EXDEV
+#[cfg(windows)]
+const CROSS_DEVICE_ERROR: i32 = 17;
+#[cfg(not(windows))]
+const CROSS_DEVICE_ERROR: i32 = 18;
+
+// 文件被其他程序占用（Windows 共享冲突 32/33）时稍等重试
+fn retry_while_in_use(mut op: impl FnMut() -> std::io::Result<()>) -> std::io::Result<()> {
     let mut attempt: u32 = 0;
     loop {
         attempt += 1;
-        match std::fs::rename(source, target) {
+        match op() {
             Ok(()) => return Ok(()),
             Err(err) => {
                 let raw = err.raw_os_error();
@@ -54,9 +62,74 @@ fn try_rename_with_retry(source: &PathBuf, target: &PathBuf) -> std::io::Result<
     }
 }
 
+fn target_exists_error(target: &Path) -> std::io::Error {
+    std::io::Error::new(std::io::ErrorKind::AlreadyExists, format!("target_exists: {}", target.display()))
+}
+
+fn same_file(source: &Path, target: &Path) -> bool {
+    match (std::fs::canonicalize(source), std::fs::canonicalize(target)) {
+        (Ok(source), Ok(target)) => source == target,
+        _ => false,
+    }
+}
+
+// 把 source 放到 target 名下且绝不覆盖已有文件：硬链接在目标已存在时直接失败，
+// 之后再删除源名。不支持硬链接的文件系统（FAT/exFAT 等）退回先检查再改名。
+// 跨设备时原样返回错误，由调用方改为复制。
+fn place_without_overwrite(source: &Path, target: &Path) -> std::io::Result<()> {
+    match std::fs::hard_link(source, target) {
+        Ok(()) => retry_while_in_use(|| std::fs::remove_file(source)).map_err(|err| {
+            let _ = std::fs::remove_file(target);
+            err
+        }),
+        Err(err) if err.kind() == std::io::ErrorKind::AlreadyExists => Err(target_exists_error(target)),
+        Err(err) if err.raw_os_error() == Some(CROSS_DEVICE_ERROR) => Err(err),
+        Err(_) => {
+            if target.exists() {
+                return Err(target_exists_error(target));
+            }
+            retry_while_in_use(|| std::fs::rename(source, target))
+        }
+    }
+}
+
+// 先完整写入目标目录下的临时文件并落盘，再以不覆盖的方式放到目标名下，最后删除源文件
+fn copy_across_devices(source: &Path, target: &Path) -> std::io::Result<()> {
+    let file_name = target.file_name().and_then(|value| value.to_str()).unwrap_or("invoice");
+    let tmp_path = target.with_file_name(format!(".{}.{}.tmp", file_name, std::process::id()));
+    let copied = (|| {
+        let mut reader = File::open(source)?;
+        let mut writer = File::options().write(true).create_new(true).open(&tmp_path)?;
+        std::io::copy(&mut reader, &mut writer)?;
+        writer.sync_all()?;
+        place_without_overwrite(&tmp_path, target)
+    })();
+    if let Err(err) = copied {
+        let _ = std::fs::remove_file(&tmp_path);
+        return Err(err);
+    }
+    std::fs::remove_file(source)
+}
+
+fn move_file(source: &PathBuf, target: &PathBuf) -> std::io::Result<()> {
+    if same_file(source, target) {
+        // 大小写不敏感的文件系统上只改大小写，目标就是源文件本身
+        return retry_while_in_use(|| std::fs::rename(source, target));
+    }
+    if target.exists() {
+        return Err(target_exists_error(target));
+    }
+    match place_without_overwrite(source, target) {
+        Err(err) if err.raw_os_error() == Some(CROSS_DEVICE_ERROR) => copy_across_devices(source, target),
+        other => other,
+    }
+}
+
 #[tauri::command]
 fn rename_files(plan_items: Vec<RenamePlanItem>) -> Result<Vec<RenameResultItem>, String> {
     let mut results: Vec<RenameResultItem> = Vec::new();
+    // 整理模式下多个文件共用目标目录，每个目录每批只创建一次
+    let mut created_dirs: HashSet<PathBuf> = HashSet::new();
 
     for plan in plan_items {
         if plan.action != "rename" {
@@ -83,7 +156,15 @@ fn rename_files(plan_items: Vec<RenamePlanItem>) -> Result<Vec<RenameResultItem>
             continue;
         }
 
-        match try_rename_with_retry(&source, &target) {
+        let moved = match target.parent() {
+            Some(parent) if !created_dirs.contains(parent) => std::fs::create_dir_all(parent).map(|_| {
+                created_dirs.insert(parent.to_path_buf());
+            }),
+            _ => Ok(()),
+        }
+        .and_then(|_| move_file(&source, &target));
+
+        match moved {
             Ok(_) => results.push(RenameResultItem {
                 item_id: plan.item_id,
                 source_path: plan.source_path,